@@ -0,0 +1,80 @@
+"""
+backtest.py
+"""
+
+import argparse
+import importlib
+import json
+import os
+from datetime import datetime, timezone
+
+from config import AppConfig
+from src.logger_setup import get_logger, setup_logging
+from src.backtest.engine import Backtester, load_minute_bars
+from src.cryptocompare.candle_store import CandleStore
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+
+def parse_time(value):
+    """
+    日付文字列（YYYY-MM-DD）をUNIX時刻に変換する
+    """
+    if not value:
+        return None
+    date = datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return int(date.timestamp())
+
+
+def load_strategy(path):
+    """
+    "モジュール:関数"形式で指定した判断関数を読み込む
+    """
+    module_name, function_name = path.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def main():
+    """
+    保存済みの1分足でバックテストを実行する
+    """
+    setup_logging()
+    config = AppConfig()
+    config.load("config.json")
+
+    parser = argparse.ArgumentParser(description="Backtest a strategy")
+    parser.add_argument(
+        "--strategy",
+        default="src.backtest.strategies:moving_average_crossover",
+    )
+    parser.add_argument("--pair", default="BTC_JPY")
+    parser.add_argument("--start", help="YYYY-MM-DD")
+    parser.add_argument("--end", help="YYYY-MM-DD")
+    parser.add_argument("--jpy", type=float, default=100000)
+    parser.add_argument("--btc", type=float, default=0.0)
+    parser.add_argument("--commission", type=float, default=0.0015)
+    parser.add_argument("--slippage", type=float, default=0.0)
+    args = parser.parse_args()
+
+    store = CandleStore(os.path.join(config.candle_store_dir, args.pair))
+    minute_bars = load_minute_bars(
+        store, parse_time(args.start), parse_time(args.end)
+    )
+    logger.info("Loaded %d minute bars", len(minute_bars))
+
+    backtester = Backtester(
+        minute_bars,
+        load_strategy(args.strategy),
+        trading_interval=config.trading_interval,
+        initial_jpy=args.jpy,
+        initial_btc=args.btc,
+        commission_rate=args.commission,
+        slippage_rate=args.slippage,
+    )
+    result = backtester.run()
+    print(json.dumps(result.summary(), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark fixtures
+"""
+
+import random
+
+import pandas as pd
+
+from config import AppConfig
+from src.exchange.matching_engine import MatchingEngine
+from src.exchange.server import StandinServer
+
+# 代替サーバーのAPIキー
+API_KEY = "benchmark"
+API_SECRET = "benchmark-secret"
+
+
+def make_minute_bars(count, seed=0, price=10_000_000, start=1_700_000_000):
+    """
+    CryptoCompareのhistominuteと同じ形式の1分足をcount件作成する
+    """
+    rng = random.Random(seed)
+    start -= start % 60
+    bars = []
+    close = float(price)
+    for i in range(count):
+        open_ = close
+        close = max(open_ * (1 + rng.gauss(0, 0.0005)), 1.0)
+        high = max(open_, close) * (1 + abs(rng.gauss(0, 0.0002)))
+        low = min(open_, close) * (1 - abs(rng.gauss(0, 0.0002)))
+        volume = rng.uniform(0.1, 5.0)
+        bars.append(
+            {
+                "time": start + i * 60,
+                "high": round(high),
+                "low": round(low),
+                "open": round(open_),
+                "volumefrom": round(volume, 8),
+                "volumeto": round(volume * close, 2),
+                "close": round(close),
+                "conversionType": "direct",
+                "conversionSymbol": "",
+            }
+        )
+    return bars
+
+
+def make_config(**overrides):
+    """
+    ネットワークとファイルに依存しない設定を作成する
+    """
+    config = AppConfig()
+    config.bitflyer_api_key = API_KEY
+    config.bitflyer_api_secret = API_SECRET
+    config.openai_api_key = "benchmark"
+    config.prompt_file = "samples/messages_default.json"
+    config.candle_store_dir = None
+    config.decision_cache_enabled = False
+    config.market_cache_enabled = False
+    config.rate_limit_enabled = False
+    config.market_feed = "rest"
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    return config
+
+
+def start_standin(trades=200, seed=0):
+    """
+    約定履歴と板のある代替サーバーを起動する
+    """
+    rng = random.Random(seed)
+    engine = MatchingEngine(initial_price=10_000_000, spread=1000)
+    server = StandinServer(engine, {API_KEY: API_SECRET}).start()
+
+    # 自分の約定履歴がないと取得に失敗するため成行で1件約定させる
+    engine.submit_order(API_KEY, "BUY", "MARKET", 0.01)
+    price = 10_000_000
+    for _ in range(trades):
+        price += rng.randint(-2000, 2000)
+        engine.replay_trade(price, rng.uniform(0.01, 0.5))
+    return server
+
+
+def make_decision_inputs(signals, rows=50):
+    """
+    TradingDecision.load_messagesに渡すデータを作成する
+    """
+    ticker = {
+        "product_code": "BTC_JPY",
+        "state": "RUNNING",
+        "timestamp": "2024-01-01T00:00:00.000",
+        "best_bid": 9_999_000.0,
+        "best_ask": 10_001_000.0,
+        "best_bid_size": 0.12,
+        "best_ask_size": 0.34,
+        "ltp": 10_000_000.0,
+        "volume": 1234.5,
+        "volume_by_product": 1234.5,
+    }
+    portfolio = [
+        {"currency_code": "JPY", "amount": 1_000_000, "available": 950_000},
+        {"currency_code": "BTC", "amount": 0.1, "available": 0.095},
+    ]
+    orders = [
+        {
+            "child_order_acceptance_id": f"JRF{i:012d}",
+            "side": "BUY" if i % 2 else "SELL",
+            "child_order_type": "LIMIT",
+            "price": 9_990_000.0 + i * 1000,
+            "size": 0.01,
+            "child_order_state": "ACTIVE",
+        }
+        for i in range(5)
+    ]
+    # get_execution_historyと同じ形式のデータフレーム
+    executions = pd.DataFrame(
+        [
+            {
+                "id": i,
+                "side": "BUY" if i % 2 else "SELL",
+                "price": 10_000_000.0 + i * 500,
+                "size": 0.01,
+                "exec_date": pd.Timestamp("2024-01-01") + pd.Timedelta(i, "m"),
+                "commission": 0.0,
+            }
+            for i in range(15)
+        ]
+    )
+    return signals.tail(rows), ticker, portfolio, orders, executions
@@ -0,0 +1,101 @@
+"""
+Import time profile
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# 起動時に読み込まれていないことを確認する重いライブラリ
+HEAVY_MODULES = (
+    "numpy",
+    "pandas",
+    "openai",
+    "pydantic",
+    "requests",
+    "urllib3",
+    "websocket",
+)
+
+# プロジェクトのルートディレクトリ
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(output):
+    """
+    -X importtimeの出力をモジュールごとの（自身, 累積）マイクロ秒に変換する
+    """
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def profile_import(module="main", top=15):
+    """
+    新しいプロセスでmoduleを読み込み、所要時間と読み込まれたモジュールを返す
+    """
+    code = (
+        "import json, sys\n"
+        f"import {module}\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} "
+        "if m in sys.modules]))\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = parse_importtime(completed.stderr)
+    slowest = sorted(modules.items(), key=lambda item: item[1][0])[::-1]
+    return {
+        "module": module,
+        "seconds": round(modules[module][1] / 1_000_000, 4),
+        "modules": len(modules),
+        "heavy_loaded": json.loads(completed.stdout.strip().splitlines()[-1]),
+        "slowest": [
+            {
+                "name": name,
+                "self_ms": round(self_us / 1000, 2),
+                "cumulative_ms": round(cumulative_us / 1000, 2),
+            }
+            for name, (self_us, cumulative_us) in slowest[:top]
+        ],
+    }
+
+
+def main():
+    """
+    起動時の読み込み時間をJSONで出力する
+    """
+    parser = argparse.ArgumentParser(description="Profile import time")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        help="Exit with status 1 if the import takes longer than this",
+    )
+    args = parser.parse_args()
+
+    # ディスクキャッシュの影響を除くため最も速い結果を使用する
+    reports = [
+        profile_import(args.module, args.top) for _ in range(args.repeat)
+    ]
+    report = min(reports, key=lambda r: r["seconds"])
+    print(json.dumps(report, indent=4))
+
+    if args.max_seconds is not None and report["seconds"] > args.max_seconds:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
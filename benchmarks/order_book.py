@@ -0,0 +1,115 @@
+"""
+Order book benchmark
+"""
+
+import argparse
+import json
+import random
+import time
+
+from src.bitflyer.order_book import OrderBook
+
+
+def make_snapshot(rng, levels, mid=10_000_000, tick=1):
+    """
+    仲値の上下にlevels件ずつ並ぶ板を作成する
+    """
+    return {
+        "mid_price": mid,
+        "bids": [
+            {"price": mid - tick * (i + 1), "size": rng.uniform(0.01, 1.0)}
+            for i in range(levels)
+        ],
+        "asks": [
+            {"price": mid + tick * (i + 1), "size": rng.uniform(0.01, 1.0)}
+            for i in range(levels)
+        ],
+    }
+
+
+def make_diffs(rng, count, levels, mid=10_000_000, tick=1, removal=0.3):
+    """
+    板の差分をcount件作成する（removalの割合で数量0の削除を含む）
+    """
+    diffs = []
+    for _ in range(count):
+        side = "bids" if rng.random() < 0.5 else "asks"
+        offset = tick * rng.randint(1, levels * 2)
+        price = mid - offset if side == "bids" else mid + offset
+        size = 0 if rng.random() < removal else rng.uniform(0.01, 1.0)
+        diffs.append({side: [{"price": price, "size": size}]})
+    return diffs
+
+
+class DictBook:
+    """
+    比較用：辞書に保持し、参照のたびに並べ替える板
+    """
+
+    def __init__(self, board):
+        self.bids = {b["price"]: b["size"] for b in board["bids"]}
+        self.asks = {a["price"]: a["size"] for a in board["asks"]}
+
+    def apply_diff(self, board):
+        for levels, updates in (
+            (self.bids, board.get("bids", [])),
+            (self.asks, board.get("asks", [])),
+        ):
+            for level in updates:
+                if level["size"]:
+                    levels[level["price"]] = level["size"]
+                else:
+                    levels.pop(level["price"], None)
+
+    def spread(self):
+        return min(self.asks) - max(self.bids)
+
+
+def measure(book, diffs, query_every):
+    """
+    差分の反映と一定間隔の参照にかかった時間を返す
+    """
+    started = time.perf_counter()
+    for index, diff in enumerate(diffs):
+        book.apply_diff(diff)
+        if query_every and index % query_every == 0:
+            book.spread()
+    return time.perf_counter() - started
+
+
+def main():
+    """
+    板の更新スループットを計測する
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the order book")
+    parser.add_argument("--levels", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=200000)
+    parser.add_argument("--query-every", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    snapshot = make_snapshot(rng, args.levels)
+    diffs = make_diffs(rng, args.updates, args.levels)
+
+    results = {}
+    for name, factory in (("order_book", OrderBook), ("dict", DictBook)):
+        elapsed = measure(factory(snapshot), diffs, args.query_every)
+        results[name] = {
+            "seconds": round(elapsed, 3),
+            "updates_per_second": round(args.updates / elapsed),
+        }
+
+    # VWAPと要約の参照
+    book = OrderBook(snapshot)
+    started = time.perf_counter()
+    for _ in range(1000):
+        book.summary()
+    results["summary_per_second"] = round(
+        1000 / (time.perf_counter() - started)
+    )
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+Benchmark suite
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import order_book
+from benchmarks.import_time import profile_import
+from benchmarks.fixtures import (
+    make_config,
+    make_decision_inputs,
+    make_minute_bars,
+    start_standin,
+)
+from src.logger_setup import setup_logging
+from src.actions import MarketData
+from src.bitflyer.order_book import OrderBook
+from src.bitflyer.trading_methods import BitflyerMethods
+from src.cryptocompare.trading_signals import TradingSignals
+from src.openai.tools import TOOLS
+from src.openai.trading_decision import TradingDecision
+
+# 1分足の本数
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+
+# 計測のグループ
+GROUPS = ["signals", "requests", "prompt", "order_book", "startup"]
+
+# 基準より遅い場合に劣化とみなす割合
+DEFAULT_THRESHOLD = 0.25
+
+# 指標の計算方法ごとの計測名の接頭辞（pandasは従来の名前のまま）
+SIGNAL_ENGINES = {
+    "pandas": "signals",
+    "numpy": "signals.numpy",
+    "streaming": "signals.streaming",
+}
+
+# load_dataで指標を計算する計算方法（calculate_signalsは計測しない）
+STREAMING_ENGINES = ("streaming",)
+
+
+def measure(func, repeat, setup=None, number=1):
+    """
+    funcをnumber回実行する時間をrepeat回計測し、1回あたりの秒数を返す
+    """
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        runs.append((time.perf_counter() - started) / number)
+    return {
+        "median": statistics.median(runs),
+        "min": min(runs),
+        "max": max(runs),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def peak_memory(func, setup=None):
+    """
+    funcの実行中に確保されたメモリの最大値（バイト）を返す
+    """
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_signals(sizes, repeat):
+    """
+    1分足の読み込み・リサンプリングと指標の計算（pandas・NumPy・逐次計算）
+    """
+    results = {}
+    for size in sizes:
+        bars = make_minute_bars(size)
+        for engine, prefix in SIGNAL_ENGINES.items():
+            signals = TradingSignals(
+                make_config(signals_incremental=False, signal_engine=engine)
+            )
+            signals.fetch_data = lambda symbol, currency, limit: bars
+            load = lambda signals=signals: signals.load_data(limit=size)
+
+            # 逐次計算はload_dataで指標を計算し直すため読み込みも計測する
+            names = ("calculate_signals", "get_signals")
+            if engine in STREAMING_ENGINES:
+                names = ("get_signals",)
+            if engine == "pandas" or engine in STREAMING_ENGINES:
+                results[f"{prefix}.load_data[{size}]"] = measure(load, repeat)
+            for name in names:
+                func = getattr(signals, name)
+                result = measure(func, repeat, setup=load)
+                result["peak_bytes"] = peak_memory(func, setup=load)
+                results[f"{prefix}.{name}[{size}]"] = result
+
+            # 上位の時間足の指標（キャッシュを使用しない場合）
+            if engine not in STREAMING_ENGINES:
+                reload = lambda signals=signals: (
+                    load(),
+                    signals.timeframe_cache.clear(),
+                )
+                results[f"{prefix}.get_timeframe_signals[{size}]"] = measure(
+                    signals.get_timeframe_signals, repeat, setup=reload
+                )
+
+    return results
+
+
+def bench_requests(repeat, number=50):
+    """
+    代替サーバーへの署名付きリクエストとマーケットデータの取得
+    """
+    results = {}
+    server = start_standin()
+    config = make_config(bitflyer_base_url=server.url)
+    client = BitflyerMethods(config)
+    executor = ThreadPoolExecutor(max_workers=config.snapshot_workers)
+    api_client = client.api_client
+    try:
+        results["bitflyer.make_request.public"] = measure(
+            lambda: api_client.make_request(
+                "GET", "/v1/getticker", params={"product_code": "BTC_JPY"}
+            ),
+            repeat,
+            number=number,
+        )
+        results["bitflyer.make_request.private"] = measure(
+            lambda: api_client.make_request("GET", "/v1/me/getbalance"),
+            repeat,
+            number=number,
+        )
+        results["market_data.construct"] = measure(
+            lambda: MarketData(
+                client,
+                executor=executor,
+                product_code="BTC_JPY",
+                order_book=True,
+            ),
+            repeat,
+            number=max(number // 5, 1),
+        )
+    finally:
+        executor.shutdown(wait=True)
+        client.close()
+        server.stop()
+    return results
+
+
+def bench_prompt(repeat, number=200):
+    """
+    プロンプトのテンプレートへのデータの埋め込み
+    """
+    results = {}
+    signals = TradingSignals(make_config(signals_incremental=False))
+    bars = make_minute_bars(1000)
+    signals.fetch_data = lambda symbol, currency, limit: bars
+    signals.load_data()
+    inputs = make_decision_inputs(signals.get_signals())
+    board = OrderBook(
+        order_book.make_snapshot(random.Random(0), 200)
+    ).summary()
+
+    # ツールの定義がリクエストの本文（JSON）に変換できることを確認する
+    results["tools.json_dumps"] = measure(
+        lambda: json.dumps(TOOLS), repeat, number=number
+    )
+
+    for prompt_format in ("repr", "compact"):
+        decision = TradingDecision(make_config(prompt_format=prompt_format))
+        try:
+            results[f"trading_decision.load_messages.{prompt_format}"] = (
+                measure(
+                    lambda: decision.load_messages(
+                        *inputs, "2024-01-01T00:00:00.000Z", board
+                    ),
+                    repeat,
+                    number=number,
+                )
+            )
+        finally:
+            decision.close()
+    return results
+
+
+def bench_order_book(repeat, levels=2000, updates=100_000):
+    """
+    板の差分の反映
+    """
+    rng = random.Random(0)
+    snapshot = order_book.make_snapshot(rng, levels)
+    diffs = order_book.make_diffs(rng, updates, levels)
+    result = measure(
+        lambda: order_book.measure(OrderBook(snapshot), diffs, 10), repeat
+    )
+    return {"order_book.apply_diff": result}
+
+
+def bench_startup(repeat):
+    """
+    新しいプロセスでのmainの読み込み
+    """
+    runs = [profile_import("main")["seconds"] for _ in range(repeat)]
+    return {
+        "startup.import_main": {
+            "median": statistics.median(runs),
+            "min": min(runs),
+            "max": max(runs),
+            "repeat": repeat,
+            "number": 1,
+        }
+    }
+
+
+def run(groups, sizes, repeat):
+    """
+    指定したグループの計測を実行する
+    """
+    results = {}
+    if "signals" in groups:
+        results.update(bench_signals(sizes, repeat))
+    if "requests" in groups:
+        results.update(bench_requests(repeat))
+    if "prompt" in groups:
+        results.update(bench_prompt(repeat))
+    if "order_book" in groups:
+        results.update(bench_order_book(repeat))
+    if "startup" in groups:
+        results.update(bench_startup(repeat))
+    for result in results.values():
+        for key in ("median", "min", "max"):
+            result[key] = round(result[key], 6)
+    return {
+        "meta": {
+            "created": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "sizes": list(sizes),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    基準と最小値を比較し、劣化した計測の名前を返す
+
+    最小値は他の処理による揺らぎの影響が小さいため比較に使用する
+    """
+    regressions = []
+    rows = []
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or not base["min"]:
+            rows.append({"name": name, "status": "new"})
+            continue
+        ratio = result["min"] / base["min"]
+        status = "ok"
+        if ratio > 1 + threshold:
+            status = "regression"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            status = "improved"
+        rows.append(
+            {
+                "name": name,
+                "baseline": base["min"],
+                "current": result["min"],
+                "ratio": round(ratio, 3),
+                "status": status,
+            }
+        )
+    return regressions, rows
+
+
+def main():
+    """
+    計測結果をJSONで出力し、基準が指定された場合は比較する
+    """
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument(
+        "--groups",
+        nargs="+",
+        default=GROUPS,
+        choices=GROUPS,
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES)
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results to this file")
+    parser.add_argument("--compare", help="Baseline results to compare")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+    setup_logging(log_file=False)
+
+    results = run(args.groups, args.sizes, args.repeat)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+    if not args.compare:
+        print(json.dumps(results, indent=4))
+        return
+
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions, rows = compare(results, baseline, args.threshold)
+    print(
+        json.dumps(
+            {
+                "threshold": args.threshold,
+                "regressions": regressions,
+                "comparison": rows,
+            },
+            indent=4,
+        )
+    )
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@
 """
 
 import os
+import copy
 import json
 from dotenv import load_dotenv
 from src.logger_setup import get_logger
@@ -21,9 +22,78 @@ default_config = {
     "cryptocompare_api_key": "",
     "log_dir": "logs",
     "cache_file": "price_cache.json",
+    "bitflyer_base_url": "https://api.bitflyer.jp",
+    "http_pool_size": 10,
+    "http_max_retries": 3,
+    "http_backoff_factor": 0.5,
+    "http_timeouts": {
+        "default": 10,
+        "/v1/getboardstate": 5,
+        "/v1/getticker": 5,
+    },
+    "rate_limit_enabled": True,
+    "rate_limits": {
+        "public": {"limit": 500, "period": 300},
+        "private": {"limit": 500, "period": 300},
+        "orders": {"limit": 300, "period": 300},
+    },
+    "rate_limit_max_wait": 30,
+    "order_poll_interval": 0.2,
+    "order_max_poll_interval": 2.0,
+    "cancel_confirm_timeout": 10,
+    "parent_order_expire": 1440,
+    "metrics_enabled": True,
+    "metrics_host": "127.0.0.1",
+    "metrics_port": 0,
+    "order_book_enabled": True,
+    "max_slippage_bps": 50,
+    "market_cache_enabled": True,
+    "market_cache_ttls": {
+        "/v1/getticker": 2,
+        "/v1/getboardstate": 2,
+        "/v1/getboard": 1,
+    },
+    "snapshot_timeout": 15,
+    "snapshot_workers": 8,
+    "signals_incremental": True,
+    "signal_engine": "pandas",
+    "candle_store_dir": "data/candles",
+    "signal_timeframes": ["15m", "1h", "4h"],
+    "timeframe_history": 200,
+    "timeframe_signal_rows": 5,
+    "portfolio_fsync_policy": "interval",
+    "portfolio_fsync_interval": 60,
+    "portfolio_tail_size": 1000,
+    "market_feed": "rest",
+    "realtime_url": "wss://ws.lightstream.bitflyer.com/json-rpc",
+    "realtime_max_staleness": 30,
+    "decision_cache_enabled": True,
+    "decision_cache_file": "decision_cache.json",
+    "decision_cache_ttl": 900,
+    "decision_cache_max_entries": 256,
+    "decision_cache_digits": 4,
+    "decision_cache_signal_rows": 3,
+    "prompt_format": "compact",
+    "prompt_token_budget": 3000,
+    "openai_model": "gpt-4o",
+    "openai_fallback_model": "gpt-4o-mini",
+    "decision_deadline": 60,
+    "decision_hedge_delay": 20,
+    "decision_fallback_margin": 15,
+    "schedule_offset": 5,
+    "product_code": "BTC_JPY",
+    "products": [],
 }
 
 
+def split_product_code(product_code):
+    """
+    プロダクトコードを基軸通貨と決済通貨に分ける（例: FX_BTC_JPY → BTC, JPY）
+    """
+    parts = product_code.split("_")
+    return parts[-2], parts[-1]
+
+
 class AppConfig:
     """
     設定を管理するクラス
@@ -33,8 +103,17 @@ class AppConfig:
         # 設定用変数とデフォルト値を設定
         self.ticker_interval = 60
         self.trading_interval = 300
+
+        # 足の確定から売買判断までの秒数
+        self.schedule_offset = 5
         self.prompt_file = "messages.json"
 
+        # 取引するプロダクト（productsが空の場合はproduct_codeのみ）
+        self.product_code = "BTC_JPY"
+        self.products = []
+        self.signal_symbol = "BTC"
+        self.signal_currency = "JPY"
+
         self.bitflyer_api_key = ""
         self.bitflyer_api_secret = ""
         self.openai_api_key = ""
@@ -45,6 +124,83 @@ class AppConfig:
         self.log_dir = "logs"
         self.cache_file = "price_cache.json"
 
+        # HTTP接続の設定
+        self.bitflyer_base_url = "https://api.bitflyer.jp"
+        self.http_pool_size = 10
+        self.http_max_retries = 3
+        self.http_backoff_factor = 0.5
+        self.http_timeouts = {"default": 10}
+
+        # APIのレート制限（期間あたりのリクエスト数）
+        self.rate_limit_enabled = True
+        self.rate_limits = {}
+        self.rate_limit_max_wait = 30
+
+        # 注文の状態の確認間隔と取消の確認の期限（秒）
+        self.order_poll_interval = 0.2
+        self.order_max_poll_interval = 2.0
+        self.cancel_confirm_timeout = 10
+
+        # 特殊注文の有効期限（分）
+        self.parent_order_expire = 1440
+
+        # 各段階の所要時間の記録とPrometheusの収集用ポート（0は無効）
+        self.metrics_enabled = True
+        self.metrics_host = "127.0.0.1"
+        self.metrics_port = 0
+
+        # 板の要約と注文前のチェック（仲値からの乖離の上限）
+        self.order_book_enabled = True
+        self.max_slippage_bps = 50
+
+        # 公開APIのキャッシュの有効期間（秒）
+        self.market_cache_enabled = True
+        self.market_cache_ttls = {}
+
+        # マーケットデータの並行取得の設定
+        self.snapshot_timeout = 15
+        self.snapshot_workers = 8
+
+        # 価格データの差分取得の設定
+        self.signals_incremental = True
+        # 指標の計算方法（"pandas" / "numpy" / "streaming"）
+        self.signal_engine = "pandas"
+        self.candle_store_dir = "data/candles"
+
+        # 5分足から集計する上位の時間足と、保持する本数・プロンプトの行数
+        self.signal_timeframes = ["15m", "1h", "4h"]
+        self.timeframe_history = 200
+        self.timeframe_signal_rows = 5
+
+        # 残高履歴の設定
+        self.portfolio_fsync_policy = "interval"
+        self.portfolio_fsync_interval = 60
+        self.portfolio_tail_size = 1000
+
+        # マーケットデータの取得方法（"rest"または"stream"）
+        self.market_feed = "rest"
+        self.realtime_url = "wss://ws.lightstream.bitflyer.com/json-rpc"
+        self.realtime_max_staleness = 30
+
+        # 売買判断のキャッシュの設定
+        self.decision_cache_enabled = True
+        self.decision_cache_file = "decision_cache.json"
+        self.decision_cache_ttl = 900
+        self.decision_cache_max_entries = 256
+        self.decision_cache_digits = 4
+        self.decision_cache_signal_rows = 3
+
+        # プロンプトのデータ形式とトークン数の上限
+        self.prompt_format = "compact"
+        self.prompt_token_budget = 3000
+
+        # 売買判断の期限・ヘッジ・代替モデルの設定
+        self.openai_model = "gpt-4o"
+        self.openai_fallback_model = "gpt-4o-mini"
+        self.decision_deadline = 60
+        self.decision_hedge_delay = 20
+        self.decision_fallback_margin = 15
+
         # プロジェクトのルートディレクトリを取得
         self.project_root = os.path.dirname(os.path.abspath(__file__))
 
@@ -87,3 +243,186 @@ class AppConfig:
         self.cache_file = config.get(
             "cache_file", default_config["cache_file"]
         )
+        self.bitflyer_base_url = config.get(
+            "bitflyer_base_url", default_config["bitflyer_base_url"]
+        )
+        self.http_pool_size = config.get(
+            "http_pool_size", default_config["http_pool_size"]
+        )
+        self.http_max_retries = config.get(
+            "http_max_retries", default_config["http_max_retries"]
+        )
+        self.http_backoff_factor = config.get(
+            "http_backoff_factor", default_config["http_backoff_factor"]
+        )
+        self.http_timeouts = config.get(
+            "http_timeouts", default_config["http_timeouts"]
+        )
+        self.rate_limit_enabled = config.get(
+            "rate_limit_enabled", default_config["rate_limit_enabled"]
+        )
+        self.rate_limits = config.get(
+            "rate_limits", default_config["rate_limits"]
+        )
+        self.rate_limit_max_wait = config.get(
+            "rate_limit_max_wait", default_config["rate_limit_max_wait"]
+        )
+        self.order_poll_interval = config.get(
+            "order_poll_interval", default_config["order_poll_interval"]
+        )
+        self.order_max_poll_interval = config.get(
+            "order_max_poll_interval",
+            default_config["order_max_poll_interval"],
+        )
+        self.cancel_confirm_timeout = config.get(
+            "cancel_confirm_timeout", default_config["cancel_confirm_timeout"]
+        )
+        self.parent_order_expire = config.get(
+            "parent_order_expire", default_config["parent_order_expire"]
+        )
+        self.metrics_enabled = config.get(
+            "metrics_enabled", default_config["metrics_enabled"]
+        )
+        self.metrics_host = config.get(
+            "metrics_host", default_config["metrics_host"]
+        )
+        self.metrics_port = config.get(
+            "metrics_port", default_config["metrics_port"]
+        )
+        self.order_book_enabled = config.get(
+            "order_book_enabled", default_config["order_book_enabled"]
+        )
+        self.max_slippage_bps = config.get(
+            "max_slippage_bps", default_config["max_slippage_bps"]
+        )
+        self.market_cache_enabled = config.get(
+            "market_cache_enabled", default_config["market_cache_enabled"]
+        )
+        self.market_cache_ttls = config.get(
+            "market_cache_ttls", default_config["market_cache_ttls"]
+        )
+        self.snapshot_timeout = config.get(
+            "snapshot_timeout", default_config["snapshot_timeout"]
+        )
+        self.snapshot_workers = config.get(
+            "snapshot_workers", default_config["snapshot_workers"]
+        )
+        self.signals_incremental = config.get(
+            "signals_incremental", default_config["signals_incremental"]
+        )
+        self.signal_engine = config.get(
+            "signal_engine", default_config["signal_engine"]
+        )
+        self.candle_store_dir = config.get(
+            "candle_store_dir", default_config["candle_store_dir"]
+        )
+        self.signal_timeframes = config.get(
+            "signal_timeframes", default_config["signal_timeframes"]
+        )
+        self.timeframe_history = config.get(
+            "timeframe_history", default_config["timeframe_history"]
+        )
+        self.timeframe_signal_rows = config.get(
+            "timeframe_signal_rows", default_config["timeframe_signal_rows"]
+        )
+        self.portfolio_fsync_policy = config.get(
+            "portfolio_fsync_policy", default_config["portfolio_fsync_policy"]
+        )
+        self.portfolio_fsync_interval = config.get(
+            "portfolio_fsync_interval",
+            default_config["portfolio_fsync_interval"],
+        )
+        self.portfolio_tail_size = config.get(
+            "portfolio_tail_size", default_config["portfolio_tail_size"]
+        )
+        self.market_feed = config.get(
+            "market_feed", default_config["market_feed"]
+        )
+        self.realtime_url = config.get(
+            "realtime_url", default_config["realtime_url"]
+        )
+        self.realtime_max_staleness = config.get(
+            "realtime_max_staleness", default_config["realtime_max_staleness"]
+        )
+        self.decision_cache_enabled = config.get(
+            "decision_cache_enabled", default_config["decision_cache_enabled"]
+        )
+        self.decision_cache_file = config.get(
+            "decision_cache_file", default_config["decision_cache_file"]
+        )
+        self.decision_cache_ttl = config.get(
+            "decision_cache_ttl", default_config["decision_cache_ttl"]
+        )
+        self.decision_cache_max_entries = config.get(
+            "decision_cache_max_entries",
+            default_config["decision_cache_max_entries"],
+        )
+        self.decision_cache_digits = config.get(
+            "decision_cache_digits", default_config["decision_cache_digits"]
+        )
+        self.decision_cache_signal_rows = config.get(
+            "decision_cache_signal_rows",
+            default_config["decision_cache_signal_rows"],
+        )
+        self.prompt_format = config.get(
+            "prompt_format", default_config["prompt_format"]
+        )
+        self.prompt_token_budget = config.get(
+            "prompt_token_budget", default_config["prompt_token_budget"]
+        )
+        self.openai_model = config.get(
+            "openai_model", default_config["openai_model"]
+        )
+        self.openai_fallback_model = config.get(
+            "openai_fallback_model", default_config["openai_fallback_model"]
+        )
+        self.decision_deadline = config.get(
+            "decision_deadline", default_config["decision_deadline"]
+        )
+        self.decision_hedge_delay = config.get(
+            "decision_hedge_delay", default_config["decision_hedge_delay"]
+        )
+        self.decision_fallback_margin = config.get(
+            "decision_fallback_margin",
+            default_config["decision_fallback_margin"],
+        )
+        self.schedule_offset = config.get(
+            "schedule_offset", default_config["schedule_offset"]
+        )
+        self.product_code = config.get(
+            "product_code", default_config["product_code"]
+        )
+        self.products = config.get("products", default_config["products"])
+        self.signal_symbol, self.signal_currency = split_product_code(
+            self.product_code
+        )
+
+    def get_product_configs(self):
+        """
+        プロダクトごとの設定のリストを返す
+        """
+        if not self.products:
+            return [self]
+        return [self.for_product(overrides) for overrides in self.products]
+
+    def for_product(self, overrides):
+        """
+        プロダクト固有の値で上書きした設定を作成する
+        """
+        product_config = copy.copy(self)
+        product_config.products = []
+        for key, value in overrides.items():
+            setattr(product_config, key, value)
+
+        base, quote = split_product_code(product_config.product_code)
+        product_config.signal_symbol = overrides.get("signal_symbol", base)
+        product_config.signal_currency = overrides.get(
+            "signal_currency", quote
+        )
+
+        # 判断のキャッシュはプロダクトごとに分ける
+        if "decision_cache_file" not in overrides:
+            product_config.decision_cache_file = (
+                f"{product_config.product_code}_{self.decision_cache_file}"
+            )
+        return product_config
@@ -2,32 +2,190 @@
 Actions
 """
 
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
 from src.logger_setup import get_logger
+from src.metrics import get_metrics
+from src.custom_errors import APIError
 from src.bitflyer.trading_methods import BitflyerMethods
+from src.bitflyer.realtime import LiveMarketState, RealtimeClient
+from src.bitflyer.order_book import OrderBook
+from src.bitflyer.order_tracker import OrderTracker
 
 # from bitflyer_client import BitflyerClient
 
 # ロガーの取得
 logger = get_logger(__name__)
 
+# メトリクスの取得
+metrics = get_metrics()
+
+# 特殊注文の種類ごとの注文数
+PARENT_ORDER_COUNTS = {"SIMPLE": 1, "IFD": 2, "OCO": 2, "IFDOCO": 3}
+
+# 売買判断に必須のデータ（取得できない場合のみ周期のエラーとする）
+REQUIRED_SOURCES = ("balance", "ticker")
+
+
+def fetch_concurrently(executor, sources, timeout=None):
+    """
+    複数のデータ取得を並行して実行し、結果・取得時刻・エラーを返す
+    """
+    started = time.perf_counter()
+    fetched_at = {}
+    durations = {}
+
+    def run(name, func):
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            durations[name] = round(time.perf_counter() - start, 3)
+            fetched_at[name] = datetime.utcnow().strftime(
+                "%Y-%m-%dT%H:%M:%S.%fZ"
+            )
+
+    futures = {
+        executor.submit(run, name, func): name
+        for name, func in sources.items()
+    }
+    done, not_done = wait(futures, timeout=timeout)
+
+    results = {}
+    errors = {}
+    for future in done:
+        name = futures[future]
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            errors[name] = e
+
+    # 期限内に完了しなかったデータはタイムアウトとして扱う
+    for future in not_done:
+        future.cancel()
+        errors[futures[future]] = TimeoutError(
+            f"Timed out after {timeout} seconds"
+        )
+
+    return {
+        "results": results,
+        "fetched_at": dict(fetched_at),
+        "durations": dict(durations),
+        "errors": errors,
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
 
 class MarketData:
     """
     マーケットデータを取得する
     """
 
-    def __init__(self, bitflyer_client):
-        portfolio_info = bitflyer_client.get_balance()
+    def __init__(
+        self,
+        bitflyer_client,
+        executor=None,
+        timeout=None,
+        extra_sources=None,
+        live_state=None,
+        max_staleness=None,
+        product_code="BTC_JPY",
+        balance=None,
+        order_book=False,
+    ):
+        sources = {
+            "balance": bitflyer_client.get_balance,
+            "executions": lambda: bitflyer_client.get_execution_history(
+                product_code=product_code
+            ),
+            "open_orders": lambda: bitflyer_client.get_open_orders(
+                product_code
+            ),
+            "ticker": lambda: bitflyer_client.get_ticker(product_code),
+        }
+        sources.update(extra_sources or {})
+
+        # 複数のプロダクトで共有する残高は取得済みの値を使用する
+        if balance is not None:
+            del sources["balance"]
+
+        # ストリームのティッカーが新しい場合はRESTで取得しない
+        live_ticker = None
+        if live_state is not None:
+            live_ticker = live_state.get_ticker(max_staleness)
+            if live_ticker is not None:
+                del sources["ticker"]
+
+        # 板の要約（ストリームの板がない場合はスナップショットを取得）
+        self.board_summary = None
+        if order_book:
+            if live_state is not None:
+                self.board_summary = live_state.get_board_summary()
+            if self.board_summary is None:
+                sources["board"] = lambda: bitflyer_client.get_board(
+                    product_code
+                )
+
+        # すべての取得処理を同時に発行する
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+                snapshot = fetch_concurrently(pool, sources, timeout)
+        else:
+            snapshot = fetch_concurrently(executor, sources, timeout)
+
+        self.results = snapshot["results"]
+        self.fetched_at = snapshot["fetched_at"]
+        self.durations = snapshot["durations"]
+        self.errors = snapshot["errors"]
+        self.elapsed = snapshot["elapsed"]
+        if live_ticker is not None:
+            self.results["ticker"] = live_ticker
+        if balance is not None:
+            self.results["balance"] = balance
+
+        logger.info(
+            "Market data fetched in %.3fs: %s", self.elapsed, self.durations
+        )
+        for name, duration in self.durations.items():
+            metrics.observe(
+                "market_data_fetch_seconds",
+                duration,
+                product=product_code,
+                source=name,
+            )
+
+        # 取得に失敗したデータはerrorsに残し、取得できたデータで判断する
+        for name, error in self.errors.items():
+            logger.error("Failed to fetch %s: %s", name, error)
+            metrics.inc(
+                "market_data_errors_total", product=product_code, source=name
+            )
+        missing = [name for name in REQUIRED_SOURCES if name in self.errors]
+        if missing:
+            raise APIError(
+                f"Failed to fetch required market data {missing}: "
+                + ", ".join(
+                    f"{name}={error}" for name, error in self.errors.items()
+                )
+            )
+
+        portfolio_info = self.results["balance"]
         self.portfolio_data = self.process_currency_data(
             portfolio_info["current_balance"]
         )
         self.portfolio_history = portfolio_info["history"]
-        self.execution_data = bitflyer_client.get_execution_history()
-        self.open_orders = bitflyer_client.get_open_orders()
-        self.ticker_data = bitflyer_client.get_ticker()
+        self.ticker_data = self.results["ticker"]
+
+        # 取得に失敗した場合はNone
+        self.execution_data = self.results.get("executions")
+        self.open_orders = self.results.get("open_orders")
+        if "board" in self.results:
+            self.board_summary = OrderBook(self.results["board"]).summary()
 
-    def process_currency_data(self, json_data):
+    @staticmethod
+    def process_currency_data(json_data):
         """
         通貨データを処理する
         """
@@ -40,8 +198,8 @@ class MarketData:
                 entry["amount"] = int(entry["amount"])
                 entry["available"] = int(entry["available"])
 
-            # BTCのamountとavailableの値を小数点以下8位までにする
-            elif entry["currency_code"] == "BTC":
+            # 暗号資産のamountとavailableの値を小数点以下8位までにする
+            else:
                 entry["amount"] = round(entry["amount"], 8)
                 entry["available"] = round(entry["available"], 8)
 
@@ -53,26 +211,153 @@ class Actions:
     注文を実行する
     """
 
-    def __init__(self, config):
+    def __init__(self, config, bitflyer_client=None, executor=None):
 
-        self.bitflyer_client = BitflyerMethods(config)
+        # 複数のプロダクトではクライアントとスレッドプールを共有する
+        self.product_code = config.product_code
+        self.owns_resources = bitflyer_client is None
+        self.bitflyer_client = bitflyer_client or BitflyerMethods(config)
+
+        # マーケットデータの並行取得用スレッドプール
+        self.snapshot_timeout = config.snapshot_timeout
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=config.snapshot_workers,
+            thread_name_prefix="market-data",
+        )
 
         self.portfolio_info = {}
         self.portfolio_data = []
         self.portfolio_history = []
 
-    def get_market_data(self):
+        # 板の要約と注文前のチェック（仲値からの乖離の上限）
+        self.order_book_enabled = config.order_book_enabled
+        self.max_slippage_bps = config.max_slippage_bps
+
+        # 送信した注文の状態の追跡
+        self.order_tracker = OrderTracker(
+            self.bitflyer_client,
+            poll_interval=config.order_poll_interval,
+            max_poll_interval=config.order_max_poll_interval,
+        )
+        self.cancel_confirm_timeout = config.cancel_confirm_timeout
+        self.parent_order_expire = config.parent_order_expire
+
+        # ストリームで受信したマーケットの状態
+        self.live_state = None
+        self.realtime_client = None
+        self.max_staleness = config.realtime_max_staleness
+        if config.market_feed == "stream":
+            self.live_state = LiveMarketState(self.product_code)
+            self.realtime_client = RealtimeClient(
+                self.live_state,
+                rest_client=self.bitflyer_client,
+                url=config.realtime_url,
+            ).start()
+
+    def get_market_data(self, extra_sources=None, balance=None):
         """
         マーケットデータを取得する
         """
-        data = MarketData(self.bitflyer_client)
+        data = MarketData(
+            self.bitflyer_client,
+            executor=self.executor,
+            timeout=self.snapshot_timeout,
+            extra_sources=extra_sources,
+            live_state=self.live_state,
+            max_staleness=self.max_staleness,
+            product_code=self.product_code,
+            balance=balance,
+            order_book=self.order_book_enabled,
+        )
+
+        # 未約定の注文の状態を追跡中の注文に反映
+        if data.open_orders is not None:
+            self.order_tracker.update_from_orders(data.open_orders)
         return data
 
+    def close(self):
+        """
+        接続とスレッドを終了する
+        """
+        if self.realtime_client is not None:
+            self.realtime_client.stop()
+        if self.owns_resources:
+            self.executor.shutdown(wait=True)
+            self.bitflyer_client.close()
+
     def get_board_state(self):
         """
         板の状態を取得する
         """
-        return self.bitflyer_client.get_board_state()
+        if self.live_state is not None:
+            # ストリームのティッカーに含まれる板の状態を使用する
+            ticker = self.live_state.get_ticker(self.max_staleness)
+            if ticker is not None and "state" in ticker:
+                return {"state": ticker["state"]}
+        return self.bitflyer_client.get_board_state(self.product_code)
+
+    def get_connection_stats(self):
+        """
+        HTTP接続の再利用状況を取得する
+        """
+        return self.bitflyer_client.get_connection_stats()
+
+    def wait_for_cancel(self, order_id):
+        """
+        取消が取引所に反映されるまで待ち、注文の最終的な状態を返す
+        """
+        return self.order_tracker.wait_for_terminal(
+            order_id, self.cancel_confirm_timeout
+        )
+
+    def get_order_stats(self):
+        """
+        注文の状態と遷移ごとの所要時間を取得する
+        """
+        return self.order_tracker.get_stats()
+
+    def get_order_book(self):
+        """
+        板を取得する（ストリームの板があればそれを使用する）
+        """
+        if self.live_state is not None:
+            board = self.live_state.get_board()
+            if board["bids"] or board["asks"]:
+                return OrderBook(board)
+        return OrderBook(self.bitflyer_client.get_board(self.product_code))
+
+    def check_order(self, side, size, order_type, price=None):
+        """
+        注文前に板の厚みと仲値からの乖離を確認する（問題がなければNone）
+        """
+        book = self.get_order_book()
+        mid = book.mid()
+        if not mid:
+            return "order book is empty"
+
+        best = book.best_ask() if side == "BUY" else book.best_bid()
+        crosses = best is not None and (
+            order_type == "MARKET"
+            or (side == "BUY" and price >= best[0])
+            or (side == "SELL" and price <= best[0])
+        )
+        if not crosses:
+            # 板に並ぶ指値注文は約定価格が確定しているため確認しない
+            return None
+
+        vwap, filled, _ = book.vwap(side, size)
+        if filled < size:
+            return f"insufficient depth: {filled} < {size}"
+        if order_type == "LIMIT":
+            # 指値より不利な価格では約定しない
+            vwap = min(vwap, price) if side == "BUY" else max(vwap, price)
+        slippage = abs(vwap - mid) / mid * 10000
+        if slippage > self.max_slippage_bps:
+            return (
+                f"slippage {slippage:.1f}bps exceeds "
+                f"{self.max_slippage_bps}bps (vwap {vwap:.0f}, mid {mid:.0f})"
+            )
+        return None
 
     def execute_order(self, function_call):
         """
@@ -111,13 +396,137 @@ class Actions:
             price = float(f"{price:.8f}")
             size = float(f"{size:.8f}")
 
-            self.bitflyer_client.send_order(
-                "BTC_JPY", side, size, order_type, time_in_force, price
+            # 板の厚みが足りない、または仲値から大きく乖離する場合は発注しない
+            if self.order_book_enabled:
+                try:
+                    reason = self.check_order(side, size, order_type, price)
+                except APIError as e:
+                    logger.warning("Pre-trade check skipped: %s", e)
+                    reason = None
+                if reason is not None:
+                    logger.warning(
+                        "[order] Order not executed, "
+                        "pre-trade check failed: %s",
+                        reason,
+                    )
+                    return
+
+            result = self.bitflyer_client.send_order(
+                self.product_code,
+                side,
+                size,
+                order_type,
+                time_in_force,
+                price,
+            )
+            if not result:
+                return None
+
+            # 受付IDで注文の状態を追跡する
+            acceptance_id = result["child_order_acceptance_id"]
+            self.order_tracker.on_sent(
+                acceptance_id,
+                self.product_code,
+                side=side,
+                size=size,
+                price=price,
+                child_order_type=order_type,
             )
+            return acceptance_id
         except Exception as inner_exception:
             logger.error("Failed to execute order: %s", inner_exception)
             raise
 
+    # 特殊注文の実行
+    def execute_parent_order(self, function_call):
+        """
+        エントリーと決済の注文を特殊注文として一度に発注する
+        """
+        try:
+            params = function_call.arguments
+            order_method = params["order_method"]
+            orders = params["orders"]
+            time_in_force = params.get("time_in_force") or "GTC"
+
+            # ログに出力
+            logger.info(
+                "[parent_order] Trading decision: %s / orders: %s / "
+                "time_in_force: %s",
+                order_method,
+                orders,
+                time_in_force,
+            )
+
+            # 引数のチェック
+            count = PARENT_ORDER_COUNTS.get(order_method)
+            if count is None or len(orders) != count:
+                logger.warning(
+                    "Invalid parent order: %s requires %s orders, got %d",
+                    order_method,
+                    count,
+                    len(orders),
+                )
+                return None
+
+            parameters = []
+            for order in orders:
+                # 数値を通常の小数点表記に変換
+                size = float(f"{order['size']:.8f}")
+                if size < 0.0001:
+                    logger.info(
+                        "Order size %s is below the minimum threshold. "
+                        "Order not executed.",
+                        size,
+                    )
+                    return None
+                parameter = {
+                    "product_code": self.product_code,
+                    "condition_type": order["condition_type"],
+                    "side": order["side"],
+                    "size": size,
+                }
+                for key in ("price", "trigger_price"):
+                    if order.get(key):
+                        parameter[key] = float(f"{order[key]:.8f}")
+                parameters.append(parameter)
+
+            # 最初の注文が即時に約定する場合は板を確認する
+            entry = parameters[0]
+            if self.order_book_enabled and entry["condition_type"] in (
+                "LIMIT",
+                "MARKET",
+            ):
+                try:
+                    reason = self.check_order(
+                        entry["side"],
+                        entry["size"],
+                        entry["condition_type"],
+                        entry.get("price", 0),
+                    )
+                except APIError as e:
+                    logger.warning("Pre-trade check skipped: %s", e)
+                    reason = None
+                if reason is not None:
+                    logger.warning(
+                        "[parent_order] Order not executed, "
+                        "pre-trade check failed: %s",
+                        reason,
+                    )
+                    return None
+
+            result = self.bitflyer_client.send_parent_order(
+                order_method,
+                parameters,
+                minute_to_expire=self.parent_order_expire,
+                time_in_force=time_in_force,
+            )
+            acceptance_id = result["parent_order_acceptance_id"]
+            logger.info("[parent_order] Accepted: %s", acceptance_id)
+            return acceptance_id
+        except Exception as inner_exception:
+            logger.error("Failed to execute parent order: %s", inner_exception)
+            raise
+
     # 注文のキャンセル
     def cancel_order(self, function_call):
         """
@@ -129,7 +538,9 @@ class Actions:
 
             logger.info("[cancel] Cancel order: %s", order_id)
 
-            self.bitflyer_client.cancel_order(order_id)
+            self.order_tracker.request_cancel(order_id, self.product_code)
+            self.bitflyer_client.cancel_order(order_id, self.product_code)
+            return order_id
         except Exception:
             logger.error("Failed to cancel order: %s", traceback.format_exc())
             raise
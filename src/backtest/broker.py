@@ -0,0 +1,283 @@
+"""
+Simulated broker
+"""
+
+import math
+from datetime import datetime, timezone
+import numpy as np
+from src.logger_setup import get_logger
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# 最小注文数量（Actions.execute_orderと同じ）
+MIN_ORDER_SIZE = 0.0001
+
+
+def format_time(timestamp):
+    """
+    UNIX時刻をbitFlyerと同じ形式の文字列に変換する
+    """
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%S"
+    )
+
+
+class SimulatedBroker:
+    """
+    過去の足に対して注文の約定をシミュレーションする
+    """
+
+    def __init__(
+        self,
+        initial_jpy=100000,
+        initial_btc=0.0,
+        commission_rate=0.0015,
+        slippage_rate=0.0,
+        minute_to_expire=30,
+        product_code="BTC_JPY",
+    ):
+        self.jpy = float(initial_jpy)
+        self.btc = float(initial_btc)
+        self.commission_rate = commission_rate
+        self.slippage_rate = slippage_rate
+        self.minute_to_expire = minute_to_expire
+        self.product_code = product_code
+
+        # 注文中の数量（残高の拘束分）
+        self.reserved_jpy = 0.0
+        self.reserved_btc = 0.0
+
+        self.orders = {}
+        self.executions = []
+        self.order_count = 0
+        self.stats = {
+            "ordered": 0,
+            "rejected": 0,
+            "filled": 0,
+            "cancelled": 0,
+            "expired": 0,
+        }
+
+        # 現在のシミュレーション時刻と価格
+        self.now = None
+        self.price = None
+
+    def set_market(self, now, price):
+        """
+        判断時点の時刻と価格を設定する
+        """
+        self.now = int(now)
+        self.price = float(price)
+
+    def get_portfolio(self):
+        """
+        get_balanceと同じ形式の残高を返す
+        """
+        timestamp = format_time(self.now) + ".000000Z"
+        return [
+            {
+                "currency_code": "JPY",
+                "amount": self.jpy,
+                "available": self.jpy - self.reserved_jpy,
+                "timestamp": timestamp,
+            },
+            {
+                "currency_code": "BTC",
+                "amount": self.btc,
+                "available": self.btc - self.reserved_btc,
+                "timestamp": timestamp,
+            },
+        ]
+
+    def get_open_orders(self):
+        """
+        getchildordersと同じ形式の未約定注文を返す
+        """
+        return [
+            {
+                key: value
+                for key, value in order.items()
+                if not key.startswith("_")
+            }
+            for order in self.orders.values()
+        ]
+
+    def execute_order(self, function_call):
+        """
+        注文を受け付ける（Actions.execute_orderと同じ引数）
+        """
+        params = function_call.arguments
+        side = params["side"]
+        price = params.get("price", None)
+        size = float(params["size"])
+        order_type = params["order_type"]
+        time_in_force = params.get("time_in_force", None) or "GTC"
+
+        if size < MIN_ORDER_SIZE or (order_type == "LIMIT" and not price):
+            self.stats["rejected"] += 1
+            return None
+
+        # 残高が不足する注文は取引所と同様に拒否する
+        reserve_price = price if order_type == "LIMIT" else self.price
+        if side == "BUY":
+            required = reserve_price * size * (1 + self.slippage_rate)
+            if required > self.jpy - self.reserved_jpy:
+                self.stats["rejected"] += 1
+                return None
+            self.reserved_jpy += required
+        else:
+            required = size
+            if required > self.btc - self.reserved_btc:
+                self.stats["rejected"] += 1
+                return None
+            self.reserved_btc += required
+
+        self.order_count += 1
+        order_id = f"SIM{self.order_count:010d}"
+        expires_at = self.now + self.minute_to_expire * 60
+        self.orders[order_id] = {
+            "child_order_acceptance_id": order_id,
+            "product_code": self.product_code,
+            "side": side,
+            "child_order_type": order_type,
+            "price": float(price) if order_type == "LIMIT" else 0,
+            "size": size,
+            "child_order_state": "ACTIVE",
+            "expire_date": format_time(expires_at),
+            "child_order_date": format_time(self.now),
+            "outstanding_size": size,
+            "executed_size": 0.0,
+            "time_in_force": time_in_force,
+            "_placed_at": self.now,
+            "_expires_at": expires_at,
+            "_reserved": required,
+        }
+        self.stats["ordered"] += 1
+        return {"child_order_acceptance_id": order_id}
+
+    def cancel_order(self, function_call):
+        """
+        注文を取り消す（Actions.cancel_orderと同じ引数）
+        """
+        order_id = function_call.arguments["order_id"]
+        if order_id in self.orders:
+            self._close(order_id, "cancelled")
+
+    def _close(self, order_id, reason):
+        order = self.orders.pop(order_id)
+        if order["side"] == "BUY":
+            self.reserved_jpy -= order["_reserved"]
+        else:
+            self.reserved_btc -= order["_reserved"]
+        self.stats[reason] += 1
+
+    def _fill(self, order_id, price, timestamp, size=None):
+        order = self.orders[order_id]
+        if size is None:
+            size = order["size"]
+        commission = size * self.commission_rate
+
+        # 手数料はBTCで差し引く
+        if order["side"] == "BUY":
+            self.jpy -= price * size
+            self.btc += size - commission
+        else:
+            self.btc -= size
+            self.jpy += price * (size - commission)
+
+        self.executions.append(
+            {
+                "id": len(self.executions) + 1,
+                "side": order["side"],
+                "price": price,
+                "size": size,
+                "exec_date": format_time(timestamp),
+                "commission": commission,
+                "child_order_acceptance_id": order_id,
+            }
+        )
+        self._close(order_id, "filled")
+
+    def process_bars(self, times, opens, highs, lows):
+        """
+        判断から次の判断までの1分足で約定・失効を処理する
+        """
+        if not len(times):
+            return
+
+        for order_id in list(self.orders):
+            order = self.orders[order_id]
+            side = order["side"]
+
+            # 注文時刻より後かつ有効期限内の足のみを対象にする
+            start = int(np.searchsorted(times, order["_placed_at"], "left"))
+            end = int(np.searchsorted(times, order["_expires_at"], "left"))
+            if start >= len(times):
+                continue
+
+            if order["child_order_type"] == "MARKET":
+                # 次の足の始値で約定させる
+                slippage = 1 + self.slippage_rate
+                price = opens[start] * (
+                    slippage if side == "BUY" else 2 - slippage
+                )
+
+                # 始値が判断時点より高い場合は拘束した金額の範囲で約定させる
+                size = order["size"]
+                if side == "BUY" and price * size > order["_reserved"]:
+                    size = math.floor(order["_reserved"] / price * 1e8) / 1e8
+                    if size < MIN_ORDER_SIZE:
+                        self._close(order_id, "cancelled")
+                        continue
+                self._fill(order_id, price, times[start], size)
+                continue
+
+            limit = order["price"]
+            if order["time_in_force"] in ("IOC", "FOK"):
+                # 板に残らない注文は次の足の始値で約定可否を判定する
+                crossed = (
+                    opens[start] <= limit
+                    if side == "BUY"
+                    else opens[start] >= limit
+                )
+                if crossed:
+                    self._fill(order_id, opens[start], times[start])
+                else:
+                    self._close(order_id, "cancelled")
+                continue
+
+            if end > start:
+                if side == "BUY":
+                    touched = lows[start:end] <= limit
+                else:
+                    touched = highs[start:end] >= limit
+                if touched.any():
+                    index = start + int(np.argmax(touched))
+                    # 始値が指値より有利な場合は始値で約定する
+                    if side == "BUY":
+                        price = min(limit, opens[index])
+                    else:
+                        price = max(limit, opens[index])
+                    self._fill(order_id, price, times[index])
+                    continue
+
+            if end < len(times):
+                self._close(order_id, "expired")
+
+    def apply(self, decision):
+        """
+        売買判断を反映する（main.perform_trading_actionsと同じ分岐）
+        """
+        if not hasattr(decision, "type") or decision.type != "function":
+            return None
+
+        function_name = decision.function.name
+        if function_name == "order":
+            self.execute_order(decision)
+        elif function_name == "cancel":
+            self.cancel_order(decision)
+        elif function_name == "cancel_and_order":
+            self.cancel_order(decision)
+            self.execute_order(decision)
+        return function_name
@@ -0,0 +1,255 @@
+"""
+Backtest engine
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from src.actions import MarketData
+from src.backtest.broker import SimulatedBroker, format_time
+from src.cryptocompare.indicators import SIGNAL_COLUMNS
+from src.cryptocompare.trading_signals import (
+    calculate_indicators,
+    resample_bars,
+)
+from src.logger_setup import get_logger
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# 5分足の長さ（秒）
+BAR_SECONDS = 300
+
+
+def load_minute_bars(store, start=None, end=None):
+    """
+    CandleStoreから1分足のデータフレームを読み込む
+    """
+    columns = store.range(start, end)
+    return pd.DataFrame({name: np.asarray(v) for name, v in columns.items()})
+
+
+class BacktestContext:
+    """
+    判断時点のマーケットデータ（参照時にのみ作成する）
+    """
+
+    def __init__(self, backtester, position, now):
+        self.backtester = backtester
+        self.position = position
+        self.now = now
+
+    @property
+    def signals(self):
+        """
+        get_signalsと同じ形式の直近50期間のシグナル
+        """
+        return self.backtester.get_signal_window(self.position)
+
+    def recent(self, column, count=1):
+        """
+        指定したシグナルの直近の値をNumPy配列で返す（高速な参照用）
+        """
+        return self.backtester.get_signal_values(self.position, column, count)
+
+    @property
+    def ticker_data(self):
+        """
+        getticker相当のデータ（直近の終値から作成）
+        """
+        price = self.backtester.broker.price
+        return {
+            "product_code": self.backtester.broker.product_code,
+            "state": "RUNNING",
+            "timestamp": format_time(self.now),
+            "best_bid": price,
+            "best_ask": price,
+            "ltp": price,
+        }
+
+    @property
+    def portfolio_data(self):
+        """
+        MarketDataと同じ処理を行った残高
+        """
+        return MarketData.process_currency_data(
+            self.backtester.broker.get_portfolio()
+        )
+
+    @property
+    def open_orders(self):
+        """
+        未約定の注文
+        """
+        return self.backtester.broker.get_open_orders()
+
+    @property
+    def execution_data(self):
+        """
+        get_execution_historyと同じ形式の直近15件の約定履歴
+        """
+        executions = self.backtester.broker.executions[-15:][::-1]
+        df = pd.DataFrame(
+            executions,
+            columns=["id", "side", "price", "size", "exec_date", "commission"],
+        )
+        df["exec_date"] = pd.to_datetime(df["exec_date"])
+        return df
+
+
+class Backtester:
+    """
+    過去の1分足で売買判断と約定をシミュレーションする
+    """
+
+    def __init__(
+        self,
+        minute_bars,
+        decide,
+        trading_interval=300,
+        signal_rows=50,
+        **broker_options,
+    ):
+        if trading_interval % BAR_SECONDS:
+            raise ValueError("trading_interval must be a multiple of 300")
+
+        self.decide = decide
+        self.trading_interval = trading_interval
+        self.signal_rows = signal_rows
+        self.broker = SimulatedBroker(**broker_options)
+
+        minute_bars = minute_bars.sort_values("time")
+        self.times = minute_bars["time"].to_numpy(dtype=np.int64)
+        self.opens = minute_bars["open"].to_numpy(dtype=np.float64)
+        self.highs = minute_bars["high"].to_numpy(dtype=np.float64)
+        self.lows = minute_bars["low"].to_numpy(dtype=np.float64)
+
+        # 全期間の指標をまとめて計算する
+        self.signals = calculate_indicators(resample_bars(minute_bars))
+        self.signal_frame = self.signals[SIGNAL_COLUMNS]
+        self.valid_rows = np.flatnonzero(
+            self.signal_frame.notna().all(axis=1).to_numpy()
+        )
+        self.signal_values = {
+            column: self.signal_frame[column].to_numpy()
+            for column in SIGNAL_COLUMNS
+        }
+        if not len(self.valid_rows):
+            raise ValueError("Not enough data to calculate signals")
+
+    def get_signal_window(self, position):
+        """
+        指定した5分足までの直近のシグナルを返す
+        """
+        rows = self._get_rows(position, self.signal_rows)
+
+        # 欠損のない連続した範囲はスライスで取得する
+        if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+            return self.signal_frame.iloc[rows[0] : rows[-1] + 1]
+        return self.signal_frame.iloc[rows]
+
+    def get_signal_values(self, position, column, count):
+        """
+        指定した5分足までの直近のシグナルの値を返す
+        """
+        return self.signal_values[column][self._get_rows(position, count)]
+
+    def _get_rows(self, position, count):
+        end = int(np.searchsorted(self.valid_rows, position, "right"))
+        return self.valid_rows[max(end - count, 0) : end]
+
+    def run(self):
+        """
+        バックテストを実行する
+        """
+        started = time.perf_counter()
+
+        # 5分足の確定時刻を判断時刻とする
+        bar_starts = (
+            (self.signals["timestamp"] - pd.Timestamp(0))
+            // pd.Timedelta(seconds=1)
+        ).to_numpy(dtype=np.int64)
+        decision_times = bar_starts + BAR_SECONDS
+        closes = self.signals["close"].to_numpy(dtype=np.float64)
+
+        step = self.trading_interval // BAR_SECONDS
+        positions = np.arange(0, len(decision_times), step)
+        positions = positions[positions >= self.valid_rows[0]]
+
+        # 判断ごとの1分足の範囲を一括で求める
+        boundaries = np.searchsorted(self.times, decision_times[positions])
+        boundaries = np.append(boundaries, len(self.times))
+
+        initial_equity = (
+            self.broker.jpy + self.broker.btc * closes[positions[0]]
+        )
+        equity = np.empty(len(positions))
+        decisions = {}
+        for i, position in enumerate(positions):
+            now = decision_times[position]
+            self.broker.set_market(now, closes[position])
+
+            context = BacktestContext(self, position, now)
+            function_name = self.broker.apply(self.decide(context))
+            decisions[function_name] = decisions.get(function_name, 0) + 1
+
+            left, right = boundaries[i], boundaries[i + 1]
+            self.broker.process_bars(
+                self.times[left:right],
+                self.opens[left:right],
+                self.highs[left:right],
+                self.lows[left:right],
+            )
+            equity[i] = self.broker.jpy + self.broker.btc * closes[position]
+
+        return BacktestResult(
+            pd.DataFrame(
+                {
+                    "timestamp": pd.to_datetime(
+                        decision_times[positions], unit="s"
+                    ),
+                    "close": closes[positions],
+                    "equity": equity,
+                }
+            ),
+            pd.DataFrame(self.broker.executions),
+            dict(self.broker.stats, decisions=decisions),
+            initial_equity,
+            time.perf_counter() - started,
+        )
+
+
+class BacktestResult:
+    """
+    バックテストの結果
+    """
+
+    def __init__(self, equity, executions, stats, initial_equity, elapsed):
+        self.equity = equity
+        self.executions = executions
+        self.stats = stats
+        self.initial_equity = initial_equity
+        self.elapsed = elapsed
+
+    def summary(self):
+        """
+        損益やドローダウンなどの集計を返す
+        """
+        if self.equity.empty:
+            return dict(self.stats, elapsed=round(self.elapsed, 3))
+
+        values = self.equity["equity"].to_numpy()
+        peak = np.maximum.accumulate(values)
+        drawdown = (peak - values) / peak
+        return dict(
+            self.stats,
+            start=str(self.equity["timestamp"].iloc[0]),
+            end=str(self.equity["timestamp"].iloc[-1]),
+            initial_equity=round(float(self.initial_equity), 2),
+            final_equity=round(float(values[-1]), 2),
+            return_pct=round(
+                float(values[-1] / self.initial_equity - 1) * 100, 4
+            ),
+            max_drawdown_pct=round(float(drawdown.max()) * 100, 4),
+            elapsed=round(self.elapsed, 3),
+        )
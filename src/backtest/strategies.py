@@ -0,0 +1,52 @@
+"""
+Backtest strategies
+"""
+
+import math
+from src.openai.decision_cache import make_decision
+
+# 最小注文数量
+MIN_SIZE = 0.001
+
+
+def moving_average_crossover(context):
+    """
+    短期・長期移動平均のクロスで成行注文を出すサンプル戦略
+    """
+    signal = context.recent("Signal", 2)
+    if len(signal) < 2:
+        return make_decision("hold", {})
+
+    previous, current = signal
+    jpy, btc = context.portfolio_data
+
+    # 注文可能な数量（0.0001 BTC単位で切り捨て）
+    buy_size = (
+        math.floor(jpy["available"] / context.ticker_data["ltp"] * 1e4) / 1e4
+    )
+    sell_size = math.floor(btc["available"] * 1e4) / 1e4
+
+    # ゴールデンクロスで買い、デッドクロスで売る
+    if previous < 0 < current and buy_size >= MIN_SIZE:
+        return make_decision(
+            "order",
+            {
+                "side": "BUY",
+                "price": 0,
+                "size": buy_size,
+                "order_type": "MARKET",
+                "time_in_force": "GTC",
+            },
+        )
+    if previous > 0 > current and sell_size >= MIN_SIZE:
+        return make_decision(
+            "order",
+            {
+                "side": "SELL",
+                "price": 0,
+                "size": sell_size,
+                "order_type": "MARKET",
+                "time_in_force": "GTC",
+            },
+        )
+    return make_decision("hold", {})
@@ -6,8 +6,24 @@ import json
 import hmac
 import hashlib
 import time
-import requests
+from src.lazy_import import lazy_import
 from src.custom_errors import APIError
+from src.metrics import get_metrics
+from src.bitflyer.rate_limiter import RateLimiter
+
+# メトリクスの取得
+metrics = get_metrics()
+
+# セッションの作成時に読み込む
+requests = lazy_import("requests")
+adapters = lazy_import("requests.adapters")
+urllib3_retry = lazy_import("urllib3.util.retry")
+
+# リトライ対象のステータスコード
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# デフォルトのタイムアウト（秒）
+DEFAULT_TIMEOUT = 10
 
 
 class BitflyerClient:
@@ -15,15 +31,124 @@ class BitflyerClient:
     bitFlyerのAPIクライアント
     """
 
-    def __init__(self, api_key, api_secret):
+    def __init__(
+        self,
+        api_key,
+        api_secret,
+        base_url="https://api.bitflyer.jp",
+        pool_size=10,
+        max_retries=3,
+        backoff_factor=0.5,
+        timeouts=None,
+        rate_limits=None,
+        rate_limit_max_wait=30,
+        rate_limit_enabled=True,
+    ):
         self.api_key = api_key
         self.api_secret = api_secret
-        self.base_url = "https://api.bitflyer.jp"
+        self.base_url = base_url
+
+        # エンドポイントごとのタイムアウト（"default"は共通値）
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = self.timeouts.pop("default", DEFAULT_TIMEOUT)
+
+        # Keep-Aliveで接続を使い回すセッションを作成
+        self.session, self.adapter = self._create_session(
+            pool_size, max_retries, backoff_factor
+        )
+        self.request_count = 0
+
+        # public・private・注文のバケットごとに送信を制御する
+        self.rate_limiter = (
+            RateLimiter(rate_limits, max_wait=rate_limit_max_wait)
+            if rate_limit_enabled
+            else None
+        )
+
+    def _create_session(self, pool_size, max_retries, backoff_factor):
+        # 429/5xxと接続エラーは指数バックオフでリトライする
+        # 注文の二重送信を避けるため、ステータスと読み込みエラーの
+        # リトライはGETのみに限定する
+        retry = urllib3_retry.Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = adapters.HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session, adapter
+
+    def get_timeout(self, endpoint):
+        """
+        エンドポイントのタイムアウトを取得する
+        """
+        return self.timeouts.get(endpoint, self.default_timeout)
+
+    def get_connection_stats(self):
+        """
+        接続の再利用状況を取得する
+        """
+        connections = 0
+        pool_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            pool_requests += pool.num_requests
+
+        # 新規接続以外のリクエストは既存の接続を再利用している
+        reused = max(pool_requests - connections, 0)
+        return {
+            "requests": self.request_count,
+            "connections": connections,
+            "reused": reused,
+            "reuse_ratio": (
+                round(reused / pool_requests, 3) if pool_requests else 0.0
+            ),
+        }
+
+    def get_rate_limit_stats(self):
+        """
+        レート制限による待機状況を取得する
+        """
+        if self.rate_limiter is None:
+            return {}
+        return self.rate_limiter.get_stats()
+
+    def close(self):
+        """
+        セッションを閉じる
+        """
+        self.session.close()
 
     def make_request(self, method, endpoint, params=None, data=None):
         """
         APIリクエストを送信する
         """
+        # 署名の時刻が古くならないよう送信枠を確保してから署名する
+        if self.rate_limiter is not None:
+            waited = self.rate_limiter.acquire(endpoint)
+            if waited > 0:
+                metrics.observe(
+                    "bitflyer_rate_limit_wait_seconds",
+                    waited,
+                    endpoint=endpoint,
+                )
+
         url = f"{self.base_url}{endpoint}"
         timestamp = str(int(time.time()))
         if params:
@@ -47,11 +172,57 @@ class BitflyerClient:
             "Content-Type": "application/json",
         }
 
-        response = requests.request(
-            method, url, headers=headers, params=params, data=body, timeout=10
+        self.request_count += 1
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method,
+                url,
+                headers=headers,
+                params=params,
+                data=body,
+                timeout=self.get_timeout(endpoint),
+            )
+        except requests.RequestException as e:
+            metrics.inc(
+                "bitflyer_request_errors_total",
+                endpoint=endpoint,
+                reason="connection",
+            )
+            raise APIError(
+                "API connection error: "
+                f"method={method}, "
+                f"endpoint={endpoint}, "
+                f"params={params}, "
+                f"data={data}, "
+                f"error={e}"
+            ) from e
+
+        metrics.observe(
+            "bitflyer_request_seconds",
+            time.perf_counter() - started,
+            endpoint=endpoint,
+            method=method,
         )
 
+        retries = getattr(response.raw, "retries", None)
+        retry_count = len(retries.history) if retries is not None else 0
+        if retry_count:
+            metrics.inc(
+                "bitflyer_request_retries_total",
+                retry_count,
+                endpoint=endpoint,
+            )
+        if self.rate_limiter is not None:
+            self.rate_limiter.record_retries(endpoint, retry_count)
+            self.rate_limiter.update_from_headers(endpoint, response.headers)
+
         if response.status_code != 200:
+            metrics.inc(
+                "bitflyer_request_errors_total",
+                endpoint=endpoint,
+                reason=str(response.status_code),
+            )
             raise APIError(
                 "API request error: "
                 f"method={method}, "
@@ -0,0 +1,229 @@
+"""
+L2 order book
+"""
+
+from bisect import bisect_left, bisect_right, insort
+
+
+class OrderBook:
+    """
+    価格ごとの数量を保持する板（スレッドセーフではない）
+
+    価格は昇順の配列、数量は価格をキーとする辞書で保持する
+    買い板の最良気配は配列の末尾、売り板の最良気配は先頭になる
+    既存の価格の数量更新はO(1)だが、価格の追加・削除は二分探索の後に
+    配列をずらすためO(n)になる（nは片側の価格数）
+    """
+
+    def __init__(self, board=None):
+        self.bid_prices = []
+        self.ask_prices = []
+        self.bid_sizes = {}
+        self.ask_sizes = {}
+        self.mid_price = None
+        self.updates = 0
+        if board is not None:
+            self.apply_snapshot(board)
+
+    def _side(self, side):
+        if side in ("bid", "bids"):
+            return self.bid_prices, self.bid_sizes
+        if side in ("ask", "asks"):
+            return self.ask_prices, self.ask_sizes
+        raise ValueError(f"Invalid side: {side}")
+
+    def apply_snapshot(self, board):
+        """
+        getboardと同じ形式のスナップショットで置き換える
+        """
+        self.bid_sizes = {
+            b["price"]: b["size"] for b in board["bids"] if b["size"]
+        }
+        self.ask_sizes = {
+            a["price"]: a["size"] for a in board["asks"] if a["size"]
+        }
+        self.bid_prices = sorted(self.bid_sizes)
+        self.ask_prices = sorted(self.ask_sizes)
+        self.mid_price = board.get("mid_price", self.mid_price)
+        self.updates += 1
+
+    def apply_diff(self, board):
+        """
+        板の差分を反映する（数量0は削除）
+        """
+        self.mid_price = board.get("mid_price", self.mid_price)
+        for level in board.get("bids", []):
+            self.update("bid", level["price"], level["size"])
+        for level in board.get("asks", []):
+            self.update("ask", level["price"], level["size"])
+
+    def update(self, side, price, size):
+        """
+        1つの価格の数量を更新する
+
+        新しい価格の挿入と数量0による削除は配列の移動を伴うO(n)
+        """
+        prices, sizes = self._side(side)
+        if size:
+            if price not in sizes:
+                insort(prices, price)
+            sizes[price] = size
+        elif price in sizes:
+            del sizes[price]
+            del prices[bisect_left(prices, price)]
+        self.updates += 1
+
+    def best_bid(self):
+        """
+        買いの最良気配（価格, 数量）を返す
+        """
+        if not self.bid_prices:
+            return None
+        price = self.bid_prices[-1]
+        return price, self.bid_sizes[price]
+
+    def best_ask(self):
+        """
+        売りの最良気配（価格, 数量）を返す
+        """
+        if not self.ask_prices:
+            return None
+        price = self.ask_prices[0]
+        return price, self.ask_sizes[price]
+
+    def spread(self):
+        """
+        最良気配の価格差を返す
+        """
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return ask[0] - bid[0]
+
+    def mid(self):
+        """
+        最良気配の仲値を返す（片側がない場合は受信した仲値）
+        """
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return self.mid_price
+        return (bid[0] + ask[0]) / 2
+
+    def depth_at(self, side, price):
+        """
+        指定した価格の数量を返す
+        """
+        return self._side(side)[1].get(price, 0.0)
+
+    def depth_to(self, side, price):
+        """
+        最良気配から指定した価格までの数量の合計を返す
+        """
+        prices, sizes = self._side(side)
+        if prices is self.bid_prices:
+            levels = prices[bisect_left(prices, price) :]
+        else:
+            levels = prices[: bisect_right(prices, price)]
+        return sum(sizes[p] for p in levels)
+
+    def iter_levels(self, side):
+        """
+        最良気配から順に（価格, 数量）を返す
+        """
+        prices, sizes = self._side(side)
+        ordered = reversed(prices) if prices is self.bid_prices else prices
+        for price in ordered:
+            yield price, sizes[price]
+
+    def levels(self, side, depth=None):
+        """
+        最良気配から順にdepth件の（価格, 数量）のリストを返す
+        """
+        result = []
+        for level in self.iter_levels(side):
+            if depth is not None and len(result) >= depth:
+                break
+            result.append(level)
+        return result
+
+    def vwap(self, side, size):
+        """
+        成行でsizeを約定させた場合の平均価格・約定数量・最も不利な価格を返す
+
+        sideは注文の売買方向（BUYは売り板、SELLは買い板を消費する）
+        """
+        book_side = "ask" if side == "BUY" else "bid"
+        remaining = size
+        notional = 0.0
+        worst = None
+        for price, level_size in self.iter_levels(book_side):
+            if remaining <= 0:
+                break
+            taken = min(level_size, remaining)
+            notional += price * taken
+            remaining -= taken
+            worst = price
+        filled = size - max(remaining, 0)
+        if not filled:
+            return None, 0.0, None
+        return notional / filled, filled, worst
+
+    def to_board(self, depth=None):
+        """
+        getboardと同じ形式で返す
+        """
+        return {
+            "mid_price": self.mid_price,
+            "bids": [
+                {"price": p, "size": s} for p, s in self.levels("bid", depth)
+            ],
+            "asks": [
+                {"price": p, "size": s} for p, s in self.levels("ask", depth)
+            ],
+        }
+
+    def summary(self, sizes=(0.01, 0.1, 1.0), bands_bps=(10, 50)):
+        """
+        プロンプトと注文前のチェックに使用する板の要約を返す
+        """
+        bid, ask = self.best_bid(), self.best_ask()
+        mid = self.mid()
+        result = {
+            "best_bid": bid[0] if bid else None,
+            "best_bid_size": bid[1] if bid else None,
+            "best_ask": ask[0] if ask else None,
+            "best_ask_size": ask[1] if ask else None,
+            "spread": self.spread(),
+            "spread_bps": (
+                round(self.spread() / mid * 10000, 2)
+                if bid and ask and mid
+                else None
+            ),
+            "mid_price": mid,
+        }
+        if not mid:
+            return result
+
+        # 仲値から一定の範囲にある数量と買い・売りの偏り
+        for band in bands_bps:
+            bid_depth = self.depth_to("bid", mid * (1 - band / 10000))
+            ask_depth = self.depth_to("ask", mid * (1 + band / 10000))
+            total = bid_depth + ask_depth
+            result[f"bid_depth_{band}bps"] = round(bid_depth, 8)
+            result[f"ask_depth_{band}bps"] = round(ask_depth, 8)
+            result[f"imbalance_{band}bps"] = (
+                round((bid_depth - ask_depth) / total, 3) if total else None
+            )
+
+        # 数量ごとの成行の平均価格と仲値からの乖離
+        for size in sizes:
+            for side in ("BUY", "SELL"):
+                price, filled, _ = self.vwap(side, size)
+                key = f"{side.lower()}_vwap_{size:g}"
+                result[key] = round(price, 2) if price is not None else None
+                result[f"{key}_bps"] = (
+                    round(abs(price - mid) / mid * 10000, 2)
+                    if price is not None and filled >= size
+                    else None
+                )
+        return result
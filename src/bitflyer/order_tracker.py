@@ -0,0 +1,269 @@
+"""
+Order lifecycle tracker
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from src.custom_errors import APIError
+from src.logger_setup import get_logger
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# 注文の状態（SENTは送信済みで取引所での受付を確認していない状態）
+SENT = "SENT"
+ACTIVE = "ACTIVE"
+PARTIALLY_FILLED = "PARTIALLY_FILLED"
+COMPLETED = "COMPLETED"
+CANCELED = "CANCELED"
+EXPIRED = "EXPIRED"
+REJECTED = "REJECTED"
+
+# 状態の順序（前の状態には戻らない）
+STATE_ORDER = {
+    SENT: 0,
+    ACTIVE: 1,
+    PARTIALLY_FILLED: 2,
+    COMPLETED: 3,
+    CANCELED: 3,
+    EXPIRED: 3,
+    REJECTED: 3,
+}
+TERMINAL_STATES = frozenset([COMPLETED, CANCELED, EXPIRED, REJECTED])
+
+
+def parse_child_order(order):
+    """
+    getchildordersの注文から状態と約定数量を取り出す
+    """
+    state = order["child_order_state"]
+    executed_size = order.get("executed_size") or 0.0
+    if state == ACTIVE and executed_size > 0:
+        state = PARTIALLY_FILLED
+    return state, executed_size
+
+
+class TrackedOrder:
+    """
+    追跡中の注文
+    """
+
+    def __init__(self, acceptance_id, product_code, state, now, **details):
+        self.acceptance_id = acceptance_id
+        self.product_code = product_code
+        self.state = state
+        self.executed_size = 0.0
+        self.details = details
+        self.history = [(state, now)]
+        self.cancel_requested_at = None
+
+    @property
+    def terminal(self):
+        """
+        これ以上状態が変わらないかどうか
+        """
+        return self.state in TERMINAL_STATES
+
+    def to_dict(self):
+        """
+        状態と遷移の履歴を辞書で返す
+        """
+        return dict(
+            self.details,
+            child_order_acceptance_id=self.acceptance_id,
+            product_code=self.product_code,
+            state=self.state,
+            executed_size=self.executed_size,
+            history=list(self.history),
+        )
+
+
+class OrderTracker:
+    """
+    child_order_acceptance_idごとに注文の状態を管理する
+
+    取消の完了はgetchildordersを間隔を延ばしながら確認する
+    """
+
+    def __init__(
+        self,
+        bitflyer_client,
+        poll_interval=0.2,
+        max_poll_interval=2.0,
+        max_orders=1000,
+        clock=time.monotonic,
+    ):
+        self.bitflyer_client = bitflyer_client
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_orders = max_orders
+        self.clock = clock
+        self.condition = threading.Condition()
+        self.orders = OrderedDict()
+        self.latencies = {}
+
+    def _record_latency(self, name, seconds):
+        stats = self.latencies.setdefault(
+            name, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+        )
+        stats["count"] += 1
+        stats["total"] += seconds
+        stats["max"] = max(stats["max"], seconds)
+        stats["last"] = seconds
+
+    def _track(self, acceptance_id, product_code, state, **details):
+        order = self.orders.get(acceptance_id)
+        if order is None:
+            order = TrackedOrder(
+                acceptance_id, product_code, state, self.clock(), **details
+            )
+            self.orders[acceptance_id] = order
+
+            # 完了した古い注文から削除する
+            while len(self.orders) > self.max_orders:
+                oldest = next(
+                    (k for k, o in self.orders.items() if o.terminal), None
+                )
+                if oldest is None:
+                    break
+                del self.orders[oldest]
+        return order
+
+    def _transition(self, order, state, executed_size=None):
+        if executed_size is not None:
+            order.executed_size = executed_size
+        if order.terminal or state == order.state:
+            return False
+        if STATE_ORDER[state] < STATE_ORDER[order.state]:
+            return False
+
+        now = self.clock()
+        previous, since = order.history[-1]
+        order.history.append((state, now))
+        order.state = state
+        self._record_latency(f"{previous}->{state}", now - since)
+        if state == CANCELED and order.cancel_requested_at is not None:
+            self._record_latency("cancel", now - order.cancel_requested_at)
+        logger.info(
+            "Order %s: %s -> %s (%.3fs)",
+            order.acceptance_id,
+            previous,
+            state,
+            now - since,
+        )
+        self.condition.notify_all()
+        return True
+
+    def on_sent(self, acceptance_id, product_code, **details):
+        """
+        送信した注文を追跡する
+        """
+        with self.condition:
+            return self._track(acceptance_id, product_code, SENT, **details)
+
+    def request_cancel(self, acceptance_id, product_code):
+        """
+        取消の要求を記録する（追跡していない注文は受付済みとして扱う）
+        """
+        with self.condition:
+            order = self._track(acceptance_id, product_code, ACTIVE)
+            order.cancel_requested_at = self.clock()
+            return order
+
+    def update_from_orders(self, orders):
+        """
+        getchildordersの結果を追跡中の注文に反映する
+        """
+        updated = 0
+        with self.condition:
+            for child_order in orders:
+                order = self.orders.get(
+                    child_order.get("child_order_acceptance_id")
+                )
+                if order is None:
+                    continue
+                state, executed_size = parse_child_order(child_order)
+                if self._transition(order, state, executed_size):
+                    updated += 1
+        return updated
+
+    def refresh(self, acceptance_id):
+        """
+        注文を1件取得して状態を更新する
+        """
+        with self.condition:
+            order = self.orders.get(acceptance_id)
+        if order is None:
+            return None
+        child_orders = self.bitflyer_client.get_child_order(
+            acceptance_id, order.product_code
+        )
+        if child_orders:
+            self.update_from_orders(child_orders)
+        return order.state
+
+    def wait_for_terminal(self, acceptance_id, timeout=10):
+        """
+        注文が約定・取消・失効するまで待ち、最終的な状態を返す（期限切れはNone）
+        """
+        deadline = self.clock() + timeout
+        interval = self.poll_interval
+        while True:
+            try:
+                state = self.refresh(acceptance_id)
+            except APIError as e:
+                # 確認に失敗した場合は期限まで再試行する
+                logger.warning("Failed to check order state: %s", e)
+                order = self.get_order(acceptance_id)
+                state = order["state"] if order is not None else None
+            if state is None or state in TERMINAL_STATES:
+                return state
+
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                logger.warning(
+                    "Order %s still %s after %ss",
+                    acceptance_id,
+                    state,
+                    timeout,
+                )
+                return None
+
+            # 他の経路で状態が更新された場合はすぐに戻る
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self.orders.get(acceptance_id) is None
+                    or self.orders[acceptance_id].terminal,
+                    min(interval, remaining),
+                )
+            interval = min(interval * 2, self.max_poll_interval)
+
+    def get_order(self, acceptance_id):
+        """
+        追跡中の注文を返す
+        """
+        with self.condition:
+            order = self.orders.get(acceptance_id)
+            return order.to_dict() if order is not None else None
+
+    def get_stats(self):
+        """
+        状態の遷移ごとの所要時間を取得する
+        """
+        with self.condition:
+            states = {}
+            for order in self.orders.values():
+                states[order.state] = states.get(order.state, 0) + 1
+            return {
+                "orders": states,
+                "latencies": {
+                    name: {
+                        "count": stats["count"],
+                        "avg": round(stats["total"] / stats["count"], 3),
+                        "max": round(stats["max"], 3),
+                        "last": round(stats["last"], 3),
+                    }
+                    for name, stats in self.latencies.items()
+                },
+            }
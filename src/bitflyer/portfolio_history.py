@@ -0,0 +1,231 @@
+"""
+Portfolio history
+"""
+
+import os
+import json
+import gzip
+import glob
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from src.logger_setup import get_logger
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# fsyncのタイミング
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+class PortfolioHistory:
+    """
+    残高の履歴を日ごとのJSON Linesファイルに追記する
+    """
+
+    def __init__(
+        self,
+        log_dir,
+        fsync_policy="interval",
+        fsync_interval=60,
+        tail_size=1000,
+    ):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Invalid fsync policy: {fsync_policy}")
+
+        self.log_dir = log_dir
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.index_file = os.path.join(self.log_dir, "portfolio_index.json")
+
+        # 直近の履歴のみメモリに保持する
+        self.tail = deque(maxlen=tail_size)
+
+        self.lock = threading.Lock()
+        self.file = None
+        self.current_date = None
+        self.last_fsync = time.monotonic()
+
+        self._migrate_legacy_files()
+        self._open(self._today())
+        self._load_tail()
+
+    def _today(self):
+        return datetime.utcnow().strftime("%Y%m%d")
+
+    def _get_path(self, date):
+        return os.path.join(self.log_dir, f"portfolio_{date}.jsonl")
+
+    def _migrate_legacy_files(self):
+        # 旧形式（JSON配列）のファイルをJSON Linesに変換する
+        pattern = os.path.join(self.log_dir, "portfolio_*.json")
+        for legacy_file in glob.glob(pattern):
+            if legacy_file == self.index_file:
+                continue
+            date = os.path.basename(legacy_file)[len("portfolio_") : -5]
+            try:
+                with open(legacy_file, "r", encoding="utf-8") as file:
+                    records = json.load(file)
+            except (IOError, json.JSONDecodeError) as e:
+                logger.error("Failed to migrate %s: %s", legacy_file, e)
+                continue
+            with open(self._get_path(date), "a", encoding="utf-8") as file:
+                for record in records:
+                    file.write(self._dumps(record))
+            os.remove(legacy_file)
+
+    def _open(self, date):
+        if self.file is not None:
+            self._fsync()
+            self.file.close()
+
+        self.current_date = date
+        self.file = open(self._get_path(date), "a", encoding="utf-8")
+
+        # 前日までのファイルを圧縮して保管する
+        self._archive_old_files()
+
+    def _load_tail(self):
+        path = self._get_path(self.current_date)
+        with open(path, "r", encoding="utf-8") as file:
+            for record in self._read_lines(file):
+                self.tail.append(record)
+
+    def _read_lines(self, file):
+        for line in file:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # 書き込み途中で停止した行は読み飛ばす
+                continue
+
+    def _dumps(self, record):
+        return json.dumps(record, separators=(",", ":")) + "\n"
+
+    def _fsync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_fsync = time.monotonic()
+
+    def append(self, records):
+        """
+        履歴を追記する
+        """
+        with self.lock:
+            date = self._today()
+            if date != self.current_date:
+                self._open(date)
+
+            self.file.write("".join(self._dumps(r) for r in records))
+            self.file.flush()
+
+            if self.fsync_policy == "always" or (
+                self.fsync_policy == "interval"
+                and time.monotonic() - self.last_fsync >= self.fsync_interval
+            ):
+                self._fsync()
+
+            self.tail.extend(records)
+
+    def get_tail(self):
+        """
+        直近の履歴を返す
+        """
+        with self.lock:
+            return list(self.tail)
+
+    def close(self):
+        """
+        ファイルを閉じる
+        """
+        with self.lock:
+            if self.file is not None:
+                self._fsync()
+                self.file.close()
+                self.file = None
+
+    def _load_index(self):
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, "r", encoding="utf-8") as file:
+                    return json.load(file)
+            except (IOError, json.JSONDecodeError) as e:
+                logger.error("Failed to load portfolio index: %s", e)
+        return {}
+
+    def _save_index(self, index):
+        temp_file = self.index_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as file:
+            json.dump(index, file, indent=4, sort_keys=True)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, self.index_file)
+
+    def _archive_old_files(self):
+        pattern = os.path.join(self.log_dir, "portfolio_*.jsonl")
+        old_files = [
+            path
+            for path in sorted(glob.glob(pattern))
+            if path != self._get_path(self.current_date)
+        ]
+        if not old_files:
+            return
+
+        index = self._load_index()
+        for path in old_files:
+            date = os.path.basename(path)[len("portfolio_") : -6]
+            archive = f"{path}.gz"
+
+            first = last = None
+            count = 0
+            with open(path, "r", encoding="utf-8") as src, gzip.open(
+                archive, "wt", encoding="utf-8"
+            ) as dst:
+                for record in self._read_lines(src):
+                    dst.write(self._dumps(record))
+                    timestamp = record.get("timestamp")
+                    first = first or timestamp
+                    last = timestamp or last
+                    count += 1
+
+            index[date] = {
+                "file": os.path.basename(archive),
+                "first": first,
+                "last": last,
+                "count": count,
+            }
+            self._save_index(index)
+            os.remove(path)
+            logger.info("Archived portfolio history: %s", archive)
+
+    def read_range(self, start=None, end=None):
+        """
+        指定した期間の履歴を読み込む（ISO 8601形式の文字列で指定）
+        """
+        records = []
+
+        # インデックスで期間が重なるアーカイブのみを読み込む
+        index = self._load_index()
+        for date in sorted(index):
+            entry = index[date]
+            if start and entry["last"] and entry["last"] < start:
+                continue
+            if end and entry["first"] and entry["first"] > end:
+                continue
+            path = os.path.join(self.log_dir, entry["file"])
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                records.extend(self._read_lines(file))
+
+        with self.lock:
+            self.file.flush()
+            path = self._get_path(self.current_date)
+        with open(path, "r", encoding="utf-8") as file:
+            records.extend(self._read_lines(file))
+
+        return [
+            record
+            for record in records
+            if (not start or record.get("timestamp", "") >= start)
+            and (not end or record.get("timestamp", "") <= end)
+        ]
@@ -0,0 +1,276 @@
+"""
+Rate limiter for the bitFlyer API
+"""
+
+import time
+import itertools
+import threading
+from src.custom_errors import APIError
+from src.logger_setup import get_logger
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# bitFlyerの制限（期間あたりのリクエスト数）
+DEFAULT_RATE_LIMITS = {
+    "public": {"limit": 500, "period": 300},
+    "private": {"limit": 500, "period": 300},
+    "orders": {"limit": 300, "period": 300},
+}
+
+# 注文系のエンドポイント（privateとordersの両方を消費する）
+ORDER_ENDPOINTS = frozenset(
+    [
+        "/v1/me/sendchildorder",
+        "/v1/me/cancelchildorder",
+        "/v1/me/sendparentorder",
+        "/v1/me/cancelparentorder",
+        "/v1/me/cancelallchildorders",
+    ]
+)
+
+# 優先度（小さいほど先に実行する）
+PRIORITIES = {"orders": 0, "private": 1, "public": 2}
+
+# 制限の情報を返すヘッダー
+RATE_LIMIT_HEADERS = {
+    "X-RateLimit-Remaining": None,
+    "X-OrderRequest-RateLimit-Remaining": "orders",
+}
+
+
+def classify_endpoint(endpoint):
+    """
+    エンドポイントが消費するバケットと優先度を返す
+    """
+    if endpoint in ORDER_ENDPOINTS:
+        return ("private", "orders"), PRIORITIES["orders"]
+    if endpoint.startswith("/v1/me/"):
+        return ("private",), PRIORITIES["private"]
+    return ("public",), PRIORITIES["public"]
+
+
+class TokenBucket:
+    """
+    期間あたりのリクエスト数を一定の速度で補充するトークンバケット
+    """
+
+    def __init__(self, limit, period, clock=time.monotonic):
+        self.capacity = limit
+        self.rate = limit / period
+        self.clock = clock
+        self.tokens = float(limit)
+        self.updated = clock()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def wait_time(self, now):
+        """
+        トークンを1つ取得できるまでの秒数を返す
+        """
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now):
+        """
+        トークンを1つ消費する
+        """
+        self._refill(now)
+        self.tokens -= 1
+
+    def sync(self, remaining, reset_in, now):
+        """
+        サーバーが返した残数に合わせる
+        """
+        self._refill(now)
+        self.tokens = min(self.tokens, float(remaining))
+        if remaining <= 0 and reset_in is not None:
+            self.blocked_until = max(self.blocked_until, now + reset_in)
+
+
+class RateLimiter:
+    """
+    public・private・ordersのバケットで送信を制御する
+
+    待機中のリクエストは優先度の高い順（同じ優先度では到着順）に送信する
+    """
+
+    def __init__(self, rate_limits=None, max_wait=30, clock=time.monotonic):
+        limits = dict(DEFAULT_RATE_LIMITS)
+        limits.update(rate_limits or {})
+        self.clock = clock
+        self.max_wait = max_wait
+        self.buckets = {
+            name: TokenBucket(limit["limit"], limit["period"], clock)
+            for name, limit in limits.items()
+        }
+        self.condition = threading.Condition()
+        self.waiters = []
+        self.sequence = itertools.count()
+        self.stats = {
+            name: {
+                "requests": 0,
+                "retries": 0,
+                "waited": 0,
+                "total_wait": 0.0,
+                "max_wait": 0.0,
+                "remaining": None,
+            }
+            for name in self.buckets
+        }
+
+    def _blocked_by_priority(self, waiter):
+        # 同じバケットを使う優先度の高いリクエストが待っていれば譲る
+        _, buckets = waiter
+        return any(
+            other[0] < waiter[0] and not buckets.isdisjoint(other[1])
+            for other in self.waiters
+        )
+
+    def acquire(self, endpoint):
+        """
+        送信できるまで待機し、待機した秒数を返す
+        """
+        bucket_names, priority = classify_endpoint(endpoint)
+        waiter = ((priority, next(self.sequence)), frozenset(bucket_names))
+        started = self.clock()
+        queued = False
+
+        with self.condition:
+            self.waiters.append(waiter)
+            try:
+                while True:
+                    now = self.clock()
+                    if self._blocked_by_priority(waiter):
+                        delay = None
+                    else:
+                        delay = max(
+                            self.buckets[name].wait_time(now)
+                            for name in bucket_names
+                        )
+                        if delay <= 0:
+                            break
+
+                    if self.max_wait and now - started >= self.max_wait:
+                        raise APIError(
+                            "Rate limit wait exceeded: "
+                            f"endpoint={endpoint}, "
+                            f"waited={now - started:.3f}s"
+                        )
+                    if self.max_wait:
+                        remaining = self.max_wait - (now - started)
+                        delay = (
+                            remaining
+                            if delay is None
+                            else min(delay, remaining)
+                        )
+                    queued = True
+                    self.condition.wait(delay)
+
+                for name in bucket_names:
+                    self.buckets[name].consume(now)
+            finally:
+                self.waiters.remove(waiter)
+                self.condition.notify_all()
+
+            waited = now - started if queued else 0.0
+            for name in bucket_names:
+                stats = self.stats[name]
+                stats["requests"] += 1
+                if queued:
+                    stats["waited"] += 1
+                    stats["total_wait"] += waited
+                    stats["max_wait"] = max(stats["max_wait"], waited)
+
+        if waited >= 1:
+            logger.info("Rate limited %s for %.3fs", endpoint, waited)
+        return waited
+
+    def record_retries(self, endpoint, count):
+        """
+        HTTPアダプターが内部でリトライした分のトークンを消費する
+        """
+        if count <= 0:
+            return
+        bucket_names, _ = classify_endpoint(endpoint)
+        with self.condition:
+            now = self.clock()
+            for name in bucket_names:
+                for _ in range(count):
+                    self.buckets[name].consume(now)
+                self.stats[name]["retries"] += count
+
+    def update_from_headers(self, endpoint, headers):
+        """
+        レスポンスヘッダーの残数とリセット時刻をバケットに反映する
+        """
+        bucket_names, _ = classify_endpoint(endpoint)
+        updated = False
+        with self.condition:
+            for header, bucket_name in RATE_LIMIT_HEADERS.items():
+                remaining = headers.get(header)
+                if remaining is None:
+                    continue
+                name = bucket_name or bucket_names[0]
+                if name not in self.buckets:
+                    continue
+                reset = headers.get(header.replace("Remaining", "Reset"))
+                try:
+                    remaining = int(remaining)
+                    # リセット時刻は秒単位のため1秒の余裕を持たせる
+                    reset_in = (
+                        max(int(reset) - time.time(), 0) + 1
+                        if reset is not None
+                        else None
+                    )
+                except ValueError:
+                    continue
+
+                self.buckets[name].sync(remaining, reset_in, self.clock())
+                self.stats[name]["remaining"] = remaining
+                updated = True
+                if remaining <= 0 and reset_in is not None:
+                    logger.warning(
+                        "API limit reached for %s, blocked for %.1fs",
+                        name,
+                        reset_in,
+                    )
+                elif remaining <= 0:
+                    # リセット時刻のヘッダーがない場合
+                    logger.warning(
+                        "API limit reached for %s, reset time unknown", name
+                    )
+            if updated:
+                self.condition.notify_all()
+        return updated
+
+    def get_stats(self):
+        """
+        バケットごとの送信数と待機時間を取得する
+        """
+        with self.condition:
+            return {
+                name: dict(
+                    stats,
+                    total_wait=round(stats["total_wait"], 3),
+                    max_wait=round(stats["max_wait"], 3),
+                    avg_wait=(
+                        round(stats["total_wait"] / stats["requests"], 3)
+                        if stats["requests"]
+                        else 0.0
+                    ),
+                    queued=sum(
+                        1 for _, buckets in self.waiters if name in buckets
+                    ),
+                )
+                for name, stats in self.stats.items()
+            }
@@ -0,0 +1,427 @@
+"""
+Realtime market feed
+"""
+
+import json
+import time
+import calendar
+import threading
+from collections import OrderedDict, deque
+from src.lazy_import import lazy_import
+from src.custom_errors import APIError
+from src.bitflyer.order_book import OrderBook
+from src.logger_setup import get_logger
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# ストリームを使用する場合のみ読み込む
+websocket = lazy_import("websocket")
+
+# bitFlyer Realtime APIのエンドポイント
+DEFAULT_URL = "wss://ws.lightstream.bitflyer.com/json-rpc"
+
+# バックフィルで1回に取得する約定の件数
+BACKFILL_COUNT = 500
+
+
+def parse_exec_date(exec_date):
+    """
+    約定日時の文字列をUNIX時刻（秒）に変換する
+    """
+    return calendar.timegm(time.strptime(exec_date[:19], "%Y-%m-%dT%H:%M:%S"))
+
+
+class LiveMarketState:
+    """
+    ストリームで受信したティッカー・約定・板を保持する
+    """
+
+    def __init__(
+        self, product_code="BTC_JPY", max_executions=1000, max_minutes=1440
+    ):
+        self.product_code = product_code
+        self.lock = threading.Lock()
+
+        self.ticker = None
+        self.ticker_received = None
+
+        # 約定（新しい順）と重複排除用のID
+        self.executions = deque(maxlen=max_executions)
+        self.execution_ids = set()
+        self.last_execution_id = None
+
+        # 価格ごとの板の数量
+        self.book = OrderBook()
+
+        # 約定から作成した1分足（分の開始時刻をキーとする）
+        self.minute_bars = OrderedDict()
+        self.max_minutes = max_minutes
+
+        # 欠損なく約定を受信している期間の開始時刻
+        self.covered_since = None
+
+        # 接続状態と最後にデータを受信した時刻
+        # （切断中や無通信が続く間はストリームの1分足を使用しない）
+        self.connected = False
+        self.received_at = None
+
+    def update_ticker(self, ticker):
+        """
+        ティッカーを更新する
+        """
+        with self.lock:
+            self.ticker = dict(ticker)
+            self.ticker_received = self.received_at = time.monotonic()
+
+    def get_ticker(self, max_age=None):
+        """
+        ティッカーを返す（max_age秒より古い場合はNone）
+        """
+        with self.lock:
+            if self.ticker is None:
+                return None
+            if (
+                max_age is not None
+                and time.monotonic() - self.ticker_received > max_age
+            ):
+                return None
+            return dict(self.ticker)
+
+    def add_executions(self, executions):
+        """
+        約定を追加し、1分足に反映する
+        """
+        added = 0
+        with self.lock:
+            self.received_at = time.monotonic()
+            for execution in sorted(executions, key=lambda e: e["id"]):
+                if execution["id"] in self.execution_ids:
+                    continue
+                if len(self.executions) == self.executions.maxlen:
+                    self.execution_ids.discard(self.executions[-1]["id"])
+                self.executions.appendleft(execution)
+                self.execution_ids.add(execution["id"])
+                if (
+                    self.last_execution_id is None
+                    or execution["id"] > self.last_execution_id
+                ):
+                    self.last_execution_id = execution["id"]
+                self._merge_bar(execution)
+                added += 1
+        return added
+
+    def _merge_bar(self, execution):
+        timestamp = parse_exec_date(execution["exec_date"])
+        minute = timestamp - timestamp % 60
+        price = float(execution["price"])
+        size = float(execution["size"])
+
+        bar = self.minute_bars.get(minute)
+        if bar is None:
+            if self.minute_bars and minute < next(iter(self.minute_bars)):
+                # 保持している期間より古い約定は反映しない
+                return
+            bar = {
+                "time": minute,
+                "open": price,
+                "high": price,
+                "low": price,
+                "close": price,
+                "volumefrom": 0.0,
+                "volumeto": 0.0,
+                "first_id": execution["id"],
+                "last_id": execution["id"],
+            }
+            self.minute_bars[minute] = bar
+            if self.covered_since is None:
+                # 最初の1分は途中から受信しているため次の分から扱う
+                self.covered_since = minute + 60
+            if len(self.minute_bars) > 1 and minute < next(
+                reversed(self.minute_bars)
+            ):
+                # バックフィルで古い分が追加された場合は時刻順に並べ直す
+                self.minute_bars = OrderedDict(
+                    sorted(self.minute_bars.items())
+                )
+            while len(self.minute_bars) > self.max_minutes:
+                self.minute_bars.popitem(last=False)
+
+        # IDの順に始値・終値を決める（受信順が前後しても正しくする）
+        if execution["id"] < bar["first_id"]:
+            bar["open"] = price
+            bar["first_id"] = execution["id"]
+        if execution["id"] >= bar["last_id"]:
+            bar["close"] = price
+            bar["last_id"] = execution["id"]
+        bar["high"] = max(bar["high"], price)
+        bar["low"] = min(bar["low"], price)
+        bar["volumefrom"] += size
+        bar["volumeto"] += price * size
+
+    def set_connected(self, connected):
+        """
+        ストリームの接続状態を更新する
+        """
+        with self.lock:
+            self.connected = connected
+
+    def reset_coverage(self, since):
+        """
+        欠損を埋められなかった場合に連続した期間の開始時刻を更新する
+        """
+        with self.lock:
+            self.covered_since = since - since % 60 + 60
+
+    def get_executions(self, count=100):
+        """
+        直近の約定を新しい順に返す
+        """
+        with self.lock:
+            return list(self.executions)[:count]
+
+    def get_minute_bars(self, since=None):
+        """
+        CryptoCompareのhistominuteと同じ形式の1分足を返す
+        """
+        with self.lock:
+            return [
+                {
+                    key: value
+                    for key, value in bar.items()
+                    if key not in ("first_id", "last_id")
+                }
+                for minute, bar in self.minute_bars.items()
+                if since is None or minute >= since
+            ]
+
+    def covers(self, since, max_age=None):
+        """
+        指定した時刻以降の1分足をストリームから作成できるかを判定する
+
+        切断中、またはmax_age秒より長くデータを受信していない場合はFalse
+        """
+        with self.lock:
+            if not self.connected or self.covered_since is None:
+                return False
+            if self.covered_since > since:
+                return False
+            if max_age is not None and (
+                self.received_at is None
+                or time.monotonic() - self.received_at > max_age
+            ):
+                return False
+            return True
+
+    def apply_board_snapshot(self, board):
+        """
+        板のスナップショットを反映する
+        """
+        with self.lock:
+            self.received_at = time.monotonic()
+            self.book.apply_snapshot(board)
+
+    def apply_board_diff(self, board):
+        """
+        板の差分を反映する（数量0は削除）
+        """
+        with self.lock:
+            self.received_at = time.monotonic()
+            self.book.apply_diff(board)
+
+    def get_board(self, depth=None):
+        """
+        getboardと同じ形式の板を返す
+        """
+        with self.lock:
+            return self.book.to_board(depth)
+
+    def get_board_summary(self, **kwargs):
+        """
+        板の要約を返す（受信前の場合はNone）
+        """
+        with self.lock:
+            if not self.book.updates:
+                return None
+            return self.book.summary(**kwargs)
+
+
+class RealtimeClient:
+    """
+    bitFlyer Realtime API（JSON-RPC 2.0 over WebSocket）の購読クライアント
+    """
+
+    def __init__(
+        self,
+        state,
+        rest_client=None,
+        url=DEFAULT_URL,
+        timeout=10,
+        reconnect_delay=1.0,
+        max_reconnect_delay=60.0,
+        backfill_pages=10,
+    ):
+        self.state = state
+        self.rest_client = rest_client
+        self.url = url
+        self.product_code = product_code = state.product_code
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.backfill_pages = backfill_pages
+
+        self.channels = {
+            f"lightning_ticker_{product_code}": self.state.update_ticker,
+            f"lightning_executions_{product_code}": self.state.add_executions,
+            f"lightning_board_snapshot_{product_code}": (
+                self.state.apply_board_snapshot
+            ),
+            f"lightning_board_{product_code}": self.state.apply_board_diff,
+        }
+
+        self.ws = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.connected = threading.Event()
+        self.stats = {
+            "connects": 0,
+            "disconnects": 0,
+            "messages": 0,
+            "backfilled": 0,
+        }
+
+    def start(self):
+        """
+        バックグラウンドのスレッドで受信を開始する
+        """
+        self.thread = threading.Thread(
+            target=self.run, name="realtime-feed", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        受信を停止する
+        """
+        self.stop_event.set()
+        ws = self.ws
+        if ws is not None:
+            ws.close()
+        if self.thread is not None:
+            self.thread.join(self.timeout)
+
+    def wait_connected(self, timeout=None):
+        """
+        接続してバックフィルが完了するまで待機する
+        """
+        return self.connected.wait(timeout)
+
+    def run(self):
+        """
+        切断時は指数バックオフで再接続する
+        """
+        delay = self.reconnect_delay
+        while not self.stop_event.is_set():
+            try:
+                self._connect()
+                delay = self.reconnect_delay
+                self._receive()
+            except (websocket.WebSocketException, OSError, ValueError) as e:
+                if not self.stop_event.is_set():
+                    logger.warning("Realtime feed disconnected: %s", e)
+            finally:
+                if self.connected.is_set():
+                    self.stats["disconnects"] += 1
+                self.connected.clear()
+                self.state.set_connected(False)
+                if self.ws is not None:
+                    self.ws.close()
+                    self.ws = None
+
+            if self.stop_event.wait(delay):
+                break
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _connect(self):
+        self.ws = websocket.create_connection(self.url, timeout=self.timeout)
+        for request_id, channel in enumerate(self.channels, start=1):
+            self.ws.send(
+                json.dumps(
+                    {
+                        "jsonrpc": "2.0",
+                        "method": "subscribe",
+                        "params": {"channel": channel},
+                        "id": request_id,
+                    }
+                )
+            )
+
+        # 購読後に切断中の約定をRESTで補完する
+        self._backfill()
+        self.stats["connects"] += 1
+        self.state.set_connected(True)
+        self.connected.set()
+        logger.info("Realtime feed connected: %s", self.url)
+
+    def _receive(self):
+        while not self.stop_event.is_set():
+            try:
+                message = self.ws.recv()
+            except websocket.WebSocketTimeoutException:
+                # 無通信の間は接続の生存を確認する
+                self.ws.ping()
+                continue
+            if not message:
+                raise websocket.WebSocketConnectionClosedException(
+                    "Connection closed by server"
+                )
+            self._handle(json.loads(message))
+
+    def _handle(self, message):
+        if message.get("method") != "channelMessage":
+            if "error" in message:
+                logger.error("Realtime feed error: %s", message["error"])
+            return
+
+        params = message["params"]
+        handler = self.channels.get(params["channel"])
+        if handler is not None:
+            handler(params["message"])
+            self.stats["messages"] += 1
+
+    def _backfill(self):
+        if self.rest_client is None:
+            return
+        try:
+            self.state.update_ticker(
+                self.rest_client.get_ticker(self.product_code, use_cache=False)
+            )
+            self.state.apply_board_snapshot(
+                self.rest_client.get_board(self.product_code, use_cache=False)
+            )
+            self._backfill_executions()
+        except APIError as e:
+            # バックフィルに失敗しても受信は継続する（切断中の1分足は欠損扱い）
+            logger.error("Failed to backfill market data: %s", e)
+            self.state.reset_coverage(int(time.time()))
+
+    def _backfill_executions(self):
+        after = self.state.last_execution_id
+        before = None
+        executions = []
+        for _ in range(self.backfill_pages):
+            page = self.rest_client.get_public_executions(
+                self.product_code, BACKFILL_COUNT, before=before, after=after
+            )
+            executions.extend(page)
+            if after is None or len(page) < BACKFILL_COUNT:
+                break
+            before = min(e["id"] for e in page)
+        else:
+            # 切断中の約定をすべて取得できなかった場合
+            oldest = min(executions, key=lambda e: e["id"])
+            self.state.reset_coverage(parse_exec_date(oldest["exec_date"]))
+            logger.warning("Backfill incomplete, minute bars reset")
+
+        self.stats["backfilled"] += self.state.add_executions(executions)
@@ -0,0 +1,155 @@
+"""
+Read-through cache for API responses
+"""
+
+import copy
+import time
+import threading
+from src.logger_setup import get_logger
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+
+class PendingRequest:
+    """
+    実行中のリクエスト（同じキーの呼び出し元で結果を共有する）
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResponseCache:
+    """
+    エンドポイントごとの有効期間で応答を保持する
+
+    同じキーのリクエストが実行中の場合は新たに送信せず、その結果を待つ
+    """
+
+    def __init__(self, ttls=None, clock=time.monotonic):
+        self.ttls = dict(ttls or {})
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.pending = {}
+        self.generation = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "invalidations": 0,
+        }
+
+    @staticmethod
+    def make_key(endpoint, params=None):
+        """
+        エンドポイントとパラメータからキーを作成する
+        """
+        return (endpoint, tuple(sorted((params or {}).items())))
+
+    def get_ttl(self, endpoint):
+        """
+        エンドポイントの有効期間（秒）を取得する
+        """
+        return self.ttls.get(endpoint, 0)
+
+    def get(self, endpoint, params, loader, use_cache=True):
+        """
+        有効な応答があれば返し、なければloaderで取得して保持する
+        """
+        ttl = self.get_ttl(endpoint)
+        if not ttl or not use_cache:
+            return loader()
+
+        key = self.make_key(endpoint, params)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.clock() < entry[0]:
+                self.stats["hits"] += 1
+                return copy.deepcopy(entry[1])
+
+            pending = self.pending.get(key)
+            if pending is None:
+                pending = PendingRequest(self.generation)
+                self.pending[key] = pending
+                owner = True
+                self.stats["misses"] += 1
+            else:
+                owner = False
+                self.stats["coalesced"] += 1
+
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return copy.deepcopy(pending.result)
+
+        try:
+            pending.result = loader()
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.pending[key]
+                # 取得中に無効化された場合は保持しない
+                if (
+                    pending.error is None
+                    and pending.generation == self.generation
+                ):
+                    self.entries[key] = (
+                        self.clock() + ttl,
+                        copy.deepcopy(pending.result),
+                    )
+            pending.event.set()
+        return pending.result
+
+    def peek(self, endpoint, params=None):
+        """
+        有効な応答があれば返す（取得は行わない）
+        """
+        key = self.make_key(endpoint, params)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.clock() < entry[0]:
+                self.stats["hits"] += 1
+                return copy.deepcopy(entry[1])
+        return None
+
+    def invalidate(self, product_code=None):
+        """
+        保持している応答を破棄する（product_codeを指定した場合はその分のみ）
+        """
+        with self.lock:
+            self.generation += 1
+            if product_code is None:
+                self.entries.clear()
+            else:
+                for key in list(self.entries):
+                    if ("product_code", product_code) in key[1]:
+                        del self.entries[key]
+            self.stats["invalidations"] += 1
+
+    def get_stats(self):
+        """
+        ヒット数と共有したリクエスト数を取得する
+        """
+        with self.lock:
+            requests = self.stats["hits"] + self.stats["misses"]
+            return dict(
+                self.stats,
+                entries=len(self.entries),
+                hit_ratio=(
+                    round(
+                        (self.stats["hits"] + self.stats["coalesced"])
+                        / (requests + self.stats["coalesced"]),
+                        3,
+                    )
+                    if requests
+                    else 0.0
+                ),
+            )
@@ -5,10 +5,15 @@ Trading methods for the Bitflyer API.
 import os
 import json
 from datetime import datetime
-import pandas as pd
+from src.lazy_import import lazy_import
 from src.bitflyer.bitflyer_client import BitflyerClient
+from src.bitflyer.portfolio_history import PortfolioHistory
+from src.bitflyer.response_cache import ResponseCache
 from src.logger_setup import get_logger
 
+# 約定履歴の変換にのみ使用する
+pd = lazy_import("pandas")
+
 # from bitflyer_client import BitflyerClient
 
 # ロガーの取得
@@ -22,8 +27,22 @@ class BitflyerMethods:
 
     def __init__(self, config):
         self.api_client = BitflyerClient(
-            config.bitflyer_api_key, config.bitflyer_api_secret
+            config.bitflyer_api_key,
+            config.bitflyer_api_secret,
+            base_url=config.bitflyer_base_url,
+            pool_size=config.http_pool_size,
+            max_retries=config.http_max_retries,
+            backoff_factor=config.http_backoff_factor,
+            timeouts=config.http_timeouts,
+            rate_limits=config.rate_limits,
+            rate_limit_max_wait=config.rate_limit_max_wait,
+            rate_limit_enabled=config.rate_limit_enabled,
+        )
+        # 公開APIの応答のキャッシュ（エンドポイントごとの有効期間）
+        self.market_cache = ResponseCache(
+            config.market_cache_ttls if config.market_cache_enabled else {}
         )
+
         self.log_dir = config.log_dir
         if not os.path.exists(self.log_dir):
             os.makedirs(self.log_dir)
@@ -31,6 +50,14 @@ class BitflyerMethods:
         self.cache_file = os.path.join(self.log_dir, config.cache_file)
         self.cache = self._load_cache()
 
+        # 残高履歴の追記用ライター
+        self.portfolio_history = PortfolioHistory(
+            self.log_dir,
+            fsync_policy=config.portfolio_fsync_policy,
+            fsync_interval=config.portfolio_fsync_interval,
+            tail_size=config.portfolio_tail_size,
+        )
+
     def _load_cache(self):
         if os.path.exists(self.cache_file):
             with open(self.cache_file, "r", encoding="utf-8") as file:
@@ -41,49 +68,106 @@ class BitflyerMethods:
         with open(self.cache_file, "w", encoding="utf-8") as file:
             json.dump(self.cache, file, indent=4)
 
-    def _get_ticker_data(self, product_code):
+    def _get_cached(self, endpoint, params, use_cache=True):
+        return self.market_cache.get(
+            endpoint,
+            params,
+            lambda: self.api_client.make_request(
+                "GET", endpoint, params=params
+            ),
+            use_cache=use_cache,
+        )
+
+    def _get_ticker_data(self, product_code, use_cache=True):
         endpoint = "/v1/getticker"
         params = {"product_code": product_code}
-        return self.api_client.make_request("GET", endpoint, params=params)
+        return self._get_cached(endpoint, params, use_cache)
+
+    def get_connection_stats(self):
+        """
+        HTTP接続の再利用状況を取得する
+        """
+        return self.api_client.get_connection_stats()
+
+    def get_rate_limit_stats(self):
+        """
+        レート制限による待機状況を取得する
+        """
+        return self.api_client.get_rate_limit_stats()
+
+    def get_cache_stats(self):
+        """
+        公開APIのキャッシュの利用状況を取得する
+        """
+        return self.market_cache.get_stats()
 
-    def _get_log_file(self):
-        current_date = datetime.utcnow().strftime("%Y%m%d")
-        return os.path.join(self.log_dir, f"portfolio_{current_date}.json")
+    def invalidate_market_cache(self, product_code=None):
+        """
+        注文やキャンセルで変化する公開APIのキャッシュを破棄する
+        """
+        self.market_cache.invalidate(product_code)
 
-    def _rotate_logs(self):
-        current_date = datetime.utcnow().strftime("%Y%m%d")
-        for filename in os.listdir(self.log_dir):
-            if filename.startswith("portfolio_") and not filename.endswith(
-                f"{current_date}.json"
-            ):
-                os.remove(os.path.join(self.log_dir, filename))
+    def close(self):
+        """
+        HTTPセッションと残高履歴のファイルを閉じる
+        """
+        self.api_client.close()
+        self.portfolio_history.close()
 
     def get_board_state(self, product_code="BTC_JPY"):
         """
         板の状態を取得する
         """
+        # ティッカーが板の状態を含む場合は同じ取得結果を使う
+        if self.market_cache.get_ttl("/v1/getticker"):
+            ticker = self._get_ticker_data(product_code)
+            if ticker and "state" in ticker:
+                return {"state": ticker["state"]}
+
         endpoint = "/v1/getboardstate"
         params = {"product_code": product_code}
-        return self.api_client.make_request("GET", endpoint, params=params)
+        return self._get_cached(endpoint, params)
 
-    def get_ticker(self, product_code="BTC_JPY"):
+    def get_ticker(self, product_code="BTC_JPY", use_cache=True):
         """
         ティッカー情報を取得する
         """
-        return self._get_ticker_data(product_code)
+        return self._get_ticker_data(product_code, use_cache)
 
-    def get_balance(self):
+    def get_board(self, product_code="BTC_JPY", use_cache=True):
+        """
+        板情報を取得する
+        """
+        endpoint = "/v1/getboard"
+        params = {"product_code": product_code}
+        return self._get_cached(endpoint, params, use_cache)
+
+    def get_public_executions(
+        self, product_code="BTC_JPY", count=100, before=None, after=None
+    ):
+        """
+        マーケット全体の約定履歴を取得する
+        """
+        endpoint = "/v1/getexecutions"
+        params = {"product_code": product_code, "count": count}
+        if before is not None:
+            params["before"] = before
+        if after is not None:
+            params["after"] = after
+        return self.api_client.make_request("GET", endpoint, params=params)
+
+    def get_balance(self, currencies=("JPY", "BTC")):
         """
         残高を取得する
         """
         endpoint = "/v1/me/getbalance"
         balance_data = self.api_client.make_request("GET", endpoint)
 
-        # JPYとBTCのみを抽出
+        # 指定した通貨のみを抽出
         balance_data = [
             balance
             for balance in balance_data
-            if balance["currency_code"] in ["JPY", "BTC"]
+            if balance["currency_code"] in currencies
         ]
 
         # 現在の日時を追加
@@ -91,21 +175,9 @@ class BitflyerMethods:
         for balance in balance_data:
             balance["timestamp"] = timestamp
 
-        # ログファイルに保存
-        log_file = self._get_log_file()
-        if os.path.exists(log_file):
-            with open(log_file, "r", encoding="utf-8") as file:
-                history = json.load(file)
-        else:
-            history = []
-
-        history.extend(balance_data)
-
-        with open(log_file, "w", encoding="utf-8") as file:
-            json.dump(history, file, indent=4)
-
-        # ローテーション処理
-        self._rotate_logs()
+        # 履歴ファイルに追記
+        self.portfolio_history.append(balance_data)
+        history = self.portfolio_history.get_tail()
 
         return {"current_balance": balance_data, "history": history}
 
@@ -116,12 +188,12 @@ class BitflyerMethods:
         endpoint = "/v1/me/getexecutions"
         return self.api_client.make_request("GET", endpoint)
 
-    def get_execution_history(self, count=15):
+    def get_execution_history(self, count=15, product_code="BTC_JPY"):
         """
         約定履歴を取得する
         """
         endpoint = "/v1/me/getexecutions"
-        params = {"count": count}
+        params = {"product_code": product_code, "count": count}
 
         # APIリクエストを送信
         response = self.api_client.make_request(
@@ -181,6 +253,55 @@ class BitflyerMethods:
         except Exception as e:
             print(f"Failed to send order: {e}")
             return None
+        finally:
+            self.invalidate_market_cache(product_code)
+
+    def send_parent_order(
+        self,
+        order_method,
+        parameters,
+        minute_to_expire=30,
+        time_in_force="GTC",
+    ):
+        """
+        特殊注文（SIMPLE・IFD・OCO・IFDOCO）を送信する
+        """
+        endpoint = "/v1/me/sendparentorder"
+        body = {
+            "order_method": order_method,
+            "minute_to_expire": minute_to_expire,
+            "time_in_force": time_in_force,
+            "parameters": parameters,
+        }
+        try:
+            return self.api_client.make_request("POST", endpoint, data=body)
+        finally:
+            for product_code in {p["product_code"] for p in parameters}:
+                self.invalidate_market_cache(product_code)
+
+    def get_parent_orders(self, product_code="BTC_JPY", state="ACTIVE"):
+        """
+        特殊注文の一覧を取得する
+        """
+        endpoint = "/v1/me/getparentorders"
+        params = {"product_code": product_code}
+        if state is not None:
+            params["parent_order_state"] = state
+        return self.api_client.make_request("GET", endpoint, params=params)
+
+    def cancel_parent_order(self, acceptance_id, product_code="BTC_JPY"):
+        """
+        特殊注文をキャンセルする
+        """
+        endpoint = "/v1/me/cancelparentorder"
+        body = {
+            "product_code": product_code,
+            "parent_order_acceptance_id": acceptance_id,
+        }
+        try:
+            return self.api_client.make_request("POST", endpoint, data=body)
+        finally:
+            self.invalidate_market_cache(product_code)
 
     def get_open_orders(self, product_code="BTC_JPY"):
         """
@@ -190,6 +311,17 @@ class BitflyerMethods:
         params = {"product_code": product_code, "child_order_state": "ACTIVE"}
         return self.api_client.make_request("GET", endpoint, params=params)
 
+    def get_child_order(self, acceptance_id, product_code="BTC_JPY"):
+        """
+        受付IDを指定して注文を取得する（状態を問わない）
+        """
+        endpoint = "/v1/me/getchildorders"
+        params = {
+            "product_code": product_code,
+            "child_order_acceptance_id": acceptance_id,
+        }
+        return self.api_client.make_request("GET", endpoint, params=params)
+
     def cancel_order(self, order_id, product_code="BTC_JPY"):
         """
         注文をキャンセルする
@@ -199,4 +331,7 @@ class BitflyerMethods:
             "product_code": product_code,
             "child_order_acceptance_id": order_id,
         }
-        return self.api_client.make_request("POST", endpoint, data=body)
+        try:
+            return self.api_client.make_request("POST", endpoint, data=body)
+        finally:
+            self.invalidate_market_cache(product_code)
@@ -0,0 +1,167 @@
+"""
+Candle Store
+"""
+
+import os
+from src.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+# カラム名とファイル上の型（固定長・リトルエンディアン）
+COLUMNS = (
+    ("time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volumefrom", "<f8"),
+)
+
+
+class CandleStore:
+    """
+    1分足をカラムごとのファイルに追記し、メモリマップで読み出すストア
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+        self.paths = {
+            name: os.path.join(self.directory, f"{name}.bin")
+            for name, _ in COLUMNS
+        }
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in COLUMNS}
+        self._maps = {}
+        self._length = self._recover()
+
+    def __len__(self):
+        return self._length
+
+    def _recover(self):
+        # 書き込み途中で停止した場合に備えて全カラムを最短の長さに揃える
+        lengths = []
+        for name, path in self.paths.items():
+            if not os.path.exists(path):
+                open(path, "wb").close()
+            lengths.append(os.path.getsize(path) // self.dtypes[name].itemsize)
+
+        length = min(lengths)
+        for name, path in self.paths.items():
+            size = length * self.dtypes[name].itemsize
+            if os.path.getsize(path) != size:
+                os.truncate(path, size)
+        return length
+
+    def _column(self, name):
+        # 長さが変わるまでメモリマップを使い回す
+        column = self._maps.get(name)
+        if column is None or len(column) != self._length:
+            if self._length == 0:
+                column = np.empty(0, dtype=self.dtypes[name])
+            else:
+                column = np.memmap(
+                    self.paths[name],
+                    dtype=self.dtypes[name],
+                    mode="r",
+                    shape=(self._length,),
+                )
+            self._maps[name] = column
+        return column
+
+    @property
+    def first_time(self):
+        """
+        保存されている最も古い足の時刻
+        """
+        return int(self._column("time")[0]) if self._length else None
+
+    @property
+    def last_time(self):
+        """
+        保存されている最新の足の時刻
+        """
+        return int(self._column("time")[-1]) if self._length else None
+
+    def append(self, bars):
+        """
+        1分足を追記し、追記した本数を返す
+        """
+        bars = sorted(bars, key=lambda b: b["time"])
+        last_time = self.last_time
+
+        # 最新の足と同じ時刻の足は上書きする（未確定の足の更新）
+        if last_time is not None:
+            for bar in bars:
+                if int(bar["time"]) == last_time:
+                    self._overwrite_last(bar)
+            bars = [bar for bar in bars if int(bar["time"]) > last_time]
+
+        # 同じ時刻の足が重複している場合は後のものを採用する
+        unique = {}
+        for bar in bars:
+            unique[int(bar["time"])] = bar
+        bars = [unique[key] for key in sorted(unique)]
+        if not bars:
+            return 0
+
+        # 時刻のカラムを最後に書き込み、途中停止時は_recoverで切り詰める
+        for name, _ in COLUMNS[1:] + COLUMNS[:1]:
+            values = np.array(
+                [bar[name] for bar in bars], dtype=self.dtypes[name]
+            )
+            with open(self.paths[name], "ab") as file:
+                file.write(values.tobytes())
+
+        self._length += len(bars)
+        return len(bars)
+
+    def _overwrite_last(self, bar):
+        for name, _ in COLUMNS[1:]:
+            column = np.memmap(
+                self.paths[name],
+                dtype=self.dtypes[name],
+                mode="r+",
+                shape=(self._length,),
+            )
+            column[-1] = bar[name]
+            column.flush()
+            del column
+
+    def search(self, start=None, end=None):
+        """
+        時刻の範囲 [start, end] に該当する行の位置を二分探索で求める
+        """
+        times = self._column("time")
+        left = (
+            0 if start is None else int(np.searchsorted(times, start, "left"))
+        )
+        right = (
+            self._length
+            if end is None
+            else int(np.searchsorted(times, end, "right"))
+        )
+        return left, right
+
+    def range(self, start=None, end=None):
+        """
+        時刻の範囲 [start, end] の足をカラムごとの配列で返す
+        """
+        left, right = self.search(start, end)
+        return {name: self._column(name)[left:right] for name, _ in COLUMNS}
+
+    def tail(self, count):
+        """
+        最新の足をカラムごとの配列で返す
+        """
+        left = max(self._length - count, 0)
+        return {name: self._column(name)[left:] for name, _ in COLUMNS}
+
+    def to_bars(self, columns):
+        """
+        カラムごとの配列を1分足の辞書のリストに変換する
+        """
+        names = [name for name, _ in COLUMNS]
+        rows = zip(*(columns[name].tolist() for name in names))
+        return [dict(zip(names, row)) for row in rows]
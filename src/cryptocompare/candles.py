@@ -0,0 +1,374 @@
+"""
+Candles
+"""
+
+from collections import OrderedDict, deque
+
+# 集計する足の長さ（秒）
+BUCKET_SECONDS = 300
+
+# 時間足の単位（秒）
+TIMEFRAME_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+# 5分足から集計する上位の時間足
+DEFAULT_TIMEFRAMES = ("15m", "1h", "4h")
+
+# 時間足ごとに保持する足の本数
+DEFAULT_TIMEFRAME_BARS = 200
+
+
+def parse_timeframe(name):
+    """
+    時間足の名前（例: 15m、1h、4h）を秒数に変換する
+    """
+    unit = TIMEFRAME_UNITS.get(str(name)[-1:])
+    count = str(name)[:-1]
+    if unit is None or not count.isdigit() or not int(count):
+        raise ValueError(f"Invalid timeframe: {name}")
+    return int(count) * unit
+
+
+def format_timeframe(seconds):
+    """
+    秒数を時間足の名前に変換する
+    """
+    for unit, size in sorted(
+        TIMEFRAME_UNITS.items(), key=lambda item: item[1], reverse=True
+    ):
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    raise ValueError(f"Invalid timeframe: {seconds} seconds")
+
+
+def aggregate_bars(bars, seconds=BUCKET_SECONDS):
+    """
+    1分足を指定した秒数の足に一度の走査で集計する
+    """
+    buckets = []
+    for bar in sorted(bars, key=lambda b: b["time"]):
+        start = int(bar["time"]) - int(bar["time"]) % seconds
+        if not buckets or buckets[-1]["time"] != start:
+            buckets.append(
+                {
+                    "time": start,
+                    "open": float(bar["open"]),
+                    "high": float(bar["high"]),
+                    "low": float(bar["low"]),
+                    "close": float(bar["close"]),
+                    "volumefrom": float(bar["volumefrom"]),
+                }
+            )
+            continue
+        bucket = buckets[-1]
+        bucket["high"] = max(bucket["high"], float(bar["high"]))
+        bucket["low"] = min(bucket["low"], float(bar["low"]))
+        bucket["close"] = float(bar["close"])
+        bucket["volumefrom"] += float(bar["volumefrom"])
+    return buckets
+
+
+class MinuteBarBuffer:
+    """
+    1分足を一定数だけ保持し、5分足へ差分集計するリングバッファ
+    """
+
+    def __init__(self, maxlen, bucket_seconds=BUCKET_SECONDS):
+        self.maxlen = maxlen
+        self.bucket_seconds = bucket_seconds
+        self.bars = deque()
+        self.buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self.bars)
+
+    @property
+    def first_time(self):
+        """
+        保持している最も古い1分足の時刻
+        """
+        return self.bars[0]["time"] if self.bars else None
+
+    @property
+    def last_time(self):
+        """
+        保持している最新の1分足の時刻
+        """
+        return self.bars[-1]["time"] if self.bars else None
+
+    def bucket_start(self, timestamp):
+        """
+        1分足の時刻が属する足の開始時刻を返す
+        """
+        return timestamp - timestamp % self.bucket_seconds
+
+    def clear(self):
+        """
+        バッファを空にする
+        """
+        self.bars.clear()
+        self.buckets.clear()
+
+    def merge(self, bars):
+        """
+        1分足をマージし、更新された足の開始時刻を返す
+        """
+        touched = set()
+
+        for bar in sorted(bars, key=lambda b: b["time"]):
+            bar = {
+                "time": int(bar["time"]),
+                "open": float(bar["open"]),
+                "high": float(bar["high"]),
+                "low": float(bar["low"]),
+                "close": float(bar["close"]),
+                "volumefrom": float(bar["volumefrom"]),
+            }
+
+            if not self.bars or bar["time"] > self.bars[-1]["time"]:
+                self.bars.append(bar)
+            else:
+                # 重複する足は新しい値で置き換える（末尾から探索）
+                for index in range(len(self.bars) - 1, -1, -1):
+                    if self.bars[index]["time"] == bar["time"]:
+                        self.bars[index] = bar
+                        break
+                    if self.bars[index]["time"] < bar["time"]:
+                        self.bars.insert(index + 1, bar)
+                        break
+                else:
+                    self.bars.appendleft(bar)
+
+            touched.add(self.bucket_start(bar["time"]))
+
+        # 上限を超えた古い足を破棄する
+        evicted = False
+        while len(self.bars) > self.maxlen:
+            self.bars.popleft()
+            evicted = True
+
+        if not self.bars:
+            self.buckets.clear()
+            return []
+
+        # 範囲外になった足を削除し、先頭の足は再集計する
+        oldest = self.bucket_start(self.first_time)
+        while self.buckets and next(iter(self.buckets)) < oldest:
+            self.buckets.popitem(last=False)
+        if evicted:
+            touched.add(oldest)
+
+        touched = sorted(start for start in touched if start >= oldest)
+        for start in touched:
+            self._rebuild_bucket(start)
+        return touched
+
+    def _rebuild_bucket(self, start):
+        end = start + self.bucket_seconds
+        members = []
+
+        # 対象の足は末尾付近にあることが多いため末尾から探索する
+        for index in range(len(self.bars) - 1, -1, -1):
+            bar = self.bars[index]
+            if bar["time"] < start:
+                break
+            if bar["time"] < end:
+                members.append(bar)
+
+        if not members:
+            self.buckets.pop(start, None)
+            return
+
+        members.reverse()
+        self.buckets[start] = {
+            "time": start,
+            "open": members[0]["open"],
+            "high": max(bar["high"] for bar in members),
+            "low": min(bar["low"] for bar in members),
+            "close": members[-1]["close"],
+            "volumefrom": sum(bar["volumefrom"] for bar in members),
+        }
+
+        # 途中に挿入した場合も時刻順を保つ
+        if len(self.buckets) > 1 and next(reversed(self.buckets)) != start:
+            for key in sorted(self.buckets):
+                self.buckets.move_to_end(key)
+
+    def get_buckets(self):
+        """
+        集計済みの足を時刻順に返す
+        """
+        return list(self.buckets.values())
+
+
+class TimeframeCascade:
+    """
+    5分足から上位の時間足を下位の足から順に差分集計する
+
+    各時間足は下位の時間足より長く履歴を保持するため、1分足の取得範囲を
+    超える期間の足も通信を増やさずに集計できる
+    """
+
+    def __init__(
+        self,
+        timeframes=DEFAULT_TIMEFRAMES,
+        maxlen=DEFAULT_TIMEFRAME_BARS,
+        base_seconds=BUCKET_SECONDS,
+    ):
+        self.maxlen = maxlen
+        self.names = [format_timeframe(base_seconds)]
+        self.seconds = {self.names[0]: base_seconds}
+        for name in timeframes:
+            seconds = parse_timeframe(name)
+            lower = self.seconds[self.names[-1]]
+            if seconds <= lower or seconds % lower:
+                raise ValueError(
+                    f"Timeframe {name} is not a multiple of {self.names[-1]}"
+                )
+            name = format_timeframe(seconds)
+            self.names.append(name)
+            self.seconds[name] = seconds
+        self.buckets = {name: OrderedDict() for name in self.names}
+
+        # 確定した足が書き換えられた回数（指標のキャッシュの無効化に使用）
+        self.revisions = {name: 0 for name in self.names}
+
+        # 集計に使用した1分足の最も古い時刻と最新の時刻
+        self.first_time = None
+        self.last_time = None
+
+    @property
+    def timeframes(self):
+        """
+        5分足を除いた上位の時間足の名前
+        """
+        return self.names[1:]
+
+    @property
+    def span_minutes(self):
+        """
+        最も長い時間足の履歴を埋めるのに必要な1分足の本数
+        """
+        return self.maxlen * self.seconds[self.names[-1]] // 60
+
+    def merge(self, bars, first_time=None, last_time=None):
+        """
+        5分足をマージして上位の時間足に反映し、時間足ごとに更新された開始時刻を返す
+
+        first_timeより前に始まる足は欠けている可能性があるため、
+        保持していない場合のみ追加する
+        """
+        base = self.names[0]
+        base_seconds = self.seconds[base]
+        bars = sorted(bars, key=lambda b: b["time"])
+        if not bars:
+            return {name: [] for name in self.names}
+        if first_time is None:
+            first_time = int(bars[0]["time"])
+        if last_time is None:
+            last_time = int(bars[-1]["time"]) + base_seconds - 60
+
+        touched = {base: []}
+        for bar in bars:
+            start = int(bar["time"])
+            if start < first_time and start in self.buckets[base]:
+                continue
+            if self._store(base, start, dict(bar, time=start)):
+                touched[base].append(start)
+
+        # 更新された足のみを下位の時間足から集計し直す
+        for lower, name in zip(self.names, self.names[1:]):
+            seconds = self.seconds[name]
+            starts = sorted(
+                {start - start % seconds for start in touched[lower]}
+            )
+            touched[name] = [
+                start for start in starts if self._rebuild(name, lower, start)
+            ]
+
+        # 上位の集計が終わってから古い足を破棄する
+        for buckets in self.buckets.values():
+            while len(buckets) > self.maxlen:
+                buckets.popitem(last=False)
+
+        if self.first_time is None or first_time < self.first_time:
+            self.first_time = first_time
+        if self.last_time is None or last_time > self.last_time:
+            self.last_time = last_time
+        return touched
+
+    def _rebuild(self, name, lower, start):
+        lower_buckets = self.buckets[lower]
+        members = [
+            lower_buckets[time]
+            for time in range(
+                start, start + self.seconds[name], self.seconds[lower]
+            )
+            if time in lower_buckets
+        ]
+        if not members:
+            return False
+        return self._store(
+            name,
+            start,
+            {
+                "time": start,
+                "open": members[0]["open"],
+                "high": max(bar["high"] for bar in members),
+                "low": min(bar["low"] for bar in members),
+                "close": members[-1]["close"],
+                "volumefrom": sum(bar["volumefrom"] for bar in members),
+            },
+        )
+
+    def _store(self, name, start, bar):
+        buckets = self.buckets[name]
+        previous = buckets.get(start)
+        if previous == bar:
+            return False
+        if (
+            previous is None
+            and len(buckets) >= self.maxlen
+            and start < next(iter(buckets))
+        ):
+            # 保持する範囲より古い足は追加しない
+            return False
+
+        buckets[start] = bar
+        if previous is not None and self.is_closed(name, start):
+            self.revisions[name] += 1
+
+        # 途中に挿入した場合も時刻順を保つ
+        if len(buckets) > 1 and next(reversed(buckets)) != start:
+            for key in sorted(buckets):
+                buckets.move_to_end(key)
+        return True
+
+    def is_closed(self, name, start):
+        """
+        足の最後の1分足を受信済みかどうかを返す
+        """
+        if self.last_time is None:
+            return False
+        return start + self.seconds[name] <= self.last_time + 60
+
+    def closed_key(self, name):
+        """
+        確定した足が変わるたびに変わる値（指標のキャッシュのキーに使用する）
+        """
+        if self.last_time is None:
+            return None
+        seconds = self.seconds[name]
+        closed_end = (self.last_time + 60) // seconds * seconds
+        return closed_end, self.revisions[name]
+
+    def closed_bars(self, name):
+        """
+        確定した足を時刻順に返す（集計の範囲より前から始まる欠けた足は除く）
+        """
+        if self.last_time is None:
+            return []
+        return [
+            bar
+            for start, bar in self.buckets[name].items()
+            if start >= self.first_time and self.is_closed(name, start)
+        ]
@@ -0,0 +1,282 @@
+"""
+Streaming Indicators
+"""
+
+import math
+from collections import deque
+
+# get_signalsと同じ出力カラム
+SIGNAL_COLUMNS = [
+    "timestamp",
+    "close",
+    "Short_MA",
+    "Long_MA",
+    "Signal",
+    "RSI",
+    "MACD",
+    "Signal_Line",
+    "BB_Upper",
+    "BB_Mid",
+    "BB_Lower",
+]
+
+NAN = float("nan")
+
+
+class RollingMean:
+    """
+    一定期間の移動平均を累積和で保持する
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.pushes = 0
+
+    @property
+    def value(self):
+        """
+        現在の移動平均（期間に満たない場合はNaN）
+        """
+        if len(self.values) < self.window:
+            return NAN
+        return self.total / self.window
+
+    def push(self, x):
+        """
+        値を追加する
+        """
+        self.values.append(x)
+        self.total += x
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+
+        # 浮動小数点の誤差が蓄積しないよう定期的に合計を取り直す
+        self.pushes += 1
+        if self.pushes % self.window == 0:
+            self.total = math.fsum(self.values)
+
+    def revise_last(self, x):
+        """
+        最後に追加した値を置き換える
+        """
+        self.total += x - self.values[-1]
+        self.values[-1] = x
+
+
+class RollingVariance:
+    """
+    一定期間の平均と分散をWelford法で保持する
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.pushes = 0
+
+    @property
+    def std(self):
+        """
+        現在の標本標準偏差（期間に満たない場合はNaN）
+        """
+        if len(self.values) < self.window:
+            return NAN
+        return math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+
+    def push(self, x):
+        """
+        値を追加する
+        """
+        if len(self.values) < self.window:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.values.popleft()
+            self.values.append(x)
+            self._replace(old, x)
+
+        # 浮動小数点の誤差が蓄積しないよう定期的に計算し直す
+        self.pushes += 1
+        if self.pushes % self.window == 0:
+            self.mean = math.fsum(self.values) / len(self.values)
+            self.m2 = math.fsum((v - self.mean) ** 2 for v in self.values)
+
+    def revise_last(self, x):
+        """
+        最後に追加した値を置き換える
+        """
+        old = self.values[-1]
+        self.values[-1] = x
+        if len(self.values) == 1:
+            self.mean = x
+            self.m2 = 0.0
+        else:
+            self._replace(old, x)
+
+    def _replace(self, old, new):
+        # 要素数を変えずに1つの値を入れ替える
+        count = len(self.values)
+        delta = new - old
+        mean = self.mean + delta / count
+        self.m2 += delta * (new - mean + old - self.mean)
+        self.mean = mean
+
+
+class Ema:
+    """
+    指数移動平均（pandasのadjust=Falseと同じ定義）
+    """
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1)
+        self.value = NAN
+        self.previous = NAN
+
+    def push(self, x):
+        """
+        値を追加する
+        """
+        self.previous = self.value
+        self.value = self._next(self.previous, x)
+
+    def revise_last(self, x):
+        """
+        最後に追加した値を置き換える
+        """
+        self.value = self._next(self.previous, x)
+
+    def _next(self, previous, x):
+        if math.isnan(previous):
+            return x
+        return self.alpha * x + (1 - self.alpha) * previous
+
+
+class StreamingIndicators:
+    """
+    足の追加・更新ごとに一定時間で指標を更新する
+    """
+
+    def __init__(self, maxlen=1000):
+        self.maxlen = maxlen
+        self.reset()
+
+    def reset(self):
+        """
+        すべての状態を初期化する
+        """
+        self.rows = deque(maxlen=self.maxlen)
+
+        self.short_ma = RollingMean(5)
+        self.long_ma = RollingMean(50)
+        self.gain = RollingMean(14)
+        self.loss = RollingMean(14)
+        self.ema12 = Ema(12)
+        self.ema26 = Ema(26)
+        self.signal_line = Ema(9)
+        self.bollinger = RollingVariance(20)
+
+        # RSIの差分計算用の終値
+        self.previous_close = None
+        self.last_close = None
+        self.last_timestamp = None
+
+    def update(self, timestamp, close):
+        """
+        足を追加し、同じ時刻の足であれば最後の足を更新する
+        """
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.append(timestamp, close)
+            return True
+        if timestamp == self.last_timestamp:
+            self.revise_last(close)
+            return True
+        return False
+
+    def append(self, timestamp, close):
+        """
+        新しい足を追加する
+        """
+        close = float(close)
+        self.previous_close = self.last_close
+        self.last_close = close
+        self.last_timestamp = timestamp
+
+        self.short_ma.push(close)
+        self.long_ma.push(close)
+        if self.previous_close is None:
+            # pandasと同じく最初の足の差分は0として扱う
+            self.gain.push(0.0)
+            self.loss.push(0.0)
+        else:
+            delta = close - self.previous_close
+            self.gain.push(max(delta, 0.0))
+            self.loss.push(max(-delta, 0.0))
+        self.ema12.push(close)
+        self.ema26.push(close)
+        self.signal_line.push(self.ema12.value - self.ema26.value)
+        self.bollinger.push(close)
+
+        self.rows.append(self._row())
+
+    def revise_last(self, close):
+        """
+        最後の足の終値を更新する
+        """
+        close = float(close)
+        self.last_close = close
+
+        self.short_ma.revise_last(close)
+        self.long_ma.revise_last(close)
+        if self.previous_close is not None:
+            delta = close - self.previous_close
+            self.gain.revise_last(max(delta, 0.0))
+            self.loss.revise_last(max(-delta, 0.0))
+        self.ema12.revise_last(close)
+        self.ema26.revise_last(close)
+        self.signal_line.revise_last(self.ema12.value - self.ema26.value)
+        self.bollinger.revise_last(close)
+
+        self.rows[-1] = self._row()
+
+    def _row(self):
+        short_ma = self.short_ma.value
+        long_ma = self.long_ma.value
+
+        # RSIの計算
+        gain = self.gain.value
+        loss = self.loss.value
+        if math.isnan(gain) or math.isnan(loss) or gain == loss == 0:
+            rsi = NAN
+        elif loss == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - (100 / (1 + gain / loss))
+
+        # ボリンジャーバンドの計算
+        std = self.bollinger.std
+        bb_mid = NAN if math.isnan(std) else self.bollinger.mean
+
+        return (
+            self.last_timestamp,
+            self.last_close,
+            short_ma,
+            long_ma,
+            1 if short_ma > long_ma else -1,
+            rsi,
+            self.ema12.value - self.ema26.value,
+            self.signal_line.value,
+            bb_mid + 2 * std,
+            bb_mid,
+            bb_mid - 2 * std,
+        )
+
+    def get_rows(self):
+        """
+        計算済みの指標を時刻順に返す
+        """
+        return list(self.rows)
@@ -0,0 +1,236 @@
+"""
+NumPy indicator kernels
+"""
+
+import math
+from src.lazy_import import lazy_import
+from src.cryptocompare.indicators import SIGNAL_COLUMNS
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# 累積和を取り直す間隔（一時配列の大きさはこの行数に比例する）
+CHUNK_SIZE = 65536
+
+# 計算結果を保持する配列（EMAはMACDの計算にのみ使用する）
+BUFFER_NAMES = (
+    "Short_MA",
+    "Long_MA",
+    "RSI",
+    "EMA12",
+    "EMA26",
+    "MACD",
+    "Signal_Line",
+    "BB_Upper",
+    "BB_Mid",
+    "BB_Lower",
+)
+
+# NaNを含む行を除外する判定に使用するカラム
+INDICATOR_COLUMNS = (
+    "Short_MA",
+    "Long_MA",
+    "RSI",
+    "MACD",
+    "Signal_Line",
+    "BB_Upper",
+    "BB_Mid",
+    "BB_Lower",
+)
+
+
+def rolling_mean(values, window, out, var_out=None, chunk=CHUNK_SIZE):
+    """
+    累積和で移動平均（var_outを指定した場合は標本分散も）を計算する
+
+    桁落ちを避けるため、chunk行ごとに先頭の値を引いてから累積和を取り直す
+    """
+    n = len(values)
+    head = min(window - 1, n)
+    out[:head] = np.nan
+    if var_out is not None:
+        var_out[:head] = np.nan
+
+    for start in range(window - 1, n, chunk):
+        end = min(start + chunk, n)
+        segment = values[start - window + 1 : end]
+        deviations = segment - segment[0]
+        sums = np.empty(len(segment) + 1)
+        sums[0] = 0.0
+        np.cumsum(deviations, out=sums[1:])
+
+        window_sums = sums[window:] - sums[:-window]
+        mean = out[start:end]
+        np.divide(window_sums, window, out=mean)
+        mean += segment[0]
+
+        if var_out is not None:
+            # 平均を引いた二乗和 = 二乗の和 - 和の二乗 / 期間
+            np.multiply(deviations, deviations, out=deviations)
+            np.cumsum(deviations, out=sums[1:])
+            variance = var_out[start:end]
+            np.subtract(sums[window:], sums[:-window], out=variance)
+            window_sums *= window_sums
+            window_sums /= window
+            variance -= window_sums
+            np.maximum(variance, 0.0, out=variance)
+            variance /= window - 1
+    return out
+
+
+def ema(values, span, out):
+    """
+    指数移動平均を計算する（pandasのewm(adjust=False)と同じ定義）
+
+    ema[t] = decay^(j+1) * ema[s-1] + alpha * Σ decay^(j-i) * x[s+i]
+    をブロックごとに累積和で計算する
+    """
+    n = len(values)
+    if not n:
+        return out
+    alpha = 2.0 / (span + 1)
+    decay = 1.0 - alpha
+    out[0] = values[0]
+    if decay <= 0:
+        out[:n] = values
+        return out
+
+    # decayの累乗の逆数が浮動小数点の範囲に収まるブロックの大きさ
+    chunk = max(1, min(1024, int(200 / -math.log10(decay))))
+    powers = decay ** np.arange(1, chunk + 1)
+
+    previous = out[0]
+    for start in range(1, n, chunk):
+        end = min(start + chunk, n)
+        weights = powers[: end - start]
+        block = out[start:end]
+        np.divide(values[start:end], weights, out=block)
+        np.cumsum(block, out=block)
+        block *= alpha
+        block += previous
+        block *= weights
+        previous = block[-1]
+    return out
+
+
+def rsi(values, window, out, scratch=None):
+    """
+    RSIを計算する（scratchは3行の作業用配列）
+    """
+    n = len(values)
+    if scratch is None:
+        scratch = np.empty((3, n))
+    delta, gain, loss = scratch[0, :n], scratch[1, :n], scratch[2, :n]
+
+    delta[:1] = 0.0
+    np.subtract(values[1:], values[:-1], out=delta[1:])
+    np.maximum(delta, 0.0, out=gain)
+    np.negative(delta, out=loss)
+    np.maximum(loss, 0.0, out=loss)
+
+    # 平均の上昇幅と下落幅（下落幅はdeltaの領域を再利用する）
+    rolling_mean(gain, window, out)
+    rolling_mean(loss, window, delta)
+
+    # 100 - 100 / (1 + 上昇幅 / 下落幅)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(out, delta, out=out)
+        out += 1.0
+        np.divide(100.0, out, out=out)
+        np.subtract(100.0, out, out=out)
+    return out
+
+
+class NumpyIndicators:
+    """
+    終値の配列から指標を計算する（出力用の配列は再利用する）
+    """
+
+    def __init__(self, capacity=0):
+        self.capacity = 0
+        self.size = 0
+        self.close = None
+        self.buffers = {}
+        self.scratch = None
+        self._reserve(capacity)
+
+    def _reserve(self, size):
+        if size <= self.capacity:
+            return
+        capacity = max(size, int(self.capacity * 1.5))
+        self.buffers = {name: np.empty(capacity) for name in BUFFER_NAMES}
+        self.scratch = np.empty((3, capacity))
+        self.capacity = capacity
+
+    def compute(self, close):
+        """
+        すべての指標を計算する
+        """
+        close = np.ascontiguousarray(close, dtype=np.float64)
+        n = len(close)
+        self._reserve(n)
+        self.size = n
+        self.close = close
+        b = {name: buffer[:n] for name, buffer in self.buffers.items()}
+
+        # 移動平均
+        rolling_mean(close, 5, b["Short_MA"])
+        rolling_mean(close, 50, b["Long_MA"])
+
+        # RSI
+        rsi(close, 14, b["RSI"], self.scratch)
+
+        # MACD
+        ema(close, 12, b["EMA12"])
+        ema(close, 26, b["EMA26"])
+        np.subtract(b["EMA12"], b["EMA26"], out=b["MACD"])
+        ema(b["MACD"], 9, b["Signal_Line"])
+
+        # ボリンジャーバンド（標準偏差はBB_Upperの領域で計算する）
+        std = b["BB_Upper"]
+        rolling_mean(close, 20, b["BB_Mid"], var_out=std)
+        np.sqrt(std, out=std)
+        np.multiply(std, -2.0, out=b["BB_Lower"])
+        b["BB_Lower"] += b["BB_Mid"]
+        std *= 2.0
+        std += b["BB_Mid"]
+        return b
+
+    def tail_positions(self, count):
+        """
+        NaNを含まない最後のcount行の位置を返す
+        """
+        columns = [self.buffers[name] for name in INDICATOR_COLUMNS]
+        found = []
+        end = self.size
+        while end > 0 and sum(len(p) for p in found) < count:
+            start = max(end - count * 2, 0)
+            valid = ~np.isnan(self.close[start:end])
+            for column in columns:
+                valid &= ~np.isnan(column[start:end])
+            found.insert(0, np.flatnonzero(valid) + start)
+            end = start
+        if not found:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(found)[-count:]
+
+    def to_frame(self, frame, count=50):
+        """
+        get_signalsと同じカラムのデータフレームで最後のcount行を返す
+
+        時刻と終値はcomputeに渡した終値のデータフレームから型を変えずに取り出す
+        """
+        positions = self.tail_positions(count)
+        b = self.buffers
+        short_ma = b["Short_MA"][positions]
+        long_ma = b["Long_MA"][positions]
+        data = {
+            "timestamp": frame["timestamp"].to_numpy()[positions],
+            "close": frame["close"].to_numpy()[positions],
+            "Short_MA": short_ma,
+            "Long_MA": long_ma,
+            "Signal": np.where(short_ma > long_ma, 1, -1),
+        }
+        for name in SIGNAL_COLUMNS[5:]:
+            data[name] = b[name][positions]
+        return pd.DataFrame(data, index=positions, columns=SIGNAL_COLUMNS)
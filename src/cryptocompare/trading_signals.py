@@ -2,9 +2,96 @@
 Trading Signals
 """
 
-import numpy as np
-import pandas as pd
-import requests
+import os
+import time
+from src.lazy_import import lazy_import
+from src.cryptocompare.candles import (
+    BUCKET_SECONDS,
+    MinuteBarBuffer,
+    TimeframeCascade,
+    aggregate_bars,
+)
+from src.cryptocompare.candle_store import CandleStore
+from src.cryptocompare.indicators import SIGNAL_COLUMNS, StreamingIndicators
+from src.cryptocompare.numpy_indicators import NumpyIndicators
+from src.logger_setup import get_logger
+from src.metrics import get_metrics
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# メトリクスの取得
+metrics = get_metrics()
+
+# 起動時間の短縮のため、重いライブラリは最初に使用する時点で読み込む
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+requests = lazy_import("requests")
+
+
+def resample_bars(df, rule="5min"):
+    """
+    1分足のデータフレームを指定した足にリサンプリングする
+    """
+    df = df.copy()
+    df["timestamp"] = pd.to_datetime(df["time"], unit="s")
+    df = df.set_index("timestamp")
+    df = df.sort_index()
+
+    # 指定した足にリサンプリング
+    df = (
+        df.resample(rule)
+        .agg(
+            {
+                "open": "first",
+                "high": "max",
+                "low": "min",
+                "close": "last",
+                "volumefrom": "sum",
+            }
+        )
+        .dropna()
+    )
+
+    # timestampを再設定
+    return df.reset_index()
+
+
+def calculate_indicators(df):
+    """
+    終値から移動平均・RSI・MACD・ボリンジャーバンドを計算する
+    """
+    # 移動平均の計算
+    df["Short_MA"] = (
+        df["close"].rolling(window=5).mean()
+    )  # 短期移動平均（5期間）
+    df["Long_MA"] = (
+        df["close"].rolling(window=50).mean()
+    )  # 長期移動平均（50期間）
+    df["Signal"] = np.where(
+        df["Short_MA"] > df["Long_MA"], 1, -1
+    )  # シグナルの生成
+
+    # RSIの計算
+    delta = df["close"].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rs = gain / loss
+    df["RSI"] = 100 - (100 / (1 + rs))
+
+    # MACDの計算
+    df["EMA12"] = df["close"].ewm(span=12, adjust=False).mean()
+    df["EMA26"] = df["close"].ewm(span=26, adjust=False).mean()
+    df["MACD"] = df["EMA12"] - df["EMA26"]
+    df["Signal_Line"] = df["MACD"].ewm(span=9, adjust=False).mean()
+
+    # ボリンジャーバンドの計算（標準偏差は一度だけ計算する）
+    rolling = df["close"].rolling(window=20)
+    std = rolling.std()
+    df["BB_Mid"] = rolling.mean()
+    df["BB_Upper"] = df["BB_Mid"] + 2 * std
+    df["BB_Lower"] = df["BB_Mid"] - 2 * std
+    return df
 
 
 class TradingSignals:
@@ -12,10 +99,45 @@ class TradingSignals:
     価格データから売買シグナルを生成する
     """
 
-    def __init__(self, config):
+    def __init__(self, config, live_state=None):
         self.api_key = config.criptocompare_api_key
+        self.symbol = config.signal_symbol
+        self.currency = config.signal_currency
+        self.incremental = config.signals_incremental
         self.df = None
 
+        # 差分取得用の1分足バッファ
+        self.bars = None
+        self.bars_key = None
+
+        # 1分足の永続化ストア（通貨ペアごと）
+        self.candle_store_dir = config.candle_store_dir
+        self.stores = {}
+
+        # 逐次計算用の指標エンジン
+        self.signal_engine = config.signal_engine
+        self.engine = None
+        if self.signal_engine == "streaming":
+            self.engine = StreamingIndicators()
+
+        # NumPyの配列で計算する指標（データフレームに列を追加しない）
+        self.kernels = None
+        if self.signal_engine == "numpy":
+            self.kernels = NumpyIndicators()
+
+        # ストリームの約定から作成した1分足（無通信の許容秒数）
+        self.live_state = live_state
+        self.live_max_staleness = config.realtime_max_staleness
+
+        # 5分足から差分集計する上位の時間足と、時間足ごとの指標のキャッシュ
+        self.timeframe_names = list(config.signal_timeframes or [])
+        self.timeframe_history = config.timeframe_history
+        self.timeframe_rows = config.timeframe_signal_rows
+        self.timeframes = None
+        self.timeframes_key = None
+        self.timeframe_cache = {}
+        self.timeframe_kernels = {}
+
     def fetch_data(self, symbol="BTC", currency="JPY", limit=1000):
         """
         指定された通貨ペアの価格データを取得する
@@ -27,43 +149,195 @@ class TradingSignals:
             "limit": limit,
             "api_key": self.api_key,
         }
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
+        with metrics.timer("cryptocompare_fetch_seconds"):
+            response = requests.get(url, params=params, timeout=10)
+            data = response.json()
 
         if data["Response"] != "Success":
             raise Exception(f"Failed to fetch data: {data['Message']}")
 
         return data["Data"]["Data"]
 
-    def load_data(self, symbol="BTC", currency="JPY", limit=1000):
+    def load_data(self, symbol=None, currency=None, limit=1000):
         """
         データを取得してデータフレームに変換し、5分足にリサンプリングする
         """
-        data_list = self.fetch_data(symbol, currency, limit)
+        symbol = symbol or self.symbol
+        currency = currency or self.currency
+        if not self.incremental:
+            self._reset_timeframes(symbol, currency)
+            self._load_full_data(symbol, currency, limit)
+            if self.engine is not None:
+                self._rebuild_engine()
+            return
 
-        # データフレームに変換
-        self.df = pd.DataFrame(data_list)
-        self.df["timestamp"] = pd.to_datetime(self.df["time"], unit="s")
-        self.df = self.df.set_index("timestamp")
-        self.df = self.df.sort_index()
-
-        # 5分足にリサンプリング
-        self.df = (
-            self.df.resample("5min")
-            .agg(
-                {
-                    "open": "first",
-                    "high": "max",
-                    "low": "min",
-                    "close": "last",
-                    "volumefrom": "sum",
-                }
+        key = (symbol, currency, limit)
+        if self.bars_key != key:
+            self.bars = MinuteBarBuffer(maxlen=limit + 1)
+            self.bars_key = key
+            self._reset_timeframes(symbol, currency)
+            self._warm_start(symbol, currency)
+
+        missing = None
+        if self.bars:
+            # 最後に保存した足から現在までの本数
+            missing = int(time.time()) // 60 - self.bars.last_time // 60
+
+        refetched = missing is None or missing >= limit
+        live_bars = self._get_live_bars(symbol, currency)
+        if not refetched and live_bars:
+            # ストリームで欠損なく受信している場合は通信しない
+            data_list = live_bars
+        elif refetched:
+            # 初回や長時間の欠損がある場合は全件を取得し直す
+            data_list = self.fetch_data(symbol, currency, limit)
+            self.bars.clear()
+        else:
+            # 最後の足（未確定の可能性がある）から現在までのみ取得する
+            data_list = self.fetch_data(symbol, currency, max(missing, 1))
+            if not data_list or data_list[0]["time"] > self.bars.last_time:
+                logger.info("Gap detected in minute bars, refetching all")
+                data_list = self.fetch_data(symbol, currency, limit)
+                self.bars.clear()
+                refetched = True
+
+        touched = self.bars.merge(data_list)
+        store = self._get_store(symbol, currency)
+        if store is not None:
+            store.append(data_list)
+        logger.debug(
+            "Merged %d minute bars, updated %d buckets",
+            len(data_list),
+            len(touched),
+        )
+        self.df = self._buckets_to_frame(self.bars.get_buckets())
+
+        if self.timeframes is not None and touched:
+            self.timeframes.merge(
+                [self.bars.buckets[start] for start in touched],
+                first_time=self.bars.first_time,
+                last_time=self.bars.last_time,
             )
-            .dropna()
+
+        if self.engine is not None:
+            if refetched:
+                self._rebuild_engine()
+            else:
+                self._update_engine(touched)
+
+    def _get_live_bars(self, symbol, currency):
+        if self.live_state is None or not self.bars:
+            return None
+        if self.live_state.product_code != f"{symbol}_{currency}":
+            return None
+        since = self.bars.last_time
+        if not self.live_state.covers(since, self.live_max_staleness):
+            return None
+        bars = self.live_state.get_minute_bars(since)
+        if not bars or bars[0]["time"] != since:
+            return None
+        return bars
+
+    def _get_store(self, symbol, currency):
+        if not self.candle_store_dir:
+            return None
+        key = f"{symbol}_{currency}"
+        if key not in self.stores:
+            self.stores[key] = CandleStore(
+                os.path.join(self.candle_store_dir, key)
+            )
+        return self.stores[key]
+
+    def _reset_timeframes(self, symbol, currency):
+        # 通貨ペアが変わった場合は上位の時間足を作り直す
+        key = (symbol, currency)
+        if not self.timeframe_names or self.timeframes_key == key:
+            return
+        self.timeframes = TimeframeCascade(
+            self.timeframe_names, self.timeframe_history
+        )
+        self.timeframes_key = key
+        self.timeframe_cache.clear()
+
+    def _warm_start(self, symbol, currency):
+        # 保存済みの1分足をバッファに読み込む
+        store = self._get_store(symbol, currency)
+        if store is None or not len(store):
+            return
+
+        # 上位の時間足の履歴の分もまとめて読み込む
+        count = self.bars.maxlen
+        if self.timeframes is not None:
+            count = max(count, self.timeframes.span_minutes)
+        bars = store.to_bars(store.tail(count))
+        self.bars.merge(bars[-self.bars.maxlen :])
+        if self.timeframes is not None:
+            self.timeframes.merge(
+                aggregate_bars(bars),
+                first_time=bars[0]["time"],
+                last_time=bars[-1]["time"],
+            )
+        logger.info("Loaded %d minute bars from candle store", len(bars))
+
+    def _load_full_data(self, symbol, currency, limit):
+        data_list = self.fetch_data(symbol, currency, limit)
+
+        # データフレームに変換して5分足にリサンプリング
+        self.df = resample_bars(pd.DataFrame(data_list))
+        if self.timeframes is None or self.df.empty:
+            return
+
+        # 最も長い時間足の履歴に必要な5分足のみを上位の時間足に反映する
+        tail = self.df.tail(
+            self.timeframes.span_minutes * 60 // BUCKET_SECONDS
+        )
+        seconds = (tail["timestamp"] - pd.Timestamp(0)) // pd.Timedelta(
+            seconds=1
+        )
+        buckets = tail.drop(columns="timestamp").assign(time=seconds)
+        self.timeframes.merge(
+            buckets.to_dict("records"),
+            first_time=data_list[0]["time"],
+            last_time=data_list[-1]["time"],
+        )
+
+    def _buckets_to_frame(self, buckets):
+        df = pd.DataFrame(
+            buckets,
+            columns=["time", "open", "high", "low", "close", "volumefrom"],
+        )
+        df.insert(0, "timestamp", pd.to_datetime(df.pop("time"), unit="s"))
+        return df
+
+    def _rebuild_engine(self):
+        # データフレームの全期間から指標を計算し直す
+        self.engine.reset()
+        seconds = (self.df["timestamp"] - pd.Timestamp(0)) // pd.Timedelta(
+            seconds=1
         )
+        for timestamp, close in zip(seconds, self.df["close"]):
+            self.engine.append(int(timestamp), close)
 
-        # timestampを再設定
-        self.df = self.df.reset_index()
+    def _update_engine(self, touched):
+        if self.engine.last_timestamp is None:
+            self._rebuild_engine()
+            return
+
+        # 更新された5分足のみを指標エンジンに反映する
+        oldest = self.bars.bucket_start(self.bars.first_time)
+        for start in touched:
+            if start == oldest and start < self.engine.last_timestamp:
+                # 古い足の破棄による先頭の足の変化は無視する
+                continue
+            bucket = self.bars.buckets[start]
+            if not self.engine.update(start, bucket["close"]):
+                self._rebuild_engine()
+                return
+
+    def _get_streaming_signals(self):
+        df = pd.DataFrame(self.engine.get_rows(), columns=SIGNAL_COLUMNS)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s")
+        return df.dropna().tail(50)
 
     def calculate_signals(self):
         """
@@ -72,40 +346,11 @@ class TradingSignals:
         if self.df is None:
             raise ValueError("Data not loaded. Please run load_data() first.")
 
-        # 移動平均の計算
-        self.df["Short_MA"] = (
-            self.df["close"].rolling(window=5).mean()
-        )  # 短期移動平均（5期間）
-        self.df["Long_MA"] = (
-            self.df["close"].rolling(window=50).mean()
-        )  # 長期移動平均（50期間）
-        self.df["Signal"] = np.where(
-            self.df["Short_MA"] > self.df["Long_MA"], 1, -1
-        )  # シグナルの生成
-
-        # RSIの計算
-        delta = self.df["close"].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        self.df["RSI"] = 100 - (100 / (1 + rs))
-
-        # MACDの計算
-        self.df["EMA12"] = self.df["close"].ewm(span=12, adjust=False).mean()
-        self.df["EMA26"] = self.df["close"].ewm(span=26, adjust=False).mean()
-        self.df["MACD"] = self.df["EMA12"] - self.df["EMA26"]
-        self.df["Signal_Line"] = (
-            self.df["MACD"].ewm(span=9, adjust=False).mean()
-        )
+        if self.kernels is not None:
+            self.kernels.compute(self.df["close"].to_numpy(dtype=float))
+            return
 
-        # ボリンジャーバンドの計算
-        self.df["BB_Mid"] = self.df["close"].rolling(window=20).mean()
-        self.df["BB_Upper"] = (
-            self.df["BB_Mid"] + 2 * self.df["close"].rolling(window=20).std()
-        )
-        self.df["BB_Lower"] = (
-            self.df["BB_Mid"] - 2 * self.df["close"].rolling(window=20).std()
-        )
+        calculate_indicators(self.df)
 
     def get_signals(self):
         """
@@ -114,24 +359,45 @@ class TradingSignals:
         if self.df is None:
             raise ValueError("Data not loaded. Please run load_data() first.")
 
+        if self.engine is not None:
+            return self._get_streaming_signals()
+
         self.calculate_signals()
+        if self.kernels is not None:
+            return self.kernels.to_frame(self.df, 50)
+
         # 最新の50期間分のデータを返す
-        return (
-            self.df[
-                [
-                    "timestamp",
-                    "close",
-                    "Short_MA",
-                    "Long_MA",
-                    "Signal",
-                    "RSI",
-                    "MACD",
-                    "Signal_Line",
-                    "BB_Upper",
-                    "BB_Mid",
-                    "BB_Lower",
-                ]
-            ]
-            .dropna()
-            .tail(50)
-        )
+        return self.df[SIGNAL_COLUMNS].dropna().tail(50)
+
+    def _calculate_timeframe(self, name):
+        # 確定した足のみから指標を計算する
+        df = self._buckets_to_frame(self.timeframes.closed_bars(name))
+        if self.signal_engine == "numpy":
+            kernels = self.timeframe_kernels.setdefault(
+                name, NumpyIndicators()
+            )
+            kernels.compute(df["close"].to_numpy(dtype=float))
+            return kernels.to_frame(df, self.timeframe_rows)
+
+        df = calculate_indicators(df)
+        return df[SIGNAL_COLUMNS].dropna().tail(self.timeframe_rows)
+
+    def get_timeframe_signals(self):
+        """
+        上位の時間足ごとのシグナルを返す（足が確定するまで計算結果を再利用する）
+        """
+        if self.timeframes is None:
+            return None
+
+        signals = {}
+        for name in self.timeframes.timeframes:
+            key = self.timeframes.closed_key(name)
+            cached = self.timeframe_cache.get(name)
+            if cached is None or cached[0] != key:
+                cached = (key, self._calculate_timeframe(name))
+                self.timeframe_cache[name] = cached
+                logger.debug(
+                    "Calculated %s signals (%d rows)", name, len(cached[1])
+                )
+            signals[name] = cached[1]
+        return signals
@@ -7,3 +7,15 @@ class APIError(Exception):
     """
     API Error
     """
+
+
+class DecisionError(Exception):
+    """
+    Decision request error
+    """
+
+
+class TemplateError(ValueError):
+    """
+    Prompt template error
+    """
@@ -0,0 +1,932 @@
+"""
+Matching engine
+"""
+
+import bisect
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+
+def format_time(timestamp):
+    """
+    UNIX時刻をbitFlyerと同じ形式の文字列に変換する
+    """
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%S.%f"
+    )[:-3]
+
+
+class ExchangeError(Exception):
+    """
+    取引所のエラー（bitFlyerのエラーコードとメッセージ）
+    """
+
+    def __init__(self, status, message, http_status=400):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.http_status = http_status
+
+
+class Order:
+    """
+    取引所内の注文
+    """
+
+    def __init__(
+        self,
+        order_id,
+        acceptance_id,
+        owner,
+        product_code,
+        side,
+        order_type,
+        price,
+        size,
+        time_in_force,
+        created_at,
+        expire_at,
+    ):
+        self.order_id = order_id
+        self.acceptance_id = acceptance_id
+        self.owner = owner
+        self.product_code = product_code
+        self.side = side
+        self.order_type = order_type
+        self.price = price
+        self.size = size
+        self.time_in_force = time_in_force
+        self.created_at = created_at
+        self.expire_at = expire_at
+
+        self.state = "ACTIVE"
+        self.outstanding_size = size
+        self.executed_size = 0.0
+        self.executed_value = 0.0
+        self.cancel_size = 0.0
+        self.total_commission = 0.0
+
+    def to_dict(self):
+        """
+        getchildordersと同じ形式に変換する
+        """
+        average_price = (
+            self.executed_value / self.executed_size
+            if self.executed_size
+            else 0
+        )
+        return {
+            "id": self.order_id,
+            "child_order_id": f"JOR{self.order_id:012d}",
+            "product_code": self.product_code,
+            "side": self.side,
+            "child_order_type": self.order_type,
+            "price": self.price or 0,
+            "average_price": average_price,
+            "size": self.size,
+            "child_order_state": self.state,
+            "expire_date": format_time(self.expire_at),
+            "child_order_date": format_time(self.created_at),
+            "child_order_acceptance_id": self.acceptance_id,
+            "outstanding_size": round(self.outstanding_size, 8),
+            "cancel_size": round(self.cancel_size, 8),
+            "executed_size": round(self.executed_size, 8),
+            "total_commission": self.total_commission,
+            "time_in_force": self.time_in_force,
+        }
+
+
+# 特殊注文の種類ごとの段階（同じ段階の2つの注文はOCOとして扱う）
+PARENT_ORDER_STAGES = {
+    "SIMPLE": ((0,),),
+    "IFD": ((0,), (1,)),
+    "OCO": ((0, 1),),
+    "IFDOCO": ((0,), (1, 2)),
+}
+
+# 特殊注文で使用できる執行条件
+CONDITION_TYPES = ("LIMIT", "MARKET", "STOP", "STOP_LIMIT")
+
+
+class ParentOrder:
+    """
+    取引所内の特殊注文（SIMPLE・IFD・OCO・IFDOCO）
+    """
+
+    def __init__(
+        self,
+        parent_id,
+        acceptance_id,
+        owner,
+        product_code,
+        order_method,
+        parameters,
+        time_in_force,
+        created_at,
+        expire_at,
+    ):
+        self.parent_id = parent_id
+        self.acceptance_id = acceptance_id
+        self.owner = owner
+        self.product_code = product_code
+        self.order_method = order_method
+        self.parameters = parameters
+        self.time_in_force = time_in_force
+        self.created_at = created_at
+        self.expire_at = expire_at
+
+        self.state = "ACTIVE"
+        self.stage = 0
+
+        # 発注済みの子注文と発動待ちの逆指値（パラメータの番号がキー）
+        self.children = {}
+        self.pending = {}
+
+    def to_dict(self):
+        """
+        getparentordersと同じ形式に変換する
+        """
+        first = self.parameters[0]
+        child = self.children.get(0)
+        executed_size = child.executed_size if child else 0.0
+        executed_value = child.executed_value if child else 0.0
+        return {
+            "id": self.parent_id,
+            "parent_order_id": f"JCP{self.parent_id:012d}",
+            "product_code": self.product_code,
+            "side": first["side"],
+            "parent_order_type": self.order_method,
+            "price": first.get("price") or 0,
+            "average_price": (
+                executed_value / executed_size if executed_size else 0
+            ),
+            "size": first["size"],
+            "parent_order_state": self.state,
+            "expire_date": format_time(self.expire_at),
+            "parent_order_date": format_time(self.created_at),
+            "parent_order_acceptance_id": self.acceptance_id,
+            "outstanding_size": round(first["size"] - executed_size, 8),
+            "cancel_size": child.cancel_size if child else 0.0,
+            "executed_size": executed_size,
+            "total_commission": child.total_commission if child else 0.0,
+        }
+
+
+class Account:
+    """
+    APIキーごとの残高と約定履歴
+    """
+
+    def __init__(self, jpy=1000000, btc=0.1):
+        self.balances = {"JPY": float(jpy), "BTC": float(btc)}
+        self.executions = deque(maxlen=1000)
+
+
+class MatchingEngine:
+    """
+    価格・時間優先で注文を付け合わせる取引所エンジン
+    """
+
+    def __init__(
+        self,
+        product_code="BTC_JPY",
+        initial_price=10000000,
+        spread=1000,
+        commission_rate=0.0,
+        clock=time.time,
+        depth_levels=20,
+        level_size=0.5,
+    ):
+        self.product_code = product_code
+        self.spread = spread
+        self.commission_rate = commission_rate
+        self.clock = clock
+        self.now = clock()
+        self.state = "RUNNING"
+        self.lock = threading.RLock()
+
+        # 直近の約定価格と出来高
+        self.ltp = float(initial_price)
+        self.volume = 0.0
+        self.tick_id = 0
+
+        # 外部の流動性として板に表示する気配の数と数量
+        self.depth_levels = depth_levels
+        self.level_size = level_size
+
+        # 価格ごとの注文キュー（時間優先）と昇順の価格リスト
+        self.levels = {"BUY": {}, "SELL": {}}
+        self.prices = {"BUY": [], "SELL": []}
+
+        self.orders = {}
+        self.parent_orders = {}
+        self.updating_parents = False
+        self.accounts = {}
+        self.public_executions = deque(maxlen=1000)
+        self.order_ids = itertools.count(1)
+        self.execution_ids = itertools.count(1)
+        self.listeners = []
+
+    def add_account(self, owner, jpy=1000000, btc=0.1):
+        """
+        口座を追加する
+        """
+        with self.lock:
+            self.accounts[owner] = Account(jpy, btc)
+
+    def add_listener(self, listener):
+        """
+        約定やティッカーの更新を受け取るコールバックを登録する
+        """
+        self.listeners.append(listener)
+
+    def _notify(self, event, payload):
+        for listener in self.listeners:
+            listener(event, payload)
+
+    def get_time(self):
+        """
+        取引所の現在時刻
+        """
+        return self.now
+
+    def advance(self, now=None):
+        """
+        時刻を進め、有効期限を過ぎた注文を失効させる
+        """
+        with self.lock:
+            self.now = self.clock() if now is None else now
+            for order in list(self.orders.values()):
+                if order.state == "ACTIVE" and order.expire_at <= self.now:
+                    self._remove_from_book(order)
+                    order.cancel_size = order.outstanding_size
+                    order.outstanding_size = 0.0
+                    order.state = "EXPIRED"
+            self._update_parent_orders()
+
+    # 板の操作
+
+    def _best_price(self, side):
+        prices = self.prices[side]
+        if not prices:
+            return None
+        return prices[-1] if side == "BUY" else prices[0]
+
+    def _add_to_book(self, order):
+        levels = self.levels[order.side]
+        if order.price not in levels:
+            levels[order.price] = deque()
+            bisect.insort(self.prices[order.side], order.price)
+        levels[order.price].append(order)
+        self._notify_level(order.side, order.price)
+
+    def _remove_from_book(self, order):
+        levels = self.levels[order.side]
+        queue = levels.get(order.price)
+        if queue is None or order not in queue:
+            return
+        queue.remove(order)
+        if not queue:
+            del levels[order.price]
+            prices = self.prices[order.side]
+            prices.pop(bisect.bisect_left(prices, order.price))
+        self._notify_level(order.side, order.price)
+
+    def _level_size(self, side, price):
+        queue = self.levels[side].get(price, ())
+        return sum(order.outstanding_size for order in queue)
+
+    def _notify_level(self, side, price):
+        # 価格ごとの数量の変化を板の差分として通知する
+        if not self.listeners:
+            return
+        level = [{"price": price, "size": self._level_size(side, price)}]
+        self._notify(
+            "board",
+            {
+                "mid_price": self.ltp,
+                "bids": level if side == "BUY" else [],
+                "asks": level if side == "SELL" else [],
+            },
+        )
+
+    def get_market_prices(self):
+        """
+        外部の流動性を含めた最良気配を返す
+        """
+        best_bid = self.ltp - self.spread / 2
+        best_ask = self.ltp + self.spread / 2
+        book_bid = self._best_price("BUY")
+        book_ask = self._best_price("SELL")
+        if book_bid is not None:
+            best_bid = max(best_bid, book_bid)
+        if book_ask is not None:
+            best_ask = min(best_ask, book_ask)
+        return best_bid, best_ask
+
+    def get_depth(self, side):
+        """
+        指定した側の板の数量を価格ごとに返す（最良気配から順）
+        """
+        prices = self.prices[side]
+        if side == "BUY":
+            prices = reversed(prices)
+        return [
+            (
+                price,
+                sum(
+                    order.outstanding_size
+                    for order in self.levels[side][price]
+                ),
+            )
+            for price in prices
+        ]
+
+    # 約定処理
+
+    def _execute(self, order, price, size):
+        account = self.accounts[order.owner]
+        commission = round(size * self.commission_rate, 8)
+        if order.side == "BUY":
+            account.balances["JPY"] -= price * size
+            account.balances["BTC"] += size - commission
+        else:
+            account.balances["BTC"] -= size
+            account.balances["JPY"] += price * (size - commission)
+
+        order.outstanding_size = round(order.outstanding_size - size, 8)
+        order.executed_size = round(order.executed_size + size, 8)
+        order.executed_value += price * size
+        order.total_commission += commission
+        if order.outstanding_size <= 0:
+            order.state = "COMPLETED"
+
+        execution = {
+            "id": next(self.execution_ids),
+            "child_order_id": f"JOR{order.order_id:012d}",
+            "side": order.side,
+            "price": price,
+            "size": size,
+            "commission": commission,
+            "exec_date": format_time(self.now),
+            "child_order_acceptance_id": order.acceptance_id,
+        }
+        account.executions.appendleft(execution)
+        self._notify("execution", execution)
+
+        if order.price is not None and order.price in self.levels[order.side]:
+            self._notify_level(order.side, order.price)
+
+    def _trade(self, price, size, side="", update_ltp=True):
+        execution = {
+            "id": next(self.execution_ids),
+            "side": side,
+            "price": float(price),
+            "size": size,
+            "exec_date": format_time(self.now),
+        }
+        self.public_executions.appendleft(execution)
+        self._notify("executions", [execution])
+
+        if update_ltp:
+            self.ltp = float(price)
+        self.volume += size
+        self.tick_id += 1
+        self._notify("ticker", self.get_ticker())
+
+    def _available(self, owner, currency):
+        # 板に残っている注文の分は利用可能額から除く
+        account = self.accounts[owner]
+        reserved = 0.0
+        for order in self.orders.values():
+            if order.owner != owner or order.state != "ACTIVE":
+                continue
+            if currency == "JPY" and order.side == "BUY":
+                reserved += (order.price or self.ltp) * order.outstanding_size
+            elif currency == "BTC" and order.side == "SELL":
+                reserved += order.outstanding_size
+        return account.balances[currency] - reserved
+
+    def _fillable_size(self, order):
+        # 板の注文と外部の流動性で約定できる数量
+        opposite = "SELL" if order.side == "BUY" else "BUY"
+        market_bid = self.ltp - self.spread / 2
+        market_ask = self.ltp + self.spread / 2
+        market_price = market_ask if order.side == "BUY" else market_bid
+        if order.price is None or self._crosses(order, market_price):
+            return order.size
+
+        total = 0.0
+        for price, size in self.get_depth(opposite):
+            if not self._crosses(order, price):
+                break
+            total += size
+        return total
+
+    def _crosses(self, order, price):
+        if order.price is None:
+            return True
+        if order.side == "BUY":
+            return price <= order.price
+        return price >= order.price
+
+    def submit_order(
+        self,
+        owner,
+        side,
+        order_type,
+        size,
+        price=None,
+        minute_to_expire=43200,
+        time_in_force="GTC",
+        check_funds=True,
+    ):
+        """
+        注文を受け付けて付け合わせる
+        """
+        with self.lock:
+            if owner not in self.accounts:
+                raise ExchangeError(-500, "Account not found", 401)
+            if side not in ("BUY", "SELL"):
+                raise ExchangeError(-110, "Invalid side")
+            if order_type not in ("LIMIT", "MARKET"):
+                raise ExchangeError(-110, "Invalid child_order_type")
+            if time_in_force not in ("GTC", "IOC", "FOK"):
+                raise ExchangeError(-110, "Invalid time_in_force")
+            if not size or size < 0.001:
+                raise ExchangeError(-110, "The minimum order size is 0.001")
+            if order_type == "LIMIT" and not price:
+                raise ExchangeError(-110, "Price is required")
+
+            # 残高の確認
+            _, best_ask = self.get_market_prices()
+            if side == "BUY":
+                required = (
+                    price if order_type == "LIMIT" else best_ask
+                ) * size
+                available = self._available(owner, "JPY")
+            else:
+                required = size
+                available = self._available(owner, "BTC")
+            if check_funds and required > available:
+                raise ExchangeError(-200, "Insufficient funds")
+
+            order_id = next(self.order_ids)
+            order = Order(
+                order_id,
+                f"JRF{order_id:012d}",
+                owner,
+                self.product_code,
+                side,
+                order_type,
+                float(price) if order_type == "LIMIT" else None,
+                float(size),
+                time_in_force,
+                self.now,
+                self.now + minute_to_expire * 60,
+            )
+            self.orders[order.acceptance_id] = order
+
+            if time_in_force == "FOK" and self._fillable_size(order) < size:
+                order.cancel_size = order.size
+                order.outstanding_size = 0.0
+                order.state = "CANCELED"
+                self._update_parent_orders()
+                return order
+
+            self._match(order)
+
+            if order.state == "ACTIVE":
+                if order_type == "MARKET" or time_in_force != "GTC":
+                    # 板に残らない注文の残りは取り消す
+                    order.cancel_size = order.outstanding_size
+                    order.outstanding_size = 0.0
+                    order.state = "CANCELED"
+                else:
+                    self._add_to_book(order)
+            self._update_parent_orders()
+            return order
+
+    def _match(self, order):
+        opposite = "SELL" if order.side == "BUY" else "BUY"
+
+        # 板の注文と価格・時間優先で付け合わせる
+        while order.outstanding_size > 0:
+            best = self._best_price(opposite)
+            if best is None or not self._crosses(order, best):
+                break
+            queue = self.levels[opposite][best]
+            resting = queue[0]
+            size = min(order.outstanding_size, resting.outstanding_size)
+            self._execute(order, best, size)
+            self._execute(resting, best, size)
+            self._trade(best, size, order.side)
+            if resting.state != "ACTIVE":
+                self._remove_from_book(resting)
+
+        # 残りは外部の流動性（直近価格±スプレッド）で約定させる
+        if order.outstanding_size > 0:
+            market_bid = self.ltp - self.spread / 2
+            market_ask = self.ltp + self.spread / 2
+            price = market_ask if order.side == "BUY" else market_bid
+            if self._crosses(order, price):
+                size = order.outstanding_size
+                self._execute(order, price, size)
+                self._trade(price, size, order.side, update_ltp=False)
+
+    def cancel_order(self, owner, acceptance_id):
+        """
+        注文を取り消す
+        """
+        with self.lock:
+            order = self.orders.get(acceptance_id)
+            if order is None or order.owner != owner:
+                raise ExchangeError(-111, "Order not found")
+            if order.state != "ACTIVE":
+                return order
+            self._remove_from_book(order)
+            order.cancel_size = order.outstanding_size
+            order.outstanding_size = 0.0
+            order.state = "CANCELED"
+            self._update_parent_orders()
+            return order
+
+    # 特殊注文
+
+    def submit_parent_order(
+        self,
+        owner,
+        order_method,
+        parameters,
+        minute_to_expire=43200,
+        time_in_force="GTC",
+    ):
+        """
+        特殊注文を受け付け、最初の段階の注文を発注する
+        """
+        with self.lock:
+            if owner not in self.accounts:
+                raise ExchangeError(-500, "Account not found", 401)
+            stages = PARENT_ORDER_STAGES.get(order_method)
+            if stages is None:
+                raise ExchangeError(-110, "Invalid order_method")
+            count = max(index for stage in stages for index in stage) + 1
+            if not parameters or len(parameters) != count:
+                raise ExchangeError(
+                    -110, f"{order_method} requires {count} parameters"
+                )
+            for parameter in parameters:
+                self._validate_parameter(parameter)
+
+            parent_id = next(self.order_ids)
+            parent = ParentOrder(
+                parent_id,
+                f"JRF{parent_id:012d}",
+                owner,
+                self.product_code,
+                order_method,
+                [dict(parameter) for parameter in parameters],
+                time_in_force,
+                self.now,
+                self.now + minute_to_expire * 60,
+            )
+
+            # 残高が足りない場合は最初の注文の発注で例外を送出する
+            for position, index in enumerate(stages[0]):
+                self._activate_child(parent, index, check_funds=position == 0)
+            self.parent_orders[parent.acceptance_id] = parent
+            self._update_parent_orders()
+            return parent
+
+    def _validate_parameter(self, parameter):
+        product_code = parameter.get("product_code", self.product_code)
+        if product_code != self.product_code:
+            raise ExchangeError(-100, "Invalid product_code")
+        condition_type = parameter.get("condition_type")
+        if condition_type not in CONDITION_TYPES:
+            raise ExchangeError(-110, "Invalid condition_type")
+        if parameter.get("side") not in ("BUY", "SELL"):
+            raise ExchangeError(-110, "Invalid side")
+        if not parameter.get("size") or parameter["size"] < 0.001:
+            raise ExchangeError(-110, "The minimum order size is 0.001")
+        if condition_type in ("LIMIT", "STOP_LIMIT") and not parameter.get(
+            "price"
+        ):
+            raise ExchangeError(-110, "Price is required")
+        if condition_type in ("STOP", "STOP_LIMIT") and not parameter.get(
+            "trigger_price"
+        ):
+            raise ExchangeError(-110, "Trigger price is required")
+
+    def _activate_child(self, parent, index, check_funds=False):
+        parameter = parent.parameters[index]
+        if parameter["condition_type"] in ("STOP", "STOP_LIMIT"):
+            # 逆指値は発動価格に達するまで板に出さない
+            parent.pending[index] = parameter
+            return
+        self._submit_child(
+            parent, index, parameter["condition_type"], check_funds
+        )
+
+    def _submit_child(self, parent, index, order_type, check_funds=False):
+        parameter = parent.parameters[index]
+        parent.children[index] = self.submit_order(
+            parent.owner,
+            parameter["side"],
+            order_type,
+            parameter["size"],
+            parameter.get("price"),
+            max((parent.expire_at - self.now) / 60, 0),
+            parent.time_in_force,
+            check_funds=check_funds,
+        )
+
+    def _triggered(self, parameter):
+        if parameter["side"] == "BUY":
+            return self.ltp >= parameter["trigger_price"]
+        return self.ltp <= parameter["trigger_price"]
+
+    def _close_parent(self, parent, state):
+        for child in parent.children.values():
+            if child.state == "ACTIVE":
+                self._remove_from_book(child)
+                child.cancel_size = child.outstanding_size
+                child.outstanding_size = 0.0
+                child.state = "CANCELED"
+        parent.pending.clear()
+        parent.state = state
+
+    def _step_parent(self, parent):
+        # 発動価格に達した逆指値を発注する
+        for index, parameter in list(parent.pending.items()):
+            if self._triggered(parameter):
+                del parent.pending[index]
+                order_type = (
+                    "MARKET"
+                    if parameter["condition_type"] == "STOP"
+                    else "LIMIT"
+                )
+                self._submit_child(parent, index, order_type)
+                return True
+
+        if parent.expire_at <= self.now:
+            self._close_parent(parent, "EXPIRED")
+            return True
+
+        stage = PARENT_ORDER_STAGES[parent.order_method][parent.stage]
+        children = [
+            parent.children[index]
+            for index in stage
+            if index in parent.children
+        ]
+
+        # OCO：一方が約定したらもう一方を取り消す
+        if len(stage) > 1 and any(c.executed_size > 0 for c in children):
+            changed = False
+            for index in stage:
+                child = parent.children.get(index)
+                if child is not None and child.executed_size > 0:
+                    continue
+                if parent.pending.pop(index, None) is not None:
+                    changed = True
+                if child is not None and child.state == "ACTIVE":
+                    self._remove_from_book(child)
+                    child.cancel_size = child.outstanding_size
+                    child.outstanding_size = 0.0
+                    child.state = "CANCELED"
+                    changed = True
+            if changed:
+                return True
+
+        if any(child.state == "COMPLETED" for child in children):
+            stages = PARENT_ORDER_STAGES[parent.order_method]
+            if parent.stage + 1 < len(stages):
+                parent.stage += 1
+                for index in stages[parent.stage]:
+                    self._activate_child(parent, index)
+            else:
+                parent.state = "COMPLETED"
+            return True
+
+        # 段階のすべての注文が約定せずに終了した場合
+        if not any(index in parent.pending for index in stage) and all(
+            index in parent.children
+            and parent.children[index].state != "ACTIVE"
+            for index in stage
+        ):
+            self._close_parent(parent, "CANCELED")
+            return True
+        return False
+
+    def _update_parent_orders(self):
+        # 子注文の発注で再び呼び出された場合は外側のループに任せる
+        if self.updating_parents:
+            return
+        self.updating_parents = True
+        try:
+            changed = True
+            while changed:
+                changed = False
+                for parent in list(self.parent_orders.values()):
+                    if parent.state == "ACTIVE" and self._step_parent(parent):
+                        changed = True
+        finally:
+            self.updating_parents = False
+
+    def cancel_parent_order(self, owner, acceptance_id):
+        """
+        特殊注文と発注済みの子注文を取り消す
+        """
+        with self.lock:
+            parent = self.parent_orders.get(acceptance_id)
+            if parent is None or parent.owner != owner:
+                raise ExchangeError(-111, "Order not found")
+            if parent.state == "ACTIVE":
+                self._close_parent(parent, "CANCELED")
+            return parent
+
+    def get_parent_orders(
+        self, owner, parent_order_state=None, parent_order_acceptance_id=None
+    ):
+        """
+        getparentordersと同じ形式の特殊注文の一覧（新しい順）
+        """
+        with self.lock:
+            parents = [
+                parent
+                for parent in self.parent_orders.values()
+                if parent.owner == owner
+                and (
+                    parent_order_state is None
+                    or parent.state == parent_order_state
+                )
+                and (
+                    parent_order_acceptance_id is None
+                    or parent.acceptance_id == parent_order_acceptance_id
+                )
+            ]
+            return [parent.to_dict() for parent in reversed(parents)]
+
+    # 市場データの再生
+
+    def replay_trade(self, price, size=None, timestamp=None):
+        """
+        外部の約定を再生し、価格が交差した板の注文を約定させる
+        """
+        with self.lock:
+            if timestamp is not None:
+                self.advance(timestamp)
+
+            remaining = size
+            for side in ("BUY", "SELL"):
+                while remaining is None or remaining > 0:
+                    best = self._best_price(side)
+                    if best is None:
+                        break
+                    if (side == "BUY" and best < price) or (
+                        side == "SELL" and best > price
+                    ):
+                        break
+                    resting = self.levels[side][best][0]
+                    fill = resting.outstanding_size
+                    if remaining is not None:
+                        fill = min(fill, remaining)
+                        remaining -= fill
+                    self._execute(resting, best, fill)
+                    if resting.state != "ACTIVE":
+                        self._remove_from_book(resting)
+
+            side = "BUY" if price >= self.ltp else "SELL"
+            self._trade(price, size or 0.0, side)
+            self._update_parent_orders()
+
+    def replay_candle(self, bar):
+        """
+        1分足を始値→安値/高値→終値の順の約定として再生する
+        """
+        if bar["close"] >= bar["open"]:
+            path = ("open", "low", "high", "close")
+        else:
+            path = ("open", "high", "low", "close")
+        size = bar.get("volumefrom") or None
+        for index, key in enumerate(path):
+            self.replay_trade(
+                bar[key],
+                size / len(path) if size else None,
+                bar["time"] + index * 15,
+            )
+
+    # 参照用のデータ
+
+    def get_ticker(self):
+        """
+        gettickerと同じ形式のティッカー
+        """
+        with self.lock:
+            best_bid, best_ask = self.get_market_prices()
+            bid_depth = sum(size for _, size in self.get_depth("BUY"))
+            ask_depth = sum(size for _, size in self.get_depth("SELL"))
+            return {
+                "product_code": self.product_code,
+                "state": self.state,
+                "timestamp": format_time(self.now),
+                "tick_id": self.tick_id,
+                "best_bid": best_bid,
+                "best_ask": best_ask,
+                "best_bid_size": 1.0,
+                "best_ask_size": 1.0,
+                "total_bid_depth": bid_depth,
+                "total_ask_depth": ask_depth,
+                "market_bid_size": 0.0,
+                "market_ask_size": 0.0,
+                "ltp": self.ltp,
+                "volume": self.volume,
+                "volume_by_product": self.volume,
+            }
+
+    def get_board(self):
+        """
+        getboardと同じ形式の板（外部の流動性を含む）
+        """
+        with self.lock:
+            levels = {"BUY": {}, "SELL": {}}
+            for index in range(self.depth_levels):
+                offset = self.spread / 2 + index * self.spread
+                levels["BUY"][self.ltp - offset] = self.level_size
+                levels["SELL"][self.ltp + offset] = self.level_size
+            for side in ("BUY", "SELL"):
+                for price, size in self.get_depth(side):
+                    levels[side][price] = levels[side].get(price, 0.0) + size
+            return {
+                "mid_price": self.ltp,
+                "bids": [
+                    {"price": price, "size": size}
+                    for price, size in sorted(
+                        levels["BUY"].items(), reverse=True
+                    )
+                ],
+                "asks": [
+                    {"price": price, "size": size}
+                    for price, size in sorted(levels["SELL"].items())
+                ],
+            }
+
+    def get_public_executions(self, count=100, before=None, after=None):
+        """
+        公開APIのgetexecutionsと同じ形式の約定履歴（新しい順）
+        """
+        with self.lock:
+            executions = [
+                execution
+                for execution in self.public_executions
+                if (before is None or execution["id"] < before)
+                and (after is None or execution["id"] > after)
+            ]
+            return executions[:count]
+
+    def get_balance(self, owner):
+        """
+        getbalanceと同じ形式の残高
+        """
+        with self.lock:
+            return [
+                {
+                    "currency_code": currency,
+                    "amount": amount,
+                    "available": self._available(owner, currency),
+                }
+                for currency, amount in self.accounts[owner].balances.items()
+            ]
+
+    def get_executions(self, owner, count=100):
+        """
+        getexecutionsと同じ形式の約定履歴（新しい順）
+        """
+        with self.lock:
+            executions = self.accounts[owner].executions
+            return list(itertools.islice(executions, count))
+
+    def get_child_orders(
+        self, owner, child_order_state=None, child_order_acceptance_id=None
+    ):
+        """
+        getchildordersと同じ形式の注文一覧（新しい順）
+        """
+        with self.lock:
+            orders = [
+                order
+                for order in self.orders.values()
+                if order.owner == owner
+                and (
+                    child_order_state is None
+                    or order.state == child_order_state
+                )
+                and (
+                    child_order_acceptance_id is None
+                    or order.acceptance_id == child_order_acceptance_id
+                )
+            ]
+            return [order.to_dict() for order in reversed(orders)]
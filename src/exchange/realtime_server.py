@@ -0,0 +1,307 @@
+"""
+Local bitFlyer Realtime API stand-in server
+"""
+
+import base64
+import hashlib
+import json
+import queue
+import socketserver
+import struct
+import threading
+from src.logger_setup import get_logger
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# RFC 6455のハンドシェイクで使用する固定値
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# フレームの種類
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+
+def encode_frame(opcode, payload):
+    """
+    サーバーから送信するフレーム（マスクなし）を作成する
+    """
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 65536:
+        header += bytes([126]) + struct.pack(">H", length)
+    else:
+        header += bytes([127]) + struct.pack(">Q", length)
+    return header + payload
+
+
+def read_frame(rfile):
+    """
+    クライアントから受信したフレームのopcodeとペイロードを返す
+    """
+    header = rfile.read(2)
+    if len(header) < 2:
+        raise ConnectionError("Connection closed")
+    opcode = header[0] & 0x0F
+    masked = header[1] & 0x80
+    length = header[1] & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", rfile.read(2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", rfile.read(8))[0]
+    mask = rfile.read(4) if masked else None
+    payload = rfile.read(length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+class RealtimeConnection(socketserver.StreamRequestHandler):
+    """
+    WebSocketの接続ごとにJSON-RPCの購読を処理する
+    """
+
+    def setup(self):
+        super().setup()
+        self.subscriptions = set()
+        self.outbox = queue.Queue()
+        self.writer = None
+
+    def handle(self):
+        if not self._handshake():
+            return
+
+        standin = self.server.standin
+        standin.add_connection(self)
+        self.writer = threading.Thread(target=self._write, daemon=True)
+        self.writer.start()
+        try:
+            while True:
+                opcode, payload = read_frame(self.rfile)
+                if opcode == OPCODE_CLOSE:
+                    break
+                if opcode == OPCODE_PING:
+                    self.outbox.put(encode_frame(OPCODE_PONG, payload))
+                elif opcode == OPCODE_TEXT:
+                    self._handle_request(json.loads(payload.decode("utf-8")))
+        except (ConnectionError, OSError, ValueError) as e:
+            logger.debug("Realtime connection closed: %s", e)
+        finally:
+            standin.remove_connection(self)
+            self.outbox.put(None)
+
+    def _handshake(self):
+        headers = {}
+        self.rfile.readline()
+        while True:
+            line = self.rfile.readline().decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        key = headers.get("sec-websocket-key")
+        if not key:
+            self.wfile.write(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+            return False
+
+        accept = base64.b64encode(
+            hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()
+        ).decode()
+        self.wfile.write(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode()
+        )
+        return True
+
+    def _handle_request(self, request):
+        method = request.get("method")
+        channel = (request.get("params") or {}).get("channel")
+        if method == "subscribe" and channel in self.server.standin.channels:
+            self.subscriptions.add(channel)
+            self.send(
+                {"jsonrpc": "2.0", "id": request.get("id"), "result": True}
+            )
+            self.server.standin.send_initial(self, channel)
+        elif method == "unsubscribe":
+            self.subscriptions.discard(channel)
+            self.send(
+                {"jsonrpc": "2.0", "id": request.get("id"), "result": True}
+            )
+        else:
+            self.send(
+                {
+                    "jsonrpc": "2.0",
+                    "id": request.get("id"),
+                    "error": {"code": -32602, "message": "Invalid params"},
+                }
+            )
+
+    def send(self, message):
+        """
+        JSONのメッセージを送信キューに追加する
+        """
+        payload = json.dumps(message).encode("utf-8")
+        self.outbox.put(encode_frame(OPCODE_TEXT, payload))
+
+    def publish(self, channel, message):
+        """
+        購読中のチャンネルであればメッセージを送信する
+        """
+        if channel in self.subscriptions:
+            self.send(
+                {
+                    "jsonrpc": "2.0",
+                    "method": "channelMessage",
+                    "params": {"channel": channel, "message": message},
+                }
+            )
+
+    def close(self):
+        """
+        クライアントとの接続を切断する
+        """
+        self.outbox.put(encode_frame(OPCODE_CLOSE, b""))
+        self.outbox.put(None)
+
+    def _write(self):
+        # 送信は専用のスレッドで行い、エンジンの処理を待たせない
+        while True:
+            frame = self.outbox.get()
+            if frame is None:
+                break
+            try:
+                self.wfile.write(frame)
+            except OSError:
+                break
+        try:
+            self.request.shutdown(2)
+        except OSError:
+            pass
+
+
+class RealtimeServer(socketserver.ThreadingTCPServer):
+    """
+    接続ごとにスレッドを作成するTCPサーバー
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class RealtimeStandinServer:
+    """
+    マッチングエンジンの更新を配信するbitFlyer Realtime APIの代替サーバー
+    """
+
+    def __init__(self, engine, host="127.0.0.1", port=0):
+        self.engine = engine
+        product_code = engine.product_code
+        self.channels = {
+            f"lightning_ticker_{product_code}",
+            f"lightning_executions_{product_code}",
+            f"lightning_board_snapshot_{product_code}",
+            f"lightning_board_{product_code}",
+        }
+        self.product_code = product_code
+        self.connections = set()
+        self.lock = threading.Lock()
+
+        self.tcp_server = RealtimeServer((host, port), RealtimeConnection)
+        self.tcp_server.standin = self
+        self.thread = None
+
+        engine.add_listener(self.on_event)
+
+    @property
+    def url(self):
+        """
+        サーバーのURL
+        """
+        host, port = self.tcp_server.server_address[:2]
+        return f"ws://{host}:{port}/json-rpc"
+
+    def start(self):
+        """
+        バックグラウンドのスレッドでサーバーを起動する
+        """
+        self.thread = threading.Thread(
+            target=self.tcp_server.serve_forever, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        サーバーを停止する
+        """
+        self.disconnect_all()
+        self.tcp_server.shutdown()
+        self.tcp_server.server_close()
+
+    def add_connection(self, connection):
+        """
+        接続を登録する
+        """
+        with self.lock:
+            self.connections.add(connection)
+
+    def remove_connection(self, connection):
+        """
+        接続の登録を解除する
+        """
+        with self.lock:
+            self.connections.discard(connection)
+
+    def disconnect_all(self):
+        """
+        すべての接続を切断する（再接続の確認用）
+        """
+        with self.lock:
+            connections = list(self.connections)
+        for connection in connections:
+            connection.close()
+
+    def send_initial(self, connection, channel):
+        """
+        購読開始時に現在の状態を送信する
+        """
+        if channel == f"lightning_board_snapshot_{self.product_code}":
+            connection.publish(channel, self.engine.get_board())
+        elif channel == f"lightning_ticker_{self.product_code}":
+            connection.publish(channel, self.engine.get_ticker())
+
+    def publish(self, channel, message):
+        """
+        購読中のすべての接続にメッセージを配信する
+        """
+        with self.lock:
+            connections = list(self.connections)
+        for connection in connections:
+            connection.publish(channel, message)
+
+    def on_event(self, event, payload):
+        """
+        マッチングエンジンの更新をチャンネルに振り分ける
+        """
+        product_code = self.product_code
+        if event == "ticker":
+            self.publish(f"lightning_ticker_{product_code}", payload)
+
+            # 価格の変化で外部の気配も動くため板全体を配信する
+            self.publish(
+                f"lightning_board_snapshot_{product_code}",
+                self.engine.get_board(),
+            )
+        elif event == "executions":
+            self.publish(f"lightning_executions_{product_code}", payload)
+        elif event == "board":
+            self.publish(f"lightning_board_{product_code}", payload)
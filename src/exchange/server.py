@@ -0,0 +1,465 @@
+"""
+Local bitFlyer Lightning stand-in server
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from src.cryptocompare.candle_store import CandleStore
+from src.exchange.matching_engine import ExchangeError, MatchingEngine
+from src.exchange.realtime_server import RealtimeStandinServer
+from src.logger_setup import get_logger, setup_logging
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# 署名のタイムスタンプの許容誤差（秒）
+TIMESTAMP_TOLERANCE = 300
+
+
+class FaultInjector:
+    """
+    遅延・エラー・レート制限を注入する
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        latency_jitter=0.0,
+        error_rate=0.0,
+        rate_limit=None,
+        rate_limit_period=300,
+        seed=None,
+    ):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_limit_period = rate_limit_period
+        self.random = random.Random(seed)
+        self.requests = {}
+        self.lock = threading.Lock()
+
+        # fail_nextで指定した残りのエラー数
+        self.pending_failures = 0
+
+    def delay(self):
+        """
+        設定した遅延だけ待機する
+        """
+        latency = self.latency + self.random.uniform(0, self.latency_jitter)
+        if latency > 0:
+            time.sleep(latency)
+
+    def fail_next(self, count=1):
+        """
+        次のcount件のリクエストを確実にエラーにする
+        """
+        with self.lock:
+            self.pending_failures += count
+
+    def should_fail(self):
+        """
+        エラーを発生させるかを判定する
+        """
+        with self.lock:
+            if self.pending_failures > 0:
+                self.pending_failures -= 1
+                return True
+        return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    def check_rate_limit(self, client):
+        """
+        期間内のリクエスト数を数え、残数とリセット時刻を返す
+        """
+        if not self.rate_limit:
+            return None
+        now = time.time()
+        with self.lock:
+            history = self.requests.setdefault(client, deque())
+            while history and history[0] <= now - self.rate_limit_period:
+                history.popleft()
+            allowed = len(history) < self.rate_limit
+            if allowed:
+                history.append(now)
+            reset = (
+                history[0] + self.rate_limit_period
+                if history
+                else now + self.rate_limit_period
+            )
+            return {
+                "allowed": allowed,
+                "remaining": self.rate_limit - len(history),
+                "reset": int(reset),
+            }
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """
+    bitFlyer Lightning APIと同じエンドポイントを処理する
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    # ヘッダーと本文を別々に送信するため、Nagleによる応答の遅延を避ける
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        """
+        GETリクエストを処理する
+        """
+        self._handle("GET")
+
+    def do_POST(self):
+        """
+        POSTリクエストを処理する
+        """
+        self._handle("POST")
+
+    def _handle(self, method):
+        standin = self.server.standin
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        standin.faults.delay()
+        standin.request_count += 1
+
+        try:
+            # 非公開APIはAPIキーごと、公開APIは接続元ごとに制限する
+            private = url.path.startswith("/v1/me/")
+            client = (
+                self.headers.get("ACCESS-KEY", "")
+                if private
+                else self.client_address[0]
+            )
+            limit = standin.faults.check_rate_limit(client)
+            if limit and not limit["allowed"]:
+                raise ExchangeError(-1, "Over API limit per period", 429)
+
+            if standin.faults.should_fail():
+                raise ExchangeError(-500, "Injected server error", 500)
+
+            owner = None
+            if private:
+                owner = standin.verify_signature(
+                    method, self.path, body, self.headers
+                )
+
+            data = json.loads(body) if body else {}
+            result = standin.dispatch(method, url.path, params, data, owner)
+            self._respond(200, result, limit)
+        except ExchangeError as e:
+            self._respond(
+                e.http_status,
+                {"status": e.status, "error_message": e.message, "data": None},
+                limit if e.http_status == 429 else None,
+            )
+        except (ValueError, KeyError) as e:
+            self._respond(
+                400, {"status": -100, "error_message": str(e), "data": None}
+            )
+
+    def _respond(self, status, result, limit=None):
+        payload = b"" if result is None else json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if limit:
+            # bitFlyerと同じレート制限のヘッダー
+            self.send_header(
+                "X-RateLimit-Period",
+                str(self.server.standin.faults.rate_limit_period),
+            )
+            self.send_header("X-RateLimit-Remaining", str(limit["remaining"]))
+            self.send_header("X-RateLimit-Reset", str(limit["reset"]))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StandinServer:
+    """
+    ローカルで動作するbitFlyer Lightning APIの代替サーバー
+    """
+
+    def __init__(
+        self,
+        engine=None,
+        api_keys=None,
+        host="127.0.0.1",
+        port=0,
+        faults=None,
+    ):
+        self.engine = engine or MatchingEngine()
+        self.api_keys = dict(api_keys or {"key": "secret"})
+        for api_key in self.api_keys:
+            if api_key not in self.engine.accounts:
+                self.engine.add_account(api_key)
+
+        self.faults = faults or FaultInjector()
+        self.request_count = 0
+        self.board_health = "NORMAL"
+
+        self.httpd = ThreadingHTTPServer((host, port), StandinHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.standin = self
+        self.thread = None
+
+        self.routes = {
+            ("GET", "/v1/getboardstate"): self._get_board_state,
+            ("GET", "/v1/getticker"): self._get_ticker,
+            ("GET", "/v1/getboard"): self._get_board,
+            ("GET", "/v1/getexecutions"): self._get_public_executions,
+            ("GET", "/v1/me/getbalance"): self._get_balance,
+            ("GET", "/v1/me/getexecutions"): self._get_executions,
+            ("GET", "/v1/me/getchildorders"): self._get_child_orders,
+            ("POST", "/v1/me/sendchildorder"): self._send_child_order,
+            ("POST", "/v1/me/cancelchildorder"): self._cancel_child_order,
+            ("GET", "/v1/me/getparentorders"): self._get_parent_orders,
+            ("POST", "/v1/me/sendparentorder"): self._send_parent_order,
+            ("POST", "/v1/me/cancelparentorder"): self._cancel_parent_order,
+        }
+
+    @property
+    def url(self):
+        """
+        サーバーのベースURL
+        """
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        バックグラウンドのスレッドでサーバーを起動する
+        """
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        サーバーを停止する
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def verify_signature(self, method, path, body, headers):
+        """
+        BitflyerClient.make_requestと同じ方法で署名を検証する
+        """
+        api_key = headers.get("ACCESS-KEY")
+        timestamp = headers.get("ACCESS-TIMESTAMP", "")
+        sign = headers.get("ACCESS-SIGN", "")
+        if api_key not in self.api_keys:
+            raise ExchangeError(-500, "Key not found", 401)
+        if not timestamp.isdigit() or (
+            abs(time.time() - int(timestamp)) > TIMESTAMP_TOLERANCE
+        ):
+            raise ExchangeError(-501, "Invalid timestamp", 401)
+
+        text = timestamp + method + path + body
+        expected = hmac.new(
+            self.api_keys[api_key].encode("utf-8"),
+            text.encode("utf-8"),
+            hashlib.sha256,
+        ).hexdigest()
+        if not hmac.compare_digest(expected, sign):
+            raise ExchangeError(-500, "Invalid signature", 401)
+        return api_key
+
+    def dispatch(self, method, path, params, data, owner):
+        """
+        エンドポイントに対応する処理を呼び出す
+        """
+        route = self.routes.get((method, path))
+        if route is None:
+            raise ExchangeError(-100, f"Not found: {method} {path}", 404)
+
+        product_code = params.get("product_code") or data.get("product_code")
+        if product_code and product_code != self.engine.product_code:
+            raise ExchangeError(-100, "Invalid product_code")
+
+        self.engine.advance()
+        return route(params, data, owner)
+
+    def _get_board_state(self, params, data, owner):
+        return {"health": self.board_health, "state": self.engine.state}
+
+    def _get_ticker(self, params, data, owner):
+        return self.engine.get_ticker()
+
+    def _get_board(self, params, data, owner):
+        return self.engine.get_board()
+
+    def _get_public_executions(self, params, data, owner):
+        return self.engine.get_public_executions(
+            int(params.get("count", 100)),
+            int(params["before"]) if "before" in params else None,
+            int(params["after"]) if "after" in params else None,
+        )
+
+    def _get_balance(self, params, data, owner):
+        return self.engine.get_balance(owner)
+
+    def _get_executions(self, params, data, owner):
+        return self.engine.get_executions(owner, int(params.get("count", 100)))
+
+    def _get_child_orders(self, params, data, owner):
+        return self.engine.get_child_orders(
+            owner,
+            params.get("child_order_state"),
+            params.get("child_order_acceptance_id"),
+        )
+
+    def _send_child_order(self, params, data, owner):
+        order = self.engine.submit_order(
+            owner,
+            data.get("side"),
+            data.get("child_order_type"),
+            data.get("size"),
+            data.get("price"),
+            data.get("minute_to_expire", 43200),
+            data.get("time_in_force", "GTC"),
+        )
+        return {"child_order_acceptance_id": order.acceptance_id}
+
+    def _cancel_child_order(self, params, data, owner):
+        self.engine.cancel_order(owner, data["child_order_acceptance_id"])
+        return None
+
+    def _get_parent_orders(self, params, data, owner):
+        return self.engine.get_parent_orders(
+            owner,
+            params.get("parent_order_state"),
+            params.get("parent_order_acceptance_id"),
+        )
+
+    def _send_parent_order(self, params, data, owner):
+        parent = self.engine.submit_parent_order(
+            owner,
+            data.get("order_method"),
+            data.get("parameters"),
+            data.get("minute_to_expire", 43200),
+            data.get("time_in_force", "GTC"),
+        )
+        return {"parent_order_acceptance_id": parent.acceptance_id}
+
+    def _cancel_parent_order(self, params, data, owner):
+        self.engine.cancel_parent_order(
+            owner, data["parent_order_acceptance_id"]
+        )
+        return None
+
+
+class CandleReplayer:
+    """
+    1分足を一定の速度でマッチングエンジンに再生する
+    """
+
+    def __init__(self, engine, bars, speed=60.0):
+        self.engine = engine
+        self.bars = bars
+        self.speed = speed
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        バックグラウンドのスレッドで再生を開始する
+        """
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        再生を停止する
+        """
+        self.stop_event.set()
+
+    def run(self):
+        """
+        すべての足を順に再生する
+        """
+        for bar in self.bars:
+            if self.stop_event.is_set():
+                break
+            self.engine.replay_candle(bar)
+            if self.speed:
+                self.stop_event.wait(60 / self.speed)
+
+
+def main():
+    """
+    コマンドラインから代替サーバーを起動する
+    """
+    parser = argparse.ArgumentParser(description="bitFlyer stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--ws-port", type=int, default=None)
+    parser.add_argument("--api-key", default="key")
+    parser.add_argument("--api-secret", default="secret")
+    parser.add_argument("--jpy", type=float, default=1000000)
+    parser.add_argument("--btc", type=float, default=0.1)
+    parser.add_argument("--store", help="CandleStore directory to replay")
+    parser.add_argument("--speed", type=float, default=60.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=None)
+    parser.add_argument("--rate-limit-period", type=int, default=300)
+    args = parser.parse_args()
+    setup_logging(log_file=False)
+
+    engine = MatchingEngine()
+    engine.add_account(args.api_key, args.jpy, args.btc)
+    server = StandinServer(
+        engine,
+        {args.api_key: args.api_secret},
+        args.host,
+        args.port,
+        FaultInjector(
+            args.latency,
+            args.latency_jitter,
+            args.error_rate,
+            args.rate_limit,
+            args.rate_limit_period,
+        ),
+    )
+
+    if args.store:
+        store = CandleStore(args.store)
+        bars = store.to_bars(store.range())
+        engine.ltp = bars[0]["open"] if bars else engine.ltp
+
+        # 再生中の足の時刻を取引所の時刻とする
+        engine.clock = engine.get_time
+        CandleReplayer(engine, bars, args.speed).start()
+
+    if args.ws_port is not None:
+        realtime = RealtimeStandinServer(engine, args.host, args.ws_port)
+        realtime.start()
+        logger.info("Realtime stand-in listening on %s", realtime.url)
+
+    logger.info("Stand-in server listening on %s", server.url)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Lazy module import
+"""
+
+import importlib
+import sys
+import threading
+
+
+class LazyModule:
+    """
+    属性に初めてアクセスした時点でモジュールを読み込む
+
+    起動時間の短縮のため、重い依存ライブラリはこのクラスを介して読み込む
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            with self.__dict__["_lock"]:
+                module = self.__dict__["_module"]
+                if module is None:
+                    module = importlib.import_module(self.__dict__["_name"])
+                    self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] else "not loaded"
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name):
+    """
+    モジュールを遅延して読み込む（読み込み済みの場合はそのまま返す）
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
@@ -7,34 +7,59 @@ import os
 from logging.handlers import TimedRotatingFileHandler
 from datetime import datetime
 
-# ログディレクトリの作成
+# ログディレクトリ（setup_loggingで変更できる）
 LOG_DIR = "logs"
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
 
 # ログフォーマットの設定
 log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 
-# ログファイルハンドラーの設定
-log_file = os.path.join(
-    LOG_DIR, f'trading_{datetime.now().strftime("%Y%m%d")}.log'
-)
-file_handler = TimedRotatingFileHandler(
-    log_file, when="midnight", interval=1, backupCount=7, encoding="utf-8"
-)
-file_handler.suffix = "%Y%m%d"
-file_handler.setFormatter(log_formatter)
-file_handler.setLevel(logging.INFO)
+# setup_loggingで追加したハンドラー
+_handlers = []
 
-# コンソールハンドラーの設定
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(log_formatter)
-console_handler.setLevel(logging.INFO)
 
-# ルートロガーの設定
-logging.basicConfig(
-    level=logging.INFO, handlers=[file_handler, console_handler]
-)
+def _create_file_handler(file_name):
+    handler = TimedRotatingFileHandler(
+        os.path.join(
+            LOG_DIR, f'{file_name}_{datetime.now().strftime("%Y%m%d")}.log'
+        ),
+        when="midnight",
+        interval=1,
+        backupCount=7,
+        encoding="utf-8",
+    )
+    handler.suffix = "%Y%m%d"
+    handler.setFormatter(log_formatter)
+    handler.setLevel(logging.INFO)
+    return handler
+
+
+def setup_logging(log_dir=None, console=True, log_file=True):
+    """
+    ルートロガーにファイルとコンソールのハンドラーを設定する
+
+    モジュールの読み込み時には何も行わないため、実行時の入口で一度だけ呼び出す
+    """
+    global LOG_DIR
+
+    if _handlers:
+        return _handlers
+    if log_dir:
+        LOG_DIR = log_dir
+
+    if log_file:
+        # ログディレクトリの作成
+        os.makedirs(LOG_DIR, exist_ok=True)
+        _handlers.append(_create_file_handler("trading"))
+
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(log_formatter)
+        console_handler.setLevel(logging.INFO)
+        _handlers.append(console_handler)
+
+    # ルートロガーの設定
+    logging.basicConfig(level=logging.INFO, handlers=_handlers)
+    return _handlers
 
 
 def get_logger(name):
@@ -42,3 +67,27 @@ def get_logger(name):
     ロガーを取得する
     """
     return logging.getLogger(name)
+
+
+class ThreadNameFilter(logging.Filter):
+    """
+    指定した名前で始まるスレッドのログのみを通す
+    """
+
+    def __init__(self, prefix):
+        super().__init__()
+        self.prefix = prefix
+
+    def filter(self, record):
+        return record.threadName.startswith(self.prefix)
+
+
+def add_thread_log_file(name, thread_prefix):
+    """
+    指定したスレッドのログを別のファイルにも出力する
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    handler = _create_file_handler(f"trading_{name}")
+    handler.addFilter(ThreadNameFilter(thread_prefix))
+    logging.getLogger().addHandler(handler)
+    return handler
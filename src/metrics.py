@@ -0,0 +1,308 @@
+"""
+Metrics registry and Prometheus exporter
+"""
+
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.logger_setup import get_logger
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# 所要時間のヒストグラムの区切り（秒）
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Prometheusのテキスト形式
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 記録するメトリクスの説明
+METRIC_DESCRIPTIONS = {
+    "bitflyer_request_seconds": "bitFlyer API request latency",
+    "bitflyer_request_errors_total": "bitFlyer API requests that failed",
+    "bitflyer_request_retries_total": "bitFlyer API retries by the adapter",
+    "bitflyer_rate_limit_wait_seconds": "Time spent waiting for rate limits",
+    "market_data_fetch_seconds": "Market data fetch latency per source",
+    "cryptocompare_fetch_seconds": "CryptoCompare price data latency",
+    "openai_request_seconds": "OpenAI request latency per attempt",
+    "trading_stage_seconds": "Trading cycle stage latency",
+    "trading_cycle_seconds": "Trading cycle latency",
+    "trading_cycle_errors_total": "Trading cycles that raised an error",
+    "trading_decisions_total": "Trading decisions by function",
+}
+
+
+def format_labels(labels):
+    """
+    ラベルをPrometheusの形式（{a="1",b="2"}）に変換する
+    """
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            key,
+            str(value)
+            .replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for key, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    """
+    区切りごとの件数・合計・最大値を保持するヒストグラム
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """
+        値を1件記録する
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def cumulative(self):
+        """
+        区切りごとの累積件数を返す（最後は+Inf）
+        """
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class MetricsRegistry:
+    """
+    カウンターとヒストグラムを名前とラベルごとに保持する
+
+    enabledがFalseの場合は記録を行わない
+    """
+
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.help = dict(METRIC_DESCRIPTIONS)
+        self.last_summary = ({}, {})
+
+    def describe(self, name, text):
+        """
+        メトリクスの説明を登録する
+        """
+        self.help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        """
+        カウンターを加算する
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """
+        ヒストグラムに値を記録する
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = Histogram(self.buckets)
+                self.histograms[key] = histogram
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        withブロックの所要時間をヒストグラムに記録する
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def render(self):
+        """
+        Prometheusのテキスト形式で出力する
+        """
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                (key, (histogram.cumulative(), histogram.count, histogram.sum))
+                for key, histogram in self.histograms.items()
+            )
+
+        lines = []
+        described = set()
+
+        def header(name, kind):
+            if name in described:
+                return
+            described.add(name)
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{format_labels(labels)} {value}")
+
+        for (name, labels), (cumulative, count, total) in histograms:
+            header(name, "histogram")
+            for bound, bucket_count in cumulative:
+                bucket_labels = labels + (("le", bound),)
+                lines.append(
+                    f"{name}_bucket{format_labels(bucket_labels)} "
+                    f"{bucket_count}"
+                )
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, names=None):
+        """
+        前回の呼び出しからの増分を返す（ヒストグラムは件数と合計）
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: (histogram.count, histogram.sum)
+                for key, histogram in self.histograms.items()
+            }
+            last_counters, last_histograms = self.last_summary
+            self.last_summary = (counters, histograms)
+
+        result = {}
+        for key, value in counters.items():
+            if names is not None and key[0] not in names:
+                continue
+            delta = value - last_counters.get(key, 0)
+            if delta:
+                result[key[0] + format_labels(key[1])] = delta
+        for key, (count, total) in histograms.items():
+            if names is not None and key[0] not in names:
+                continue
+            last_count, last_total = last_histograms.get(key, (0, 0.0))
+            if count > last_count:
+                result[key[0] + format_labels(key[1])] = {
+                    "count": count - last_count,
+                    "seconds": round(total - last_total, 3),
+                }
+        return result
+
+    def reset(self):
+        """
+        記録をすべて破棄する
+        """
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.last_summary = ({}, {})
+
+
+# プロセス全体で共有するレジストリ
+_registry = MetricsRegistry()
+
+
+def get_metrics():
+    """
+    共有のレジストリを取得する
+    """
+    return _registry
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """
+    /metricsでレジストリの内容を返す
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        payload = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class MetricsServer:
+    """
+    Prometheusの収集用のHTTPサーバー
+    """
+
+    def __init__(self, registry=None, host="127.0.0.1", port=9108):
+        self.httpd = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.registry = registry or get_metrics()
+        self.thread = None
+
+    @property
+    def url(self):
+        """
+        収集用のURL
+        """
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        """
+        バックグラウンドのスレッドでサーバーを起動する
+        """
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever,
+            name="metrics-server",
+            daemon=True,
+        )
+        self.thread.start()
+        logger.info("Metrics exporter listening on %s", self.url)
+        return self
+
+    def stop(self):
+        """
+        サーバーを停止する
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,295 @@
+"""
+Decision cache
+"""
+
+import os
+import json
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+from src.lazy_import import lazy_import
+from src.logger_setup import get_logger
+
+pd = lazy_import("pandas")
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# フィンガープリントに含めるティッカーと注文の項目
+TICKER_KEYS = ("state", "ltp", "best_bid", "best_ask")
+ORDER_KEYS = (
+    "child_order_acceptance_id",
+    "side",
+    "child_order_type",
+    "price",
+    "size",
+    "outstanding_size",
+    "child_order_state",
+)
+
+# フィンガープリントに含める板の要約の項目（価格はティッカーで判定する）
+BOARD_KEY_SUFFIX = "bps"
+
+# 板の要約は周期ごとの変動が大きいため少ない有効桁数で丸める
+BOARD_DIGITS = 2
+
+# キャッシュする売買判断（注文や取消しは再利用すると重複して実行されるため除く）
+CACHEABLE_DECISIONS = ("hold",)
+
+
+def quantize(value, digits=4):
+    """
+    数値を有効桁数で丸める
+    """
+    if value is None or isinstance(value, bool):
+        return value
+    value = float(value)
+    if not math.isfinite(value):
+        return None
+    if value == 0:
+        return 0.0
+    exponent = math.floor(math.log10(abs(value)))
+    return round(value, digits - 1 - exponent)
+
+
+def canonicalize(value, digits=4):
+    """
+    ハッシュ化のために値を丸め、並び順を固定した構造に変換する
+    """
+    if isinstance(value, dict):
+        return {
+            str(key): canonicalize(item, digits)
+            for key, item in sorted(value.items())
+        }
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(item, digits) for item in value]
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, float) or hasattr(value, "dtype"):
+        return quantize(value, digits)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return quantize(value, digits)
+    return value
+
+
+def make_decision(function_name, arguments):
+    """
+    tool_callと同じ形式の売買判断を作成する
+    """
+    return SimpleNamespace(
+        type="function",
+        function=SimpleNamespace(
+            name=function_name, arguments=json.dumps(arguments)
+        ),
+        arguments=arguments,
+    )
+
+
+class DecisionCache:
+    """
+    マーケットの状態のフィンガープリントをキーに売買判断を保持する
+    """
+
+    def __init__(
+        self,
+        cache_file=None,
+        ttl=900,
+        max_entries=256,
+        digits=4,
+        signal_rows=3,
+    ):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.digits = digits
+        self.signal_rows = signal_rows
+
+        # 最近使用した順に並べたエントリー（LRU）
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "refreshes": 0,
+        }
+
+        self._load()
+
+    def fingerprint(
+        self,
+        market_data,
+        ticker_data,
+        portfolio_data,
+        order_data,
+        execution_data,
+        board_data=None,
+        timeframe_data=None,
+    ):
+        """
+        売買判断の入力からフィンガープリントを作成する
+        """
+        signals = market_data.tail(self.signal_rows)
+        signals = signals.drop(columns=["timestamp"], errors="ignore")
+
+        # 約定は新しい約定の有無のみを判定する
+        execution_ids = []
+        if execution_data is not None and "id" in execution_data:
+            execution_ids = [int(i) for i in execution_data["id"]]
+
+        state = {
+            "signals": signals.to_dict("records"),
+            "ticker": {
+                key: ticker_data.get(key)
+                for key in TICKER_KEYS
+                if key in ticker_data
+            },
+            "portfolio": [
+                {
+                    "currency_code": entry["currency_code"],
+                    "amount": entry["amount"],
+                    "available": entry["available"],
+                }
+                for entry in portfolio_data
+            ],
+            "orders": sorted(
+                (
+                    {key: order.get(key) for key in ORDER_KEYS}
+                    for order in order_data or []
+                ),
+                key=lambda order: str(order["child_order_acceptance_id"]),
+            ),
+        }
+        payload = json.dumps(
+            canonicalize(state, self.digits), separators=(",", ":")
+        )
+        payload += json.dumps(execution_ids)
+
+        # 仲値からの範囲の数量と偏り・スプレッド・成行の乖離
+        board = {
+            key: value
+            for key, value in (board_data or {}).items()
+            if key.endswith(BOARD_KEY_SUFFIX)
+        }
+        payload += json.dumps(
+            canonicalize(board, BOARD_DIGITS), separators=(",", ":")
+        )
+
+        # 上位の時間足は最後に確定した足の指標のみを判定する
+        timeframes = {
+            name: df.tail(1)
+            .drop(columns=["timestamp"], errors="ignore")
+            .to_dict("records")
+            for name, df in (timeframe_data or {}).items()
+            if df is not None
+        }
+        payload += json.dumps(
+            canonicalize(timeframes, self.digits), separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        キャッシュされた売買判断を返す（存在しない・期限切れの場合はNone）
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if time.time() - entry["created"] > self.ttl:
+                del self.entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return make_decision(entry["name"], entry["arguments"])
+
+    def put(self, key, decision):
+        """
+        売買判断を保存する（副作用のある判断は保存しない）
+        """
+        if (
+            decision is None
+            or decision.function.name not in CACHEABLE_DECISIONS
+        ):
+            return
+        with self.lock:
+            self.entries[key] = {
+                "name": decision.function.name,
+                "arguments": decision.arguments,
+                "created": time.time(),
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._save()
+
+    def record_refresh(self):
+        """
+        キャッシュを使用せずに判断した回数を記録する
+        """
+        with self.lock:
+            self.stats["refreshes"] += 1
+
+    def clear(self):
+        """
+        すべてのエントリーを削除する
+        """
+        with self.lock:
+            self.entries.clear()
+            self._save()
+
+    def get_stats(self):
+        """
+        ヒット率などの統計を返す
+        """
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(
+                self.stats,
+                entries=len(self.entries),
+                hit_ratio=(
+                    round(self.stats["hits"] / lookups, 3) if lookups else 0.0
+                ),
+            )
+
+    def _load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as file:
+                entries = json.load(file)
+        except (IOError, json.JSONDecodeError) as e:
+            logger.error("Failed to load decision cache: %s", e)
+            return
+
+        # 期限切れのエントリーと副作用のある判断は読み込まない
+        now = time.time()
+        for key, entry in sorted(
+            entries.items(), key=lambda item: item[1]["created"]
+        ):
+            if (
+                now - entry["created"] <= self.ttl
+                and entry["name"] in CACHEABLE_DECISIONS
+            ):
+                self.entries[key] = entry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        temp_file = self.cache_file + ".tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as file:
+                json.dump(self.entries, file)
+            os.replace(temp_file, self.cache_file)
+        except IOError as e:
+            logger.error("Failed to save decision cache: %s", e)
@@ -0,0 +1,228 @@
+"""
+Async decision client
+"""
+
+import json
+import asyncio
+import threading
+from src.lazy_import import lazy_import
+from src.openai.decision_cache import make_decision
+from src.logger_setup import get_logger
+from src.metrics import get_metrics
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# メトリクスの取得
+metrics = get_metrics()
+
+# 最初の要求の時点で読み込む
+openai = lazy_import("openai")
+
+# 各要求のタイムアウトを期限より後にして、期限切れの要求は取消しで終わらせる
+# （タイムアウトと期限が同時だと例外の側が勝ち、holdではなくerrorになる）
+TIMEOUT_GRACE = 1.0
+
+
+def parse_tool_call(response):
+    """
+    レスポンスから最初の関数呼び出しを取り出す
+    """
+    tool_calls = response.choices[0].message.tool_calls
+    if not tool_calls:
+        return None
+    tool_call = tool_calls[0]
+    tool_call.arguments = json.loads(tool_call.function.arguments)
+    return tool_call
+
+
+class DecisionClient:
+    """
+    期限付きでOpenAIに売買判断を要求する
+
+    1. 主モデルに要求する
+    2. hedge_delay秒以内に応答がなければ同じ要求をもう一つ送る
+    3. 期限のfallback_margin秒前までに判断が得られなければ代替モデルに要求する
+    4. 期限までに判断が得られなければholdとする
+    5. 期限の前にすべての要求が失敗した場合はerrorとする（判断はNone）
+    """
+
+    def __init__(
+        self,
+        api_key,
+        model="gpt-4o",
+        fallback_model=None,
+        deadline=60,
+        hedge_delay=None,
+        fallback_margin=15,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.fallback_model = fallback_model
+        self.deadline = deadline
+        self.hedge_delay = hedge_delay
+        self.fallback_margin = fallback_margin
+
+        # 接続を使い回すため専用のイベントループで要求を実行する
+        self.client = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="openai-client", daemon=True
+        )
+        self.thread.start()
+
+    def _get_client(self):
+        if self.client is None:
+            # リトライとタイムアウトはこのクラスで制御する
+            self.client = openai.AsyncOpenAI(
+                api_key=self.api_key, max_retries=0
+            )
+        return self.client
+
+    def decide(self, messages, tools):
+        """
+        売買判断と各要求の結果を返す
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._decide(messages, tools), self.loop
+        )
+        return future.result()
+
+    def close(self):
+        """
+        イベントループを停止する
+        """
+        if self.client is not None:
+            asyncio.run_coroutine_threadsafe(
+                self.client.close(), self.loop
+            ).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _attempt(self, model, messages, tools, attempt, deadline):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            response = await self._get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                tools=tools,
+                tool_choice="required",
+                timeout=max(deadline - started, 0) + TIMEOUT_GRACE,
+            )
+            decision = parse_tool_call(response)
+            if decision is None:
+                raise ValueError("No tool call in response")
+            attempt["outcome"] = "ok"
+            return decision
+        except asyncio.CancelledError:
+            attempt["outcome"] = "cancelled"
+            raise
+        except Exception as e:
+            attempt["outcome"] = f"error: {type(e).__name__}: {e}"
+            raise
+        finally:
+            latency = loop.time() - started
+            attempt["latency"] = round(latency, 3)
+            metrics.observe(
+                "openai_request_seconds",
+                latency,
+                model=model,
+                kind=attempt["kind"],
+                outcome=attempt.get("outcome", "error").split(":")[0],
+            )
+
+    async def _decide(self, messages, tools):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.deadline
+        hedge_at = started + self.hedge_delay if self.hedge_delay else None
+        fallback_at = (
+            deadline - self.fallback_margin if self.fallback_model else None
+        )
+
+        attempts = []
+        tasks = {}
+        pending = set()
+
+        def launch(model, kind):
+            attempt = {
+                "kind": kind,
+                "model": model,
+                "started": round(loop.time() - started, 3),
+            }
+            attempts.append(attempt)
+            task = loop.create_task(
+                self._attempt(model, messages, tools, attempt, deadline)
+            )
+            tasks[task] = attempt
+            pending.add(task)
+
+        launch(self.model, "primary")
+        hedged = fallback_launched = False
+        winner = None
+
+        while winner is None and loop.time() < deadline:
+            if not pending:
+                # 実行中の要求がすべて失敗した場合は次の段階を前倒しする
+                if hedge_at and not hedged:
+                    launch(self.model, "hedge")
+                    hedged = True
+                elif fallback_at and not fallback_launched:
+                    launch(self.fallback_model, "fallback")
+                    fallback_launched = True
+                else:
+                    break
+
+            wake = deadline
+            if hedge_at and not hedged:
+                wake = min(wake, hedge_at)
+            if fallback_at and not fallback_launched:
+                wake = min(wake, fallback_at)
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=max(wake - loop.time(), 0),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                pending.discard(task)
+                if winner is None and task.exception() is None:
+                    winner = task
+
+            now = loop.time()
+            if winner is None and hedge_at and not hedged and now >= hedge_at:
+                launch(self.model, "hedge")
+                hedged = True
+            if (
+                winner is None
+                and fallback_at
+                and not fallback_launched
+                and now >= fallback_at
+            ):
+                launch(self.fallback_model, "fallback")
+                fallback_launched = True
+
+        # 残りの要求は取り消す
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if winner is not None:
+            decision = winner.result()
+            outcome = tasks[winner]["kind"]
+        elif all(
+            attempt.get("outcome", "").startswith("error")
+            for attempt in attempts
+        ):
+            # 期限切れではなく、すべての要求が例外で失敗した
+            decision = None
+            outcome = "error"
+        else:
+            decision = make_decision("hold", {})
+            outcome = "hold"
+
+        return decision, {
+            "outcome": outcome,
+            "elapsed": round(loop.time() - started, 3),
+            "attempts": attempts,
+        }
@@ -0,0 +1,331 @@
+"""
+Prompt serializer
+"""
+
+import re
+from src.lazy_import import lazy_import
+from src.logger_setup import get_logger
+
+pd = lazy_import("pandas")
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# トークン数の概算に使用するパターン
+# （数字は3桁ごと、英字は単語ごと、記号は1文字ごとに数える）
+TOKEN_PATTERN = re.compile(r"\d{1,3}|[A-Za-z]+|[^\sA-Za-z\d]| +|\n")
+
+# カラムごとの小数点以下の桁数（指定がない場合はDEFAULT_DECIMALS）
+COLUMN_DECIMALS = {
+    "close": 0,
+    "Short_MA": 0,
+    "Long_MA": 0,
+    "Signal": 0,
+    "RSI": 1,
+    "MACD": 0,
+    "Signal_Line": 0,
+    "BB_Upper": 0,
+    "BB_Mid": 0,
+    "BB_Lower": 0,
+    "ltp": 0,
+    "best_bid": 0,
+    "best_ask": 0,
+    "best_bid_size": 4,
+    "best_ask_size": 4,
+    "price": 0,
+    "size": 8,
+    "outstanding_size": 8,
+    "amount": 8,
+    "available": 8,
+    "commission": 8,
+}
+DEFAULT_DECIMALS = 2
+
+# セクションごとに出力するカラム（順序を固定する）
+TICKER_COLUMNS = [
+    "state",
+    "timestamp",
+    "ltp",
+    "best_bid",
+    "best_ask",
+    "best_bid_size",
+    "best_ask_size",
+]
+PORTFOLIO_COLUMNS = ["currency_code", "amount", "available"]
+ORDER_COLUMNS = [
+    "child_order_acceptance_id",
+    "side",
+    "child_order_type",
+    "price",
+    "size",
+    "outstanding_size",
+    "child_order_date",
+]
+EXECUTION_COLUMNS = ["id", "side", "price", "size", "exec_date", "commission"]
+
+# トークン数が予算を超える場合に削除するシグナルのカラム（優先度の低い順）
+OPTIONAL_SIGNAL_COLUMNS = ["BB_Mid", "Signal_Line", "Long_MA", "Short_MA"]
+
+
+def count_tokens(text):
+    """
+    テキストのトークン数を概算する
+    """
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def format_value(value, decimals=DEFAULT_DECIMALS):
+    """
+    数値を固定の桁数で文字列に変換する
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float)) or hasattr(value, "dtype"):
+        if pd.isna(value):
+            return ""
+        if decimals == 0:
+            return str(int(round(float(value))))
+        text = f"{float(value):.{decimals}f}".rstrip("0").rstrip(".")
+        return text if text not in ("", "-0") else "0"
+    return str(value).replace(",", " ")
+
+
+def format_time(timestamp):
+    """
+    時刻を秒単位のISO 8601形式（UTC）に変換する
+    """
+    return pd.Timestamp(timestamp).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def to_csv(columns, rows):
+    """
+    カラム名と行のリストからCSVを作成する
+    """
+    lines = [",".join(columns)]
+    for row in rows:
+        lines.append(
+            ",".join(
+                format_value(
+                    value, COLUMN_DECIMALS.get(column, DEFAULT_DECIMALS)
+                )
+                for column, value in zip(columns, row)
+            )
+        )
+    return "\n".join(lines)
+
+
+class PromptSerializer:
+    """
+    マーケットデータをトークン数の少ないテキストに変換する
+    """
+
+    def __init__(self, token_budget=None, min_signal_rows=10):
+        self.token_budget = token_budget
+        self.min_signal_rows = min_signal_rows
+
+    def serialize_signals(self, df, columns=None, header=True):
+        """
+        シグナルを時刻の差分（分）を含むCSVに変換する
+        """
+        if df is None or df.empty:
+            return "none"
+        columns = [
+            column
+            for column in (columns or list(df.columns))
+            if column in df.columns and column != "timestamp"
+        ]
+
+        # 先頭行の時刻のみ絶対時刻とし、以降は前の行からの経過分数とする
+        times = pd.to_datetime(df["timestamp"])
+        deltas = (times.diff() // pd.Timedelta(minutes=1)).tolist()
+        time_column = [format_time(times.iloc[0])] + [
+            f"+{int(delta)}" for delta in deltas[1:]
+        ]
+        rows = zip(time_column, *(df[column].tolist() for column in columns))
+        table = to_csv(["time"] + columns, rows)
+        if not header:
+            return table
+        return (
+            "# time: first row in UTC, then minutes since previous row\n"
+            f"{table}"
+        )
+
+    def serialize_timeframes(self, timeframes, columns=None, rows=None):
+        """
+        時間足ごとのシグナルを見出し付きのCSVに変換する（最後のrows行のみ）
+        """
+        tables = [
+            f"## {name}\n"
+            + self.serialize_signals(
+                df.tail(rows) if rows else df, columns, header=False
+            )
+            for name, df in (timeframes or {}).items()
+            if df is not None and not df.empty
+        ]
+        if not tables:
+            return "none"
+        return "\n".join(
+            ["# time: first row in UTC, then minutes since previous row"]
+            + tables
+        )
+
+    def serialize_ticker(self, ticker):
+        """
+        ティッカーをkey=value形式に変換する
+        """
+        if not ticker:
+            return "none"
+        return "\n".join(
+            "{}={}".format(
+                key,
+                format_value(
+                    ticker[key], COLUMN_DECIMALS.get(key, DEFAULT_DECIMALS)
+                ),
+            )
+            for key in TICKER_COLUMNS
+            if key in ticker
+        )
+
+    def serialize_board(self, summary):
+        """
+        板の要約をkey=value形式に変換する
+        """
+        if not summary:
+            return "none"
+        lines = []
+        for key, value in summary.items():
+            if key.startswith("imbalance"):
+                decimals = 3
+            elif "depth" in key or key.endswith("_size"):
+                decimals = 4
+            elif key.endswith("bps"):
+                decimals = 2
+            else:
+                decimals = 0
+            lines.append(f"{key}={format_value(value, decimals)}")
+        return "\n".join(lines)
+
+    def serialize_records(self, records, columns):
+        """
+        辞書のリストまたはデータフレームをCSVに変換する
+        """
+        if isinstance(records, pd.DataFrame):
+            records = records.to_dict("records")
+        if not records:
+            return "none"
+        rows = []
+        for record in records:
+            row = []
+            for column in columns:
+                value = record.get(column)
+                if isinstance(value, pd.Timestamp):
+                    value = format_time(value)
+                row.append(value)
+            rows.append(row)
+        return to_csv(columns, rows)
+
+    def serialize(
+        self,
+        market_data,
+        ticker_data,
+        portfolio_data,
+        order_data,
+        execution_data,
+        board_data=None,
+        timeframe_data=None,
+    ):
+        """
+        各セクションを変換し、トークン数の予算に収まるように調整する
+        """
+        signal_columns = list(market_data.columns)
+        signal_rows = len(market_data)
+        execution_rows = (
+            len(execution_data) if execution_data is not None else 0
+        )
+        timeframe_rows = max(
+            (len(df) for df in (timeframe_data or {}).values()), default=0
+        )
+        trimmed = []
+
+        while True:
+            sections = {
+                "market_data": self.serialize_signals(
+                    market_data.tail(signal_rows), signal_columns
+                ),
+                "ticker_data": self.serialize_ticker(ticker_data),
+                "portfolio_data": self.serialize_records(
+                    portfolio_data, PORTFOLIO_COLUMNS
+                ),
+                "order_data": self.serialize_records(
+                    order_data, ORDER_COLUMNS
+                ),
+                "execution_data": self.serialize_records(
+                    (
+                        execution_data.head(execution_rows)
+                        if execution_data is not None
+                        else None
+                    ),
+                    EXECUTION_COLUMNS,
+                ),
+                "board_data": self.serialize_board(board_data),
+                "timeframe_data": self.serialize_timeframes(
+                    timeframe_data, signal_columns, timeframe_rows
+                ),
+            }
+            tokens = {
+                name: count_tokens(text) for name, text in sections.items()
+            }
+            total = sum(tokens.values())
+            if not self.token_budget or total <= self.token_budget:
+                break
+
+            # 古いシグナルの行、古い約定、優先度の低いカラムの順に削る
+            excess = total - self.token_budget
+            row_tokens = tokens["market_data"] / max(signal_rows, 1)
+            if signal_rows > self.min_signal_rows:
+                rows = max(int(excess / max(row_tokens, 1)) + 1, 1)
+                signal_rows = max(signal_rows - rows, self.min_signal_rows)
+                trimmed.append(f"market_data rows -> {signal_rows}")
+            elif execution_rows > 1:
+                execution_rows = max(execution_rows // 2, 1)
+                trimmed.append(f"execution_data rows -> {execution_rows}")
+            elif timeframe_rows > 1:
+                timeframe_rows = max(timeframe_rows // 2, 1)
+                trimmed.append(f"timeframe_data rows -> {timeframe_rows}")
+            else:
+                optional = [
+                    column
+                    for column in OPTIONAL_SIGNAL_COLUMNS
+                    if column in signal_columns
+                ]
+                if not optional:
+                    logger.warning(
+                        "Prompt data exceeds token budget: %d > %d",
+                        total,
+                        self.token_budget,
+                    )
+                    break
+                signal_columns.remove(optional[0])
+                trimmed.append(f"market_data -{optional[0]}")
+
+        # 従来のreprで埋め込んだ場合のトークン数（削減量の比較用）
+        baseline = sum(
+            count_tokens(str(data))
+            for data in (
+                market_data,
+                ticker_data,
+                portfolio_data,
+                order_data,
+                execution_data,
+                board_data,
+                timeframe_data,
+            )
+        )
+        report = dict(
+            tokens, total=total, budget=self.token_budget, baseline=baseline
+        )
+        if trimmed:
+            report["trimmed"] = trimmed
+        return sections, report
@@ -0,0 +1,152 @@
+"""
+Prompt templates
+"""
+
+import os
+import json
+import threading
+from string import Formatter
+from src.custom_errors import TemplateError
+from src.logger_setup import get_logger
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# テンプレートで使用できるプレースホルダー
+PROMPT_FIELDS = (
+    "market_data",
+    "ticker_data",
+    "portfolio_data",
+    "order_data",
+    "execution_data",
+    "board_data",
+    "timeframe_data",
+    "current_time",
+    "trading_interval",
+)
+
+# 変換指定（!r、!s、!a）の処理
+CONVERSIONS = {None: lambda value: value, "r": repr, "s": str, "a": ascii}
+
+
+def compile_content(content, fields=PROMPT_FIELDS):
+    """
+    メッセージの本文を固定文字列とプレースホルダーの部品に分解する
+    """
+    parts = []
+    try:
+        parsed = list(Formatter().parse(content))
+    except ValueError as e:
+        raise TemplateError(f"Invalid placeholder syntax: {e}") from e
+
+    for literal, field_name, format_spec, conversion in parsed:
+        if literal:
+            parts.append((literal, None, None, None))
+        if field_name is None:
+            continue
+        if field_name not in fields:
+            raise TemplateError(f"Unknown placeholder: {{{field_name}}}")
+        if conversion not in CONVERSIONS:
+            raise TemplateError(f"Invalid conversion: !{conversion}")
+        if format_spec and "{" in format_spec:
+            raise TemplateError(
+                f"Nested placeholders are not supported: {{{field_name}}}"
+            )
+        parts.append((None, field_name, format_spec, CONVERSIONS[conversion]))
+    return tuple(parts)
+
+
+def render_content(parts, values):
+    """
+    分解した部品から本文を作成する（str.formatと同じ結果）
+    """
+    return "".join(
+        (
+            literal
+            if field_name is None
+            else format(conversion(values[field_name]), format_spec)
+        )
+        for literal, field_name, format_spec, conversion in parts
+    )
+
+
+class PromptTemplate:
+    """
+    プロンプトファイルを一度だけ解析し、更新時のみ読み込み直す
+    """
+
+    def __init__(self, prompt_file, fields=PROMPT_FIELDS):
+        self.prompt_file = prompt_file
+        self.fields = fields
+        self.lock = threading.Lock()
+        self.mtime = None
+        self.messages = ()
+        self.reloads = 0
+
+        # 起動時の読み込みに失敗した場合は例外を送出する
+        self._load()
+
+    def _load(self):
+        try:
+            mtime = os.stat(self.prompt_file).st_mtime_ns
+            with open(self.prompt_file, "r", encoding="utf-8") as file:
+                messages = json.load(file)
+        except (IOError, json.JSONDecodeError) as e:
+            raise TemplateError(
+                f"Failed to load prompt file {self.prompt_file}: {e}"
+            ) from e
+
+        if not isinstance(messages, list) or not messages:
+            raise TemplateError("Prompt file must be a non-empty list")
+
+        compiled = []
+        for index, message in enumerate(messages):
+            if not isinstance(message, dict) or not isinstance(
+                message.get("content"), str
+            ):
+                raise TemplateError(f"Message {index} has no content")
+            try:
+                parts = compile_content(message["content"], self.fields)
+            except TemplateError as e:
+                raise TemplateError(f"Message {index}: {e}") from e
+            others = {k: v for k, v in message.items() if k != "content"}
+            compiled.append((others, parts))
+
+        self.messages = tuple(compiled)
+        self.mtime = mtime
+
+    def reload_if_changed(self):
+        """
+        ファイルの更新時刻が変わった場合のみ読み込み直す
+        """
+        try:
+            mtime = os.stat(self.prompt_file).st_mtime_ns
+        except OSError as e:
+            logger.error("Failed to check prompt file: %s", e)
+            return False
+        if mtime == self.mtime:
+            return False
+
+        with self.lock:
+            if mtime == self.mtime:
+                return False
+            try:
+                self._load()
+            except TemplateError as e:
+                # 取引中は直前の正常なテンプレートを使い続ける
+                logger.error("Keeping previous prompt template: %s", e)
+                self.mtime = mtime
+                return False
+            self.reloads += 1
+            logger.info("Reloaded prompt template: %s", self.prompt_file)
+            return True
+
+    def render(self, **values):
+        """
+        プレースホルダーを値で置換したメッセージを返す
+        """
+        self.reload_if_changed()
+        return [
+            dict(others, content=render_content(parts, values))
+            for others, parts in self.messages
+        ]
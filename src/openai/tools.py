@@ -0,0 +1,247 @@
+"""
+Tool schemas for trading decisions
+"""
+
+# 売買判断で使用する関数呼び出しの定義（起動時に一度だけ作成する）
+# OpenAIのクライアントがJSONに変換するため、辞書とリストのまま保持する
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "order",
+            "description": "Function calling to place a BTC buy or"
+            "sell order. The minimum order size is 0.001 BTC."
+            "The order price should be entered in units of 1 JPY."
+            "This order will automatically expire"
+            " if it is not executed within 10 minutes.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "side": {
+                        "type": "string",
+                        "enum": ["BUY", "SELL"],
+                        "description": "The direction of the"
+                        "trade. 'BUY' or 'SELL'. ",
+                    },
+                    "price": {
+                        "type": "integer",
+                        "description": "The order price in JPY."
+                        "Enter the price in units of 1 JPY."
+                        "If you specify 'LIMIT' for the order_type,"
+                        "you need to specify the price.",
+                    },
+                    "size": {
+                        "type": "number",
+                        "description": "The order quantity in BTC."
+                        "The minimum value is 0.001 BTC, "
+                        "specified in increments of 0.0001 BTC.",
+                    },
+                    "order_type": {
+                        "type": "string",
+                        "enum": ["LIMIT", "MARKET"],
+                        "description": "The type of order."
+                        "Specify 'LIMIT' for limit order or"
+                        "'MARKET' for market order.",
+                    },
+                    "time_in_force": {
+                        "type": "string",
+                        "enum": ["GTC", "IOC", "FOK"],
+                        "description": "The time in force of the "
+                        "order. Specify 'GTC' for Good-Til-Canceled,"
+                        "'IOC' for Immediate-Or-Cancel,"
+                        "or 'FOK' for Fill-Or-Kill.",
+                    },
+                },
+                "required": [
+                    "side",
+                    "price",
+                    "size",
+                    "order_type",
+                    "time_in_force",
+                ],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "cancel",
+            "description": "Function calling to cancel an"
+            "open BTC order."
+            "This action does not allow new orders to be placed "
+            "until the next decision cycle, so if you want to place "
+            "new orders at the same time, "
+            "use the cancel_and_order function.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "order_id": {
+                        "type": "string",
+                        "description": "The child_order_acceptance_id"
+                        " of the order to be canceled.",
+                    }
+                },
+                "required": ["order_id"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "cancel_and_order",
+            "description": "Function calling to cancel an open"
+            "BTC order and place a new order."
+            "The minimum order size is 0.001 BTC."
+            "The order price should be entered in units of 1 JPY."
+            "This order will automatically expire"
+            "if it is not executed within 10 minutes.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "order_id": {
+                        "type": "string",
+                        "description": "The child_order_acceptance_id"
+                        " of the order to be canceled.",
+                    },
+                    "side": {
+                        "type": "string",
+                        "enum": ["BUY", "SELL"],
+                        "description": "The direction of the"
+                        "trade. 'BUY' or 'SELL'. ",
+                    },
+                    "price": {
+                        "type": "integer",
+                        "description": "The order price in JPY."
+                        "Enter the price in units of 1 JPY."
+                        "If you specify 'LIMIT' for the order_type,"
+                        "you need to specify the price.",
+                    },
+                    "size": {
+                        "type": "number",
+                        "description": "The order quantity in BTC."
+                        "The minimum value is 0.001 BTC, "
+                        "specified in increments of 0.0001 BTC.",
+                    },
+                    "order_type": {
+                        "type": "string",
+                        "enum": ["LIMIT", "MARKET"],
+                        "description": "The type of order."
+                        "Specify 'LIMIT' for limit order or"
+                        "'MARKET' for market order.",
+                    },
+                    "time_in_force": {
+                        "type": "string",
+                        "enum": ["GTC", "IOC", "FOK"],
+                        "description": "The time in force of the "
+                        "order. Specify 'GTC' for Good-Til-Canceled,"
+                        "'IOC' for Immediate-Or-Cancel,"
+                        "or 'FOK' for Fill-Or-Kill.",
+                    },
+                },
+                "required": [
+                    "order_id",
+                    "side",
+                    "price",
+                    "size",
+                    "order_type",
+                ],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "parent_order",
+            "description": "Function calling to place an entry order"
+            " together with its take-profit and stop-loss orders"
+            " in a single request."
+            " SIMPLE: one order."
+            " IFD: the second order is placed after the first is filled."
+            " OCO: two orders, when one is filled the other is canceled."
+            " IFDOCO: after the first order is filled, the second and"
+            " third orders are placed as OCO."
+            " The minimum order size is 0.001 BTC."
+            " Prices should be entered in units of 1 JPY.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "order_method": {
+                        "type": "string",
+                        "enum": ["SIMPLE", "IFD", "OCO", "IFDOCO"],
+                        "description": "The parent order method."
+                        " SIMPLE takes 1 order, IFD and OCO take 2,"
+                        " IFDOCO takes 3.",
+                    },
+                    "orders": {
+                        "type": "array",
+                        "description": "The orders in execution order.",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "side": {
+                                    "type": "string",
+                                    "enum": ["BUY", "SELL"],
+                                    "description": "The direction of the"
+                                    " trade. 'BUY' or 'SELL'.",
+                                },
+                                "condition_type": {
+                                    "type": "string",
+                                    "enum": [
+                                        "LIMIT",
+                                        "MARKET",
+                                        "STOP",
+                                        "STOP_LIMIT",
+                                    ],
+                                    "description": "'LIMIT' or 'MARKET',"
+                                    " or 'STOP' (market order when the"
+                                    " trigger_price is reached) or"
+                                    " 'STOP_LIMIT' (limit order when the"
+                                    " trigger_price is reached).",
+                                },
+                                "price": {
+                                    "type": "integer",
+                                    "description": "The order price in JPY."
+                                    " Required for LIMIT and STOP_LIMIT.",
+                                },
+                                "trigger_price": {
+                                    "type": "integer",
+                                    "description": "The trigger price in"
+                                    " JPY. Required for STOP and"
+                                    " STOP_LIMIT.",
+                                },
+                                "size": {
+                                    "type": "number",
+                                    "description": "The order quantity in"
+                                    " BTC. The minimum value is 0.001 BTC,"
+                                    " specified in increments of"
+                                    " 0.0001 BTC.",
+                                },
+                            },
+                            "required": ["side", "condition_type", "size"],
+                        },
+                    },
+                    "time_in_force": {
+                        "type": "string",
+                        "enum": ["GTC", "IOC", "FOK"],
+                        "description": "The time in force of the "
+                        "orders. Specify 'GTC' for Good-Til-Canceled,"
+                        "'IOC' for Immediate-Or-Cancel,"
+                        "or 'FOK' for Fill-Or-Kill.",
+                    },
+                },
+                "required": ["order_method", "orders"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "hold",
+            "description": "Function calling to hold the current"
+            " position without taking any action.",
+        },
+    },
+]
+
+# 関数名の一覧
+TOOL_NAMES = tuple(tool["function"]["name"] for tool in TOOLS)
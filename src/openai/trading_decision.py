@@ -3,10 +3,14 @@
 """
 
 import os
-import json
 import logging
 from datetime import datetime
-import openai
+from src.custom_errors import DecisionError
+from src.openai.decision_cache import DecisionCache
+from src.openai.decision_client import DecisionClient
+from src.openai.prompt_serializer import PromptSerializer
+from src.openai.prompt_templates import PromptTemplate
+from src.openai.tools import TOOLS
 from src.logger_setup import get_logger
 
 # ロガーの取得
@@ -21,12 +25,52 @@ class TradingDecision:
     売買判断を行うクラス
     """
 
-    def __init__(self, config):
+    def __init__(self, config, client=None):
         self.openai_api_key = config.openai_api_key
         self.prompt_file_name = config.prompt_file
         self.project_root = config.project_root
         self.trading_interval = config.trading_interval
-        openai.api_key = self.openai_api_key
+
+        # 期限・ヘッジ・代替モデル付きのOpenAIクライアント（共有可能）
+        self.owns_client = client is None
+        self.client = client or DecisionClient(
+            self.openai_api_key,
+            model=config.openai_model,
+            fallback_model=config.openai_fallback_model,
+            deadline=config.decision_deadline,
+            hedge_delay=config.decision_hedge_delay,
+            fallback_margin=config.decision_fallback_margin,
+        )
+        self.last_decision_report = None
+
+        # プロンプトのテンプレートを起動時に読み込んで検証する
+        self.template = PromptTemplate(
+            os.path.join(self.project_root, self.prompt_file_name)
+        )
+
+        # 同じマーケットの状態に対する判断のキャッシュ
+        self.cache = None
+        if config.decision_cache_enabled:
+            self.cache = DecisionCache(
+                os.path.join(config.log_dir, config.decision_cache_file),
+                ttl=config.decision_cache_ttl,
+                max_entries=config.decision_cache_max_entries,
+                digits=config.decision_cache_digits,
+                signal_rows=config.decision_cache_signal_rows,
+            )
+
+        # プロンプトに埋め込むデータの変換（"repr"の場合は変換しない）
+        self.serializer = None
+        if config.prompt_format == "compact":
+            self.serializer = PromptSerializer(config.prompt_token_budget)
+        self.last_prompt_report = None
+
+    def close(self):
+        """
+        OpenAIクライアントを終了する
+        """
+        if self.owns_client:
+            self.client.close()
 
     def load_messages(
         self,
@@ -36,33 +80,51 @@ class TradingDecision:
         order_data,
         execution_data,
         current_time,
+        board_data=None,
+        timeframe_data=None,
     ):
         """
         メッセージを読み込む
         """
-        messages = []
-
-        prompt_file = os.path.join(self.project_root, self.prompt_file_name)
-
-        # メッセージを読み込む
-        if os.path.exists(prompt_file):
-            with open(prompt_file, "r", encoding="utf-8") as file:
-                messages = json.load(file)
-
-        # print(prompt_file)
+        # データをトークン数の少ないテキストに変換
+        if self.serializer is not None:
+            sections, report = self.serializer.serialize(
+                market_data,
+                ticker_data,
+                portfolio_data,
+                order_data,
+                execution_data,
+                board_data,
+                timeframe_data,
+            )
+            market_data = sections["market_data"]
+            ticker_data = sections["ticker_data"]
+            portfolio_data = sections["portfolio_data"]
+            order_data = sections["order_data"]
+            execution_data = sections["execution_data"]
+            board_data = sections["board_data"]
+            timeframe_data = sections["timeframe_data"]
+            self.last_prompt_report = report
+            logger.info("Prompt data tokens: %s", report)
+        elif timeframe_data:
+            # 時間足ごとのデータフレームを見出しを付けて連結する
+            timeframe_data = "\n".join(
+                f"[{name}]\n{signals}"
+                for name, signals in timeframe_data.items()
+            )
 
         # プレースホルダーを変数で置換
-        for message in messages:
-            message["content"] = message["content"].format(
-                market_data=market_data,
-                ticker_data=ticker_data,
-                portfolio_data=portfolio_data,
-                order_data=order_data,
-                execution_data=execution_data,
-                current_time=current_time,
-                trading_interval=str(int(self.trading_interval / 60)),
-            )
-        return messages
+        return self.template.render(
+            market_data=market_data,
+            ticker_data=ticker_data,
+            portfolio_data=portfolio_data,
+            order_data=order_data,
+            execution_data=execution_data,
+            board_data=board_data if board_data is not None else "none",
+            timeframe_data=timeframe_data or "none",
+            current_time=current_time,
+            trading_interval=str(int(self.trading_interval / 60)),
+        )
 
     def get_trading_decision(
         self,
@@ -71,10 +133,61 @@ class TradingDecision:
         portfolio_data,
         order_data,
         execution_data,
+        board_data=None,
+        timeframe_data=None,
+        force_refresh=False,
     ):
         """
-        売買判断を行う
+        売買判断を行う（force_refreshがTrueの場合はキャッシュを使用しない）
         """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.fingerprint(
+                market_data,
+                ticker_data,
+                portfolio_data,
+                order_data,
+                execution_data,
+                board_data,
+                timeframe_data,
+            )
+            if force_refresh:
+                self.cache.record_refresh()
+            else:
+                decision = self.cache.get(cache_key)
+                if decision is not None:
+                    logger.info(
+                        "Decision cache hit: %s %s",
+                        decision.function.name,
+                        self.cache.get_stats(),
+                    )
+                    return decision
+
+        decision, report = self._request_decision(
+            market_data,
+            ticker_data,
+            portfolio_data,
+            order_data,
+            execution_data,
+            board_data,
+            timeframe_data,
+        )
+
+        # holdのみキャッシュする（期限切れによるholdは除く）
+        if cache_key is not None and report["outcome"] != "hold":
+            self.cache.put(cache_key, decision)
+        return decision
+
+    def _request_decision(
+        self,
+        market_data,
+        ticker_data,
+        portfolio_data,
+        order_data,
+        execution_data,
+        board_data=None,
+        timeframe_data=None,
+    ):
         current_time = (
             datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
         )
@@ -86,183 +199,29 @@ class TradingDecision:
             order_data,
             execution_data,
             current_time,
+            board_data,
+            timeframe_data,
         )
 
-        tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "order",
-                    "description": "Function calling to place a BTC buy or"
-                    "sell order. The minimum order size is 0.001 BTC."
-                    "The order price should be entered in units of 1 JPY."
-                    "This order will automatically expire"
-                    " if it is not executed within 10 minutes.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "side": {
-                                "type": "string",
-                                "enum": ["BUY", "SELL"],
-                                "description": "The direction of the"
-                                "trade. 'BUY' or 'SELL'. ",
-                            },
-                            "price": {
-                                "type": "integer",
-                                "description": "The order price in JPY."
-                                "Enter the price in units of 1 JPY."
-                                "If you specify 'LIMIT' for the order_type,"
-                                "you need to specify the price.",
-                            },
-                            "size": {
-                                "type": "number",
-                                "description": "The order quantity in BTC."
-                                "The minimum value is 0.001 BTC, "
-                                "specified in increments of 0.0001 BTC.",
-                            },
-                            "order_type": {
-                                "type": "string",
-                                "enum": ["LIMIT", "MARKET"],
-                                "description": "The type of order."
-                                "Specify 'LIMIT' for limit order or"
-                                "'MARKET' for market order.",
-                            },
-                            "time_in_force": {
-                                "type": "string",
-                                "enum": ["GTC", "IOC", "FOK"],
-                                "description": "The time in force of the "
-                                "order. Specify 'GTC' for Good-Til-Canceled,"
-                                "'IOC' for Immediate-Or-Cancel,"
-                                "or 'FOK' for Fill-Or-Kill.",
-                            },
-                        },
-                        "required": [
-                            "side",
-                            "price",
-                            "size",
-                            "order_type",
-                            "time_in_force",
-                        ],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "cancel",
-                    "description": "Function calling to cancel an"
-                    "open BTC order."
-                    "This action does not allow new orders to be placed "
-                    "until the next decision cycle, so if you want to place "
-                    "new orders at the same time, "
-                    "use the cancel_and_order function.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "order_id": {
-                                "type": "string",
-                                "description": "The child_order_acceptance_id"
-                                " of the order to be canceled.",
-                            }
-                        },
-                        "required": ["order_id"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "cancel_and_order",
-                    "description": "Function calling to cancel an open"
-                    "BTC order and place a new order."
-                    "The minimum order size is 0.001 BTC."
-                    "The order price should be entered in units of 1 JPY."
-                    "This order will automatically expire"
-                    "if it is not executed within 10 minutes.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "order_id": {
-                                "type": "string",
-                                "description": "The child_order_acceptance_id"
-                                " of the order to be canceled.",
-                            },
-                            "side": {
-                                "type": "string",
-                                "enum": ["BUY", "SELL"],
-                                "description": "The direction of the"
-                                "trade. 'BUY' or 'SELL'. ",
-                            },
-                            "price": {
-                                "type": "integer",
-                                "description": "The order price in JPY."
-                                "Enter the price in units of 1 JPY."
-                                "If you specify 'LIMIT' for the order_type,"
-                                "you need to specify the price.",
-                            },
-                            "size": {
-                                "type": "number",
-                                "description": "The order quantity in BTC."
-                                "The minimum value is 0.001 BTC, "
-                                "specified in increments of 0.0001 BTC.",
-                            },
-                            "order_type": {
-                                "type": "string",
-                                "enum": ["LIMIT", "MARKET"],
-                                "description": "The type of order."
-                                "Specify 'LIMIT' for limit order or"
-                                "'MARKET' for market order.",
-                            },
-                            "time_in_force": {
-                                "type": "string",
-                                "enum": ["GTC", "IOC", "FOK"],
-                                "description": "The time in force of the "
-                                "order. Specify 'GTC' for Good-Til-Canceled,"
-                                "'IOC' for Immediate-Or-Cancel,"
-                                "or 'FOK' for Fill-Or-Kill.",
-                            },
-                        },
-                        "required": [
-                            "order_id",
-                            "side",
-                            "price",
-                            "size",
-                            "order_type",
-                        ],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "hold",
-                    "description": "Function calling to hold the current"
-                    " position without taking any action.",
-                },
-            },
-        ]
-
         # print(messages)
 
         # OpenAIにリクエストを送信
-        # response = None
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            tools=tools,
-            tool_choice="required",
-        )
-
-        # logger.debug("Response: %s", response)
-        if response.choices[0].message.tool_calls:
-            tool_calls = response.choices[0].message.tool_calls
-
-            if tool_calls is None:
-                return None
-
-            tool_call = tool_calls[0]
-            tool_call.arguments = json.loads(tool_call.function.arguments)
-            return tool_call
+        decision, report = self.client.decide(messages, TOOLS)
+        self.last_decision_report = report
+
+        # すべての要求が失敗した場合は周期のエラーとして扱う
+        if report["outcome"] == "error":
+            raise DecisionError(
+                f"All decision requests failed in {report['elapsed']:.3f}s: "
+                f"{report['attempts']}"
+            )
 
-        else:
-            return None
+        # 要求ごとの所要時間と結果をログに出力
+        log = logger.info if report["outcome"] != "hold" else logger.warning
+        log(
+            "Decision %s in %.3fs: %s",
+            report["outcome"],
+            report["elapsed"],
+            report["attempts"],
+        )
+        return decision, report
@@ -0,0 +1,362 @@
+"""
+Trading runtime
+"""
+
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import split_product_code
+from src.logger_setup import add_thread_log_file, get_logger
+from src.metrics import MetricsServer, get_metrics
+from src.custom_errors import APIError
+from src.actions import Actions
+from src.bitflyer.order_tracker import CANCELED, EXPIRED
+from src.bitflyer.trading_methods import BitflyerMethods
+from src.cryptocompare.trading_signals import TradingSignals
+from src.openai.decision_client import DecisionClient
+from src.openai.trading_decision import TradingDecision
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+# メトリクスの取得
+metrics = get_metrics()
+
+# 連続エラーの上限（超えたプロダクトは停止する）
+MAX_ERRORS = 3
+
+# 周期ごとの要約に出力するメトリクス
+SUMMARY_METRICS = (
+    "trading_stage_seconds",
+    "bitflyer_request_seconds",
+    "bitflyer_request_errors_total",
+    "bitflyer_request_retries_total",
+    "bitflyer_rate_limit_wait_seconds",
+    "openai_request_seconds",
+    "trading_cycle_errors_total",
+)
+
+
+class ProductWorker:
+    """
+    プロダクトごとの売買判断のパイプライン
+    """
+
+    def __init__(self, config, bitflyer_client, executor, decision_client):
+        self.product_code = config.product_code
+        self.base, self.quote = split_product_code(self.product_code)
+        self.currencies = (self.quote, self.base)
+
+        # 注文処理の初期化
+        self.actions = Actions(config, bitflyer_client, executor)
+
+        self.signals = TradingSignals(
+            config, live_state=self.actions.live_state
+        )
+
+        # OpenAI売買判断モジュールの初期化
+        self.decision_maker = TradingDecision(config, decision_client)
+
+        # 判断は専用のスレッドで行う（プロダクトごとのログの識別に使用）
+        self.thread_prefix = f"worker-{self.product_code}_"
+        self.thread = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=self.thread_prefix[:-1]
+        )
+        self.error_count = 0
+
+    def stage(self, name):
+        """
+        処理段階の所要時間を記録する
+        """
+        return metrics.timer(
+            "trading_stage_seconds", product=self.product_code, stage=name
+        )
+
+    @property
+    def active(self):
+        """
+        連続エラーの上限に達していないかどうか
+        """
+        return self.error_count < MAX_ERRORS
+
+    def get_balance(self, balance):
+        """
+        共有の残高からこのプロダクトの通貨のみを取り出す
+        """
+        entries = {
+            entry["currency_code"]: entry
+            for entry in balance["current_balance"]
+        }
+        return {
+            "current_balance": [
+                dict(entries[currency])
+                for currency in self.currencies
+                if currency in entries
+            ],
+            "history": balance["history"],
+        }
+
+    def perform_trading_actions(self, decision):
+        """
+        売買判断に基づいて注文を実行する
+        """
+        if hasattr(decision, "type") and decision.type == "function":
+            function_name = decision.function.name
+            metrics.inc(
+                "trading_decisions_total",
+                product=self.product_code,
+                decision=function_name,
+            )
+
+            if function_name == "order":
+                # 注文を実行
+                self.actions.execute_order(decision)
+
+            elif function_name == "cancel":
+                # 注文をキャンセル
+                self.actions.cancel_order(decision)
+
+            elif function_name == "cancel_and_order":
+                # 取消の完了を確認してから再度注文
+                order_id = self.actions.cancel_order(decision)
+                state = self.actions.wait_for_cancel(order_id)
+                if state in (CANCELED, EXPIRED):
+                    self.actions.execute_order(decision)
+                else:
+                    logger.warning(
+                        "[cancel_and_order] Order %s is %s, "
+                        "replacement not executed",
+                        order_id,
+                        state or "not confirmed as canceled",
+                    )
+
+            elif function_name == "parent_order":
+                # エントリーと決済の注文をまとめて発注
+                self.actions.execute_parent_order(decision)
+
+            elif function_name == "hold":
+                logger.info("[hold] Hold position: %s", function_name)
+
+    def handle_trading_decision(self, balance):
+        """
+        売買判断を行う
+        """
+
+        # マーケットデータと価格データを並行して取得
+        with self.stage("market_data"):
+            market_data = self.actions.get_market_data(
+                extra_sources={"signals": self.signals.load_data},
+                balance=self.get_balance(balance),
+            )
+
+        # シグナルのデータを取得
+        with self.stage("signals"):
+            signal_list = self.signals.get_signals()
+            timeframe_signals = self.signals.get_timeframe_signals()
+
+        # OpenAIを使った売買判断
+        with self.stage("decision"):
+            decision = self.decision_maker.get_trading_decision(
+                signal_list,
+                market_data.ticker_data,
+                market_data.portfolio_data,
+                market_data.open_orders,
+                market_data.execution_data,
+                board_data=market_data.board_summary,
+                timeframe_data=timeframe_signals,
+            )
+
+        # ログに出力
+        available = {
+            entry["currency_code"]: entry["available"]
+            for entry in market_data.portfolio_data
+        }
+        logger.info(
+            "[%s] Balance: %s %s / %s %s",
+            self.product_code,
+            self.quote,
+            available.get(self.quote),
+            self.base,
+            available.get(self.base),
+        )
+
+        if not decision:
+            logger.info("[hold] No decision data returned")
+        else:
+            with self.stage("order"):
+                self.perform_trading_actions(decision)
+
+    def run_cycle(self, balance):
+        """
+        1回分の売買判断を行う（エラーは記録して次の周期に持ち越す）
+        """
+        try:
+            # 最新の板のステータスをチェック
+            with self.stage("board_state"):
+                board_state = self.actions.get_board_state()["state"]
+
+            if board_state != "RUNNING":
+                # 板のステータスがRUNNINGでない場合は売買判断をスキップ
+                logger.info(
+                    "[%s] Decision Skiped : %s",
+                    self.product_code,
+                    board_state,
+                )
+            else:
+                self.handle_trading_decision(balance)
+
+        except APIError as api_error:
+            logger.error("API error occurred: %s", api_error)
+            self.error_count += 1
+            metrics.inc(
+                "trading_cycle_errors_total",
+                product=self.product_code,
+                error="api",
+            )
+        except Exception as e:
+            logger.error("An error occurred: %s", e)
+            logger.error(traceback.format_exc())
+            self.error_count += 1
+            metrics.inc(
+                "trading_cycle_errors_total",
+                product=self.product_code,
+                error="other",
+            )
+
+        if not self.active:
+            logger.error(
+                "[%s] Maximum number of consecutive errors reached.",
+                self.product_code,
+            )
+
+    def close(self):
+        """
+        スレッドと接続を終了する
+        """
+        self.thread.shutdown(wait=True)
+        self.decision_maker.close()
+        self.actions.close()
+
+
+class TradingRuntime:
+    """
+    複数のプロダクトの売買判断を並行して実行する
+    """
+
+    def __init__(self, config):
+        product_configs = config.get_product_configs()
+
+        # 各段階の所要時間とエラー数の記録
+        metrics.enabled = config.metrics_enabled
+        self.metrics_server = None
+        if config.metrics_enabled and config.metrics_port:
+            self.metrics_server = MetricsServer(
+                metrics, host=config.metrics_host, port=config.metrics_port
+            ).start()
+
+        # 接続プール・残高・OpenAIクライアントはすべてのプロダクトで共有する
+        self.bitflyer_client = BitflyerMethods(config)
+        self.executor = ThreadPoolExecutor(
+            max_workers=config.snapshot_workers * len(product_configs),
+            thread_name_prefix="market-data",
+        )
+        self.decision_client = DecisionClient(
+            config.openai_api_key,
+            model=config.openai_model,
+            fallback_model=config.openai_fallback_model,
+            deadline=config.decision_deadline,
+            hedge_delay=config.decision_hedge_delay,
+            fallback_margin=config.decision_fallback_margin,
+        )
+
+        self.workers = [
+            ProductWorker(
+                product_config,
+                self.bitflyer_client,
+                self.executor,
+                self.decision_client,
+            )
+            for product_config in product_configs
+        ]
+        self.currencies = tuple(
+            sorted({c for worker in self.workers for c in worker.currencies})
+        )
+
+        # プロダクトごとのログファイル
+        if len(self.workers) > 1:
+            for worker in self.workers:
+                add_thread_log_file(worker.product_code, worker.thread_prefix)
+
+    @property
+    def active(self):
+        """
+        稼働中のプロダクトがあるかどうか
+        """
+        return any(worker.active for worker in self.workers)
+
+    def get_connection_stats(self):
+        """
+        HTTP接続の再利用状況を取得する
+        """
+        return self.bitflyer_client.get_connection_stats()
+
+    def run_cycle(self):
+        """
+        残高を一度だけ取得し、すべてのプロダクトの判断を並行して行う
+        """
+        started = time.perf_counter()
+        workers = [worker for worker in self.workers if worker.active]
+        try:
+            balance = self.bitflyer_client.get_balance(self.currencies)
+        except APIError as api_error:
+            logger.error("API error occurred: %s", api_error)
+            for worker in workers:
+                worker.error_count += 1
+            return
+        except Exception as e:
+            # 残高の記録の失敗なども周期のエラーとして扱い、ボットは止めない
+            logger.error("An error occurred: %s", e)
+            logger.error(traceback.format_exc())
+            for worker in workers:
+                worker.error_count += 1
+            return
+
+        futures = [
+            worker.thread.submit(worker.run_cycle, balance)
+            for worker in workers
+        ]
+        wait(futures)
+        elapsed = time.perf_counter() - started
+        metrics.observe("trading_cycle_seconds", elapsed)
+
+        for worker in workers:
+            logger.info(
+                "[%s] Orders: %s",
+                worker.product_code,
+                worker.actions.get_order_stats(),
+            )
+
+        # HTTP接続の再利用状況をログに出力
+        logger.info("HTTP connections: %s", self.get_connection_stats())
+        logger.info(
+            "Rate limits: %s", self.bitflyer_client.get_rate_limit_stats()
+        )
+        logger.info("Market cache: %s", self.bitflyer_client.get_cache_stats())
+
+        # この周期の段階ごとの所要時間とエラー数
+        if metrics.enabled:
+            logger.info(
+                "Cycle %.3fs: %s", elapsed, metrics.summary(SUMMARY_METRICS)
+            )
+
+    def close(self):
+        """
+        すべてのプロダクトの処理と共有の接続を終了する
+        """
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        for worker in self.workers:
+            worker.close()
+        self.decision_client.close()
+        self.executor.shutdown(wait=True)
+        self.bitflyer_client.close()
@@ -0,0 +1,102 @@
+"""
+Scheduler
+"""
+
+import math
+import signal
+import threading
+import time
+from src.logger_setup import get_logger
+
+# ロガーの取得
+logger = get_logger(__name__)
+
+
+class CandleScheduler:
+    """
+    足の確定時刻に合わせて一定間隔で処理を実行する
+    """
+
+    def __init__(self, interval=300, offset=5, clock=time.time):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.interval = interval
+        self.offset = offset % interval
+        self.clock = clock
+        self.stop_event = threading.Event()
+        self.stats = {
+            "runs": 0,
+            "overruns": 0,
+            "skipped": 0,
+            "last_duration": None,
+            "last_lateness": None,
+        }
+
+    def next_slot(self, now=None):
+        """
+        指定した時刻より後の最初の実行時刻を返す
+        """
+        now = self.clock() if now is None else now
+        index = math.floor((now - self.offset) / self.interval) + 1
+        return index * self.interval + self.offset
+
+    def stop(self):
+        """
+        実行中の処理が終わった後にスケジューラーを停止する
+        """
+        self.stop_event.set()
+
+    @property
+    def stopped(self):
+        """
+        停止が要求されたかどうか
+        """
+        return self.stop_event.is_set()
+
+    def install_signal_handlers(self):
+        """
+        SIGINT・SIGTERMで停止するようにする（2回目のSIGINTで強制終了）
+        """
+
+        def handle(signum, frame):
+            if self.stopped and signum == signal.SIGINT:
+                raise KeyboardInterrupt
+            logger.info(
+                "Received %s, stopping after the current cycle",
+                signal.Signals(signum).name,
+            )
+            self.stop()
+
+        signal.signal(signal.SIGINT, handle)
+        signal.signal(signal.SIGTERM, handle)
+
+    def run(self, task):
+        """
+        停止が要求されるまで実行時刻ごとにtask(slot)を呼び出す
+        """
+        slot = self.next_slot()
+        while not self.stopped:
+            # 時刻を毎回計算し直すため処理時間による遅れが蓄積しない
+            if self.stop_event.wait(max(slot - self.clock(), 0)):
+                break
+
+            started = self.clock()
+            task(slot)
+            finished = self.clock()
+
+            self.stats["runs"] += 1
+            self.stats["last_lateness"] = round(started - slot, 3)
+            self.stats["last_duration"] = round(finished - started, 3)
+
+            # 次の実行時刻を過ぎた場合は溜めずに読み飛ばす
+            next_slot = self.next_slot(finished)
+            missed = int((next_slot - slot) / self.interval) - 1
+            if missed > 0:
+                self.stats["overruns"] += 1
+                self.stats["skipped"] += missed
+                logger.warning(
+                    "Cycle overran by %.3fs, skipped %d slot(s)",
+                    finished - (slot + self.interval),
+                    missed,
+                )
+            slot = next_slot
@@ -0,0 +1,33 @@
+"""
+Backtester tests
+"""
+
+import json
+
+import pandas as pd
+
+from benchmarks.fixtures import make_minute_bars
+from src.backtest.engine import Backtester
+from src.backtest.strategies import moving_average_crossover
+
+
+def test_strategy_decisions_match_live_shape():
+    bars = pd.DataFrame(make_minute_bars(5000))
+    decisions = []
+
+    def decide(context):
+        decision = moving_average_crossover(context)
+        decisions.append(decision)
+        return decision
+
+    result = Backtester(bars, decide).run()
+    summary = result.summary()
+
+    names = {decision.function.name for decision in decisions}
+    assert names == {"hold", "order"}
+    for decision in decisions:
+        # TradingDecisionのtool_callと同じく引数は辞書とJSONの両方を持つ
+        assert decision.type == "function"
+        assert json.loads(decision.function.arguments) == decision.arguments
+    assert summary["decisions"]["order"] == summary["ordered"]
+    assert (result.executions["price"] > 0).all()
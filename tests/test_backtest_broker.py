@@ -0,0 +1,71 @@
+"""
+SimulatedBroker tests
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.backtest.broker import SimulatedBroker
+
+START = 1_700_000_000
+PRICE = 10_000_000
+
+
+def order(side, size, order_type="MARKET", price=0, time_in_force="GTC"):
+    return SimpleNamespace(
+        arguments={
+            "side": side,
+            "size": size,
+            "price": price,
+            "order_type": order_type,
+            "time_in_force": time_in_force,
+        }
+    )
+
+
+def next_bar(broker, open_, high=None, low=None):
+    broker.process_bars(
+        np.array([START + 60]),
+        np.array([float(open_)]),
+        np.array([float(high or open_)]),
+        np.array([float(low or open_)]),
+    )
+
+
+@pytest.mark.parametrize("slippage_rate", [0.0, 0.001])
+def test_market_buy_never_spends_more_than_reserved(slippage_rate):
+    broker = SimulatedBroker(initial_jpy=100_000, slippage_rate=slippage_rate)
+    broker.set_market(START, PRICE)
+    size = 100_000 / (PRICE * (1 + slippage_rate))
+    size = int(size * 1e8) / 1e8
+    assert broker.execute_order(order("BUY", size))
+
+    # 次の足の始値が判断時点より高い
+    next_bar(broker, PRICE * 1.05)
+    assert broker.stats["filled"] == 1
+    assert broker.jpy >= 0
+    assert broker.reserved_jpy == pytest.approx(0, abs=1e-6)
+    assert broker.executions[0]["size"] < size
+
+
+def test_market_buy_at_lower_open_fills_full_size():
+    broker = SimulatedBroker(initial_jpy=100_000)
+    broker.set_market(START, PRICE)
+    assert broker.execute_order(order("BUY", 0.005))
+
+    next_bar(broker, PRICE * 0.99)
+    assert broker.executions[0]["size"] == 0.005
+    assert broker.jpy == pytest.approx(100_000 - PRICE * 0.99 * 0.005)
+
+
+def test_market_buy_below_minimum_after_clamp_is_cancelled():
+    broker = SimulatedBroker(initial_jpy=1_000)
+    broker.set_market(START, PRICE)
+    assert broker.execute_order(order("BUY", 0.0001))
+
+    next_bar(broker, PRICE * 1.01)
+    assert broker.stats["cancelled"] == 1
+    assert broker.jpy == 1_000
+    assert broker.reserved_jpy == pytest.approx(0, abs=1e-9)
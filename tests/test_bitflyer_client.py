@@ -0,0 +1,79 @@
+"""
+BitflyerClient tests against the local stand-in
+"""
+
+import pytest
+
+from src.bitflyer.bitflyer_client import BitflyerClient
+from src.custom_errors import APIError
+from src.exchange.server import StandinServer
+
+API_KEY = "key"
+API_SECRET = "secret"
+
+
+@pytest.fixture
+def server():
+    server = StandinServer(api_keys={API_KEY: API_SECRET}).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(server):
+    client = BitflyerClient(
+        API_KEY,
+        API_SECRET,
+        base_url=server.url,
+        max_retries=3,
+        backoff_factor=0,
+        rate_limit_enabled=False,
+    )
+    yield client
+    client.close()
+
+
+def test_connections_are_reused(client):
+    for _ in range(5):
+        client.make_request("GET", "/v1/getticker")
+    client.make_request("GET", "/v1/me/getbalance")
+
+    stats = client.get_connection_stats()
+    assert stats["requests"] == 6
+    assert stats["connections"] == 1
+    assert stats["reused"] == 5
+
+
+def test_get_is_retried_on_server_error(server, client):
+    server.faults.fail_next(2)
+    ticker = client.make_request("GET", "/v1/getticker")
+
+    assert ticker["product_code"] == server.engine.product_code
+    assert server.request_count == 3
+    assert client.request_count == 1
+
+
+def test_get_gives_up_after_max_retries(server, client):
+    server.faults.fail_next(10)
+    with pytest.raises(APIError, match="status_code=500"):
+        client.make_request("GET", "/v1/getticker")
+    assert server.request_count == 4
+
+
+def test_post_is_not_retried(server, client):
+    order = {
+        "product_code": server.engine.product_code,
+        "child_order_type": "LIMIT",
+        "side": "BUY",
+        "price": 1_000_000,
+        "size": 0.01,
+    }
+    server.faults.fail_next(1)
+    with pytest.raises(APIError, match="status_code=500"):
+        client.make_request("POST", "/v1/me/sendchildorder", data=order)
+    assert server.request_count == 1
+    assert client.make_request("GET", "/v1/me/getchildorders") == []
+
+    result = client.make_request("POST", "/v1/me/sendchildorder", data=order)
+    assert result["child_order_acceptance_id"]
+    assert server.request_count == 3
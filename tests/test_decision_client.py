@@ -0,0 +1,70 @@
+"""
+DecisionClient tests
+"""
+
+import asyncio
+from types import SimpleNamespace
+from src.openai.decision_client import DecisionClient
+
+
+class SlowCompletions:
+    """
+    タイムアウトまで応答しないOpenAIのスタブ
+    """
+
+    def __init__(self):
+        self.timeouts = []
+
+    async def create(self, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        await asyncio.sleep(timeout)
+        raise asyncio.TimeoutError("Request timed out")
+
+
+def make_client(completions, **kwargs):
+    client = DecisionClient("test", fallback_model="fallback", **kwargs)
+    client.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=completions)
+    )
+    return client
+
+
+def test_slow_model_holds_at_deadline():
+    completions = SlowCompletions()
+    client = make_client(
+        completions, deadline=1.0, hedge_delay=0.2, fallback_margin=0.3
+    )
+    try:
+        decision, report = client.decide([], [])
+    finally:
+        client.loop.call_soon_threadsafe(client.loop.stop)
+
+    assert report["outcome"] == "hold"
+    assert decision.function.name == "hold"
+    assert [a["kind"] for a in report["attempts"]] == [
+        "primary",
+        "hedge",
+        "fallback",
+    ]
+    assert all(a["outcome"] == "cancelled" for a in report["attempts"])
+    assert all(timeout > 1.0 - 0.05 for timeout in completions.timeouts)
+
+
+def test_failing_model_reports_error():
+    async def create(**kwargs):
+        raise RuntimeError("boom")
+
+    client = make_client(
+        SimpleNamespace(create=create),
+        deadline=1.0,
+        hedge_delay=0.2,
+        fallback_margin=0.3,
+    )
+    try:
+        decision, report = client.decide([], [])
+    finally:
+        client.loop.call_soon_threadsafe(client.loop.stop)
+
+    assert report["outcome"] == "error"
+    assert decision is None
+    assert len(report["attempts"]) == 3
@@ -0,0 +1,141 @@
+"""
+Indicator parity tests
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cryptocompare.indicators import SIGNAL_COLUMNS, StreamingIndicators
+from src.cryptocompare.numpy_indicators import (
+    BUFFER_NAMES,
+    NumpyIndicators,
+    ema,
+    rolling_mean,
+)
+from src.cryptocompare.trading_signals import calculate_indicators
+
+# pandasの指標に対して許容する相対誤差
+PARITY_TOLERANCE = 1e-9
+
+
+@pytest.fixture
+def bars():
+    """
+    横ばいと一方向の値動きを含む5分足の終値
+    """
+    rng = np.random.default_rng(0)
+    close = np.round(1e7 * np.cumprod(1 + rng.normal(0, 5e-4, 300)))
+    close[60:75] = close[60]
+    close[120:140] = close[120] + np.arange(20) * 1000
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    return pd.DataFrame(
+        {
+            "timestamp": pd.date_range(
+                "2024-01-01", periods=len(close), freq="5min"
+            ),
+            "open": open_,
+            "close": close,
+        }
+    )
+
+
+def assert_parity(expected, actual):
+    """
+    NaNの位置が一致し、値が列の最大値に対する相対誤差の範囲内であることを確認する
+    """
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    assert expected.shape == actual.shape
+    np.testing.assert_array_equal(np.isnan(expected), np.isnan(actual))
+    valid = ~np.isnan(expected)
+    # 0付近の値（MACDなど）は列の最大値に対する誤差で比較する
+    scale = max(float(np.abs(expected[valid]).max(initial=0)), 1.0)
+    error = np.abs(expected[valid] - actual[valid]).max(initial=0)
+    assert error / scale <= PARITY_TOLERANCE
+
+
+def streaming_frame(df, revise=False):
+    """
+    逐次計算の結果をget_signalsと同じカラムのデータフレームで返す
+
+    reviseがTrueの場合は各足を始値で追加してから終値で更新する
+    """
+    engine = StreamingIndicators()
+    for timestamp, open_, close in zip(
+        range(len(df)), df["open"], df["close"]
+    ):
+        if revise:
+            engine.update(timestamp, open_)
+        engine.update(timestamp, close)
+    return pd.DataFrame(engine.get_rows(), columns=SIGNAL_COLUMNS)
+
+
+@pytest.mark.parametrize("revise", [False, True])
+def test_streaming_matches_pandas(bars, revise):
+    expected = calculate_indicators(bars.copy())
+    actual = streaming_frame(bars, revise=revise)
+    assert len(actual) == len(expected)
+    for column in SIGNAL_COLUMNS[1:]:
+        assert_parity(expected[column], actual[column])
+
+
+def test_streaming_warm_up_rows_are_nan(bars):
+    actual = streaming_frame(bars)
+    assert actual["Short_MA"].isna().sum() == 4
+    assert actual["Long_MA"].isna().sum() == 49
+    assert actual["BB_Mid"].isna().sum() == 19
+    assert actual["RSI"].iloc[:13].isna().all()
+    assert not np.isnan(actual["RSI"].iloc[13])
+
+
+def test_streaming_ignores_older_bars(bars):
+    engine = StreamingIndicators()
+    assert engine.update(10, 100.0)
+    assert not engine.update(9, 200.0)
+    assert engine.get_rows()[-1][1] == 100.0
+
+
+def test_numpy_matches_pandas(bars):
+    expected = calculate_indicators(bars.copy())
+    buffers = NumpyIndicators().compute(bars["close"].to_numpy())
+    for column in BUFFER_NAMES:
+        assert_parity(expected[column], buffers[column])
+
+
+def test_numpy_frame_matches_get_signals_rows(bars):
+    expected = calculate_indicators(bars.copy())[SIGNAL_COLUMNS]
+    expected = expected.dropna().tail(50)
+    kernels = NumpyIndicators()
+    kernels.compute(bars["close"].to_numpy())
+    actual = kernels.to_frame(bars, count=50)
+    assert actual.index.equals(expected.index)
+    assert actual["Signal"].equals(expected["Signal"])
+    for column in SIGNAL_COLUMNS[1:]:
+        assert_parity(expected[column], actual[column])
+
+
+def test_numpy_rolling_mean_across_chunks(bars):
+    close = bars["close"].to_numpy()
+    mean = np.empty(len(close))
+    variance = np.empty(len(close))
+    rolling_mean(close, 20, mean, var_out=variance, chunk=7)
+    rolling = bars["close"].rolling(window=20)
+    assert_parity(rolling.mean(), mean)
+    assert_parity(rolling.std(), np.sqrt(variance))
+
+
+def test_numpy_reuses_buffers(bars):
+    kernels = NumpyIndicators()
+    first = kernels.compute(bars["close"].to_numpy())["RSI"]
+    second = kernels.compute(bars["close"].to_numpy()[:100])["RSI"]
+    assert len(second) == 100
+    assert np.shares_memory(first, second)
+
+
+@pytest.mark.parametrize("span", [9, 26])
+def test_numpy_ema_across_blocks(span):
+    rng = np.random.default_rng(1)
+    close = 1e7 * np.cumprod(1 + rng.normal(0, 5e-4, 5000))
+    expected = pd.Series(close).ewm(span=span, adjust=False).mean()
+    assert_parity(expected, ema(close, span, np.empty(len(close))))
@@ -0,0 +1,90 @@
+"""
+MarketData partial-failure tests
+"""
+
+import pytest
+
+from src.actions import MarketData
+from src.custom_errors import APIError
+
+
+class StubClient:
+    """
+    failingに含まれるデータの取得でAPIErrorを送出するクライアント
+    """
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+
+    def _get(self, name, value):
+        if name in self.failing:
+            raise APIError(f"{name} unavailable")
+        return value
+
+    def get_balance(self):
+        return self._get(
+            "balance",
+            {
+                "current_balance": [
+                    {
+                        "currency_code": "JPY",
+                        "amount": 100000.0,
+                        "available": 100000.0,
+                    }
+                ],
+                "history": [],
+            },
+        )
+
+    def get_execution_history(self, product_code):
+        return self._get("executions", [{"id": 1}])
+
+    def get_open_orders(self, product_code):
+        return self._get("open_orders", [])
+
+    def get_ticker(self, product_code):
+        return self._get("ticker", {"ltp": 10_000_000})
+
+
+def test_all_sources_succeed():
+    data = MarketData(StubClient())
+    assert data.errors == {}
+    assert data.ticker_data == {"ltp": 10_000_000}
+    assert data.execution_data == [{"id": 1}]
+    assert data.open_orders == []
+
+
+def test_optional_failures_keep_successful_sources():
+    def failing_signals():
+        raise ValueError("signals unavailable")
+
+    data = MarketData(
+        StubClient(failing=["executions", "open_orders"]),
+        extra_sources={"signals": failing_signals},
+    )
+    assert set(data.errors) == {"executions", "open_orders", "signals"}
+    assert isinstance(data.errors["executions"], APIError)
+    assert data.execution_data is None
+    assert data.open_orders is None
+    assert data.ticker_data == {"ltp": 10_000_000}
+    assert data.portfolio_data[0]["amount"] == 100000
+    assert set(data.fetched_at) == {
+        "balance",
+        "executions",
+        "open_orders",
+        "ticker",
+        "signals",
+    }
+
+
+@pytest.mark.parametrize("source", ["balance", "ticker"])
+def test_required_failure_raises(source):
+    with pytest.raises(APIError, match=source):
+        MarketData(StubClient(failing=[source, "executions"]))
+
+
+def test_shared_balance_is_not_fetched():
+    balance = StubClient().get_balance()
+    data = MarketData(StubClient(failing=["balance"]), balance=balance)
+    assert data.errors == {}
+    assert "balance" not in data.durations
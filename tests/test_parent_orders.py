@@ -0,0 +1,126 @@
+"""
+Parent order tests against the matching-engine stand-in
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.fixtures import API_KEY, API_SECRET, make_config
+from src.actions import Actions
+from src.exchange.matching_engine import MatchingEngine
+from src.exchange.server import StandinServer
+
+# エントリーと決済の価格
+ENTRY_PRICE = 9_990_000
+TAKE_PROFIT_PRICE = 10_100_000
+STOP_PRICE = 9_900_000
+SIZE = 0.01
+
+
+@pytest.fixture
+def engine():
+    return MatchingEngine(initial_price=10_000_000, spread=1000)
+
+
+@pytest.fixture
+def actions(engine, tmp_path):
+    server = StandinServer(engine, {API_KEY: API_SECRET}).start()
+    actions = Actions(
+        make_config(bitflyer_base_url=server.url, log_dir=str(tmp_path))
+    )
+    yield actions
+    actions.close()
+    server.stop()
+
+
+def place_ifdoco(actions):
+    decision = SimpleNamespace(
+        arguments={
+            "order_method": "IFDOCO",
+            "orders": [
+                {
+                    "side": "BUY",
+                    "condition_type": "LIMIT",
+                    "price": ENTRY_PRICE,
+                    "size": SIZE,
+                },
+                {
+                    "side": "SELL",
+                    "condition_type": "LIMIT",
+                    "price": TAKE_PROFIT_PRICE,
+                    "size": SIZE,
+                },
+                {
+                    "side": "SELL",
+                    "condition_type": "STOP",
+                    "trigger_price": STOP_PRICE,
+                    "size": SIZE,
+                },
+            ],
+        }
+    )
+    return actions.execute_parent_order(decision)
+
+
+def child_orders(engine):
+    """
+    子注文を発注順に（種類, 売買, 状態）で返す
+    """
+    return [
+        (o["child_order_type"], o["side"], o["child_order_state"])
+        for o in reversed(engine.get_child_orders(API_KEY))
+    ]
+
+
+def parent_state(actions, acceptance_id):
+    parents = actions.bitflyer_client.get_parent_orders(state=None)
+    for parent in parents:
+        if parent["parent_order_acceptance_id"] == acceptance_id:
+            return parent["parent_order_state"]
+    return None
+
+
+def test_ifdoco_activates_exits_after_entry_fills(engine, actions):
+    acceptance_id = place_ifdoco(actions)
+    assert acceptance_id
+    assert parent_state(actions, acceptance_id) == "ACTIVE"
+    assert child_orders(engine) == [("LIMIT", "BUY", "ACTIVE")]
+
+    # エントリーが約定すると利確の指値が板に出る（逆指値は発動待ち）
+    engine.replay_trade(ENTRY_PRICE, 1.0)
+    assert child_orders(engine) == [
+        ("LIMIT", "BUY", "COMPLETED"),
+        ("LIMIT", "SELL", "ACTIVE"),
+    ]
+    assert parent_state(actions, acceptance_id) == "ACTIVE"
+
+
+def test_take_profit_fill_cancels_stop(engine, actions):
+    acceptance_id = place_ifdoco(actions)
+    engine.replay_trade(ENTRY_PRICE, 1.0)
+
+    engine.replay_trade(TAKE_PROFIT_PRICE, 1.0)
+    assert child_orders(engine) == [
+        ("LIMIT", "BUY", "COMPLETED"),
+        ("LIMIT", "SELL", "COMPLETED"),
+    ]
+    assert parent_state(actions, acceptance_id) == "COMPLETED"
+
+    # 発動価格を下回っても取り消された逆指値は発注されない
+    engine.replay_trade(STOP_PRICE - 10_000, 1.0)
+    assert len(child_orders(engine)) == 2
+
+
+def test_stop_fill_cancels_take_profit(engine, actions):
+    acceptance_id = place_ifdoco(actions)
+    engine.replay_trade(ENTRY_PRICE, 1.0)
+
+    engine.replay_trade(STOP_PRICE - 10_000, 1.0)
+    assert child_orders(engine) == [
+        ("LIMIT", "BUY", "COMPLETED"),
+        ("LIMIT", "SELL", "CANCELED"),
+        ("MARKET", "SELL", "COMPLETED"),
+    ]
+    assert parent_state(actions, acceptance_id) == "COMPLETED"
+    assert actions.bitflyer_client.get_open_orders() == []
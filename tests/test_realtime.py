@@ -0,0 +1,106 @@
+"""
+RealtimeClient tests against the local WebSocket stand-in
+"""
+
+import time
+
+import pytest
+
+from benchmarks.fixtures import API_KEY, API_SECRET, make_config
+from src.bitflyer.realtime import LiveMarketState, RealtimeClient
+from src.bitflyer.trading_methods import BitflyerMethods
+from src.exchange.matching_engine import MatchingEngine
+from src.exchange.realtime_server import RealtimeStandinServer
+from src.exchange.server import StandinServer
+
+# 再接続の待機時間（秒）
+RECONNECT_DELAY = 0.1
+MAX_RECONNECT_DELAY = 0.4
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for condition")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def engine():
+    return MatchingEngine(initial_price=10_000_000, spread=1000)
+
+
+@pytest.fixture
+def rest_client(engine, tmp_path):
+    server = StandinServer(engine, {API_KEY: API_SECRET}).start()
+    client = BitflyerMethods(
+        make_config(bitflyer_base_url=server.url, log_dir=str(tmp_path))
+    )
+    yield client
+    client.close()
+    server.stop()
+
+
+def test_reconnects_and_backfills_the_gap(engine, rest_client):
+    stream = RealtimeStandinServer(engine).start()
+    port = stream.tcp_server.server_address[1]
+    state = LiveMarketState()
+    client = RealtimeClient(
+        state,
+        rest_client=rest_client,
+        url=stream.url,
+        timeout=2,
+        reconnect_delay=RECONNECT_DELAY,
+        max_reconnect_delay=MAX_RECONNECT_DELAY,
+    )
+
+    # 接続の試行時刻を記録する
+    attempts = []
+    connect = client._connect
+
+    def record_connect():
+        attempts.append(time.monotonic())
+        connect()
+
+    client._connect = record_connect
+    client.start()
+    try:
+        assert client.wait_connected(5)
+        for i in range(5):
+            engine.replay_trade(10_000_000 + i * 100, 0.1)
+        wait_until(lambda: len(state.get_executions()) == 5)
+        since = state.covered_since
+        assert state.covers(since)
+
+        # 切断中はストリームの1分足を使用しない
+        stream.stop()
+        wait_until(lambda: not state.connected)
+        assert not state.covers(since)
+
+        # 切断中の約定はストリームでは受信できない
+        for i in range(3):
+            engine.replay_trade(10_001_000 + i * 100, 0.2)
+
+        # 再接続は指数バックオフで間隔を広げる
+        wait_until(lambda: len(attempts) >= 5)
+        intervals = [b - a for a, b in zip(attempts[1:], attempts[2:])]
+        expected = [
+            min(RECONNECT_DELAY * 2 ** (i + 1), MAX_RECONNECT_DELAY)
+            for i in range(len(intervals))
+        ]
+        for interval, delay in zip(intervals, expected):
+            assert interval >= delay * 0.9
+
+        # 同じポートで再開すると接続し、欠損した約定をRESTで補完する
+        stream = RealtimeStandinServer(engine, port=port).start()
+        wait_until(lambda: state.connected)
+        assert client.stats["connects"] == 2
+        assert client.stats["disconnects"] == 1
+        assert client.stats["backfilled"] == 3
+        assert len(state.get_executions()) == 8
+        assert state.covers(since)
+    finally:
+        client.stop()
+        stream.stop()
+    assert not state.covers(since)
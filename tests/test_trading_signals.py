@@ -0,0 +1,64 @@
+"""
+TradingSignals engine parity tests
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks.fixtures import make_config, make_minute_bars
+from src.cryptocompare.trading_signals import TradingSignals
+from tests.test_indicators import PARITY_TOLERANCE
+
+# 1分足の本数（5分足で600本）
+BAR_COUNT = 3000
+
+
+def load_signals(engine, bars):
+    signals = TradingSignals(
+        make_config(signals_incremental=False, signal_engine=engine)
+    )
+    signals.fetch_data = lambda symbol, currency, limit: bars
+    signals.load_data(limit=len(bars))
+    return signals.get_signals()
+
+
+def max_relative_error(expected, actual):
+    """
+    2つのget_signalsの結果の最大の相対誤差を返す
+    """
+    worst = 0.0
+    for column in expected.columns[1:]:
+        a = expected[column].to_numpy(dtype=float)
+        b = actual[column].to_numpy(dtype=float)
+        # 0付近の値（MACDなど）は列の最大値に対する誤差で比較する
+        scale = max(float(np.abs(a).max()), 1.0)
+        worst = max(worst, float(np.abs(a - b).max()) / scale)
+    return worst
+
+
+@pytest.fixture(scope="module")
+def bars():
+    return make_minute_bars(BAR_COUNT)
+
+
+@pytest.fixture(scope="module")
+def expected(bars):
+    return load_signals("pandas", bars)
+
+
+def test_numpy_engine_matches_pandas(bars, expected):
+    actual = load_signals("numpy", bars)
+    assert list(actual.columns) == list(expected.columns)
+    assert actual.index.equals(expected.index)
+    assert actual.dtypes.equals(expected.dtypes)
+    assert max_relative_error(expected, actual) <= PARITY_TOLERANCE
+
+
+def test_streaming_engine_matches_pandas(bars, expected):
+    # 逐次計算は独自の行番号と型で返すため時刻と値のみを比較する
+    actual = load_signals("streaming", bars)
+    assert list(actual.columns) == list(expected.columns)
+    np.testing.assert_array_equal(
+        actual["timestamp"].to_numpy(), expected["timestamp"].to_numpy()
+    )
+    assert max_relative_error(expected, actual) <= PARITY_TOLERANCE